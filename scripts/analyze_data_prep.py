@@ -4,6 +4,8 @@ Deep Analysis of data_prep.py for Iranian Language Adaptation
 """
 from pathlib import Path
 
+from recipe_index import open_index
+
 def analyze_data_prep_structure():
     """Analyze the data preparation script in detail"""
     print("=" * 60)
@@ -12,36 +14,22 @@ def analyze_data_prep_structure():
     
     data_prep_path = Path(r"C:\CRF\espnet-wav2gloss\espnet-wav2gloss\egs2\wav2gloss\asr1\local\data_prep.py")
     
-    if not data_prep_path.exists():
+    index = open_index(data_prep_path.parent)
+    if index is None or not index.exists(data_prep_path):
         print("❌ data_prep.py not found")
         return
-    
+
     print("📖 Reading data_prep.py...")
-    
-    with open(data_prep_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
+
+    content = index.read_text(data_prep_path) or ""
+
     # 1. Analyze language list
     print("\n🔤 LANGUAGES SUPPORTED:")
     print("-" * 40)
-    
-    # Extract the LANGUAGES tuple
-    lines = content.split('\n')
-    in_languages = False
-    languages = []
-    
-    for line in lines:
-        if 'LANGUAGES = (' in line:
-            in_languages = True
-            continue
-        if in_languages:
-            if ')' in line:
-                break
-            if '"' in line or "'" in line:
-                lang = line.strip().strip('",')
-                if lang:
-                    languages.append(lang)
-    
+
+    # The LANGUAGES tuple, parsed when the file was indexed
+    languages = index.languages(data_prep_path)
+
     print(f"📊 Total languages: {len(languages)}")
     print("📋 Sample languages:")
     for i, lang in enumerate(languages[:10]):
@@ -53,24 +41,19 @@ def analyze_data_prep_structure():
     print("-" * 40)
     
     functions = []
-    for i, line in enumerate(lines):
-        if line.strip().startswith('def '):
-            func_name = line.strip().split('def ')[1].split('(')[0]
-            functions.append(func_name)
-            # Get function purpose from docstring or comments
-            for j in range(i+1, min(i+5, len(lines))):
-                if '"""' in lines[j] or "'''" in lines[j] or '#' in lines[j]:
-                    doc_line = lines[j].strip()
-                    if doc_line and not doc_line.startswith('def '):
-                        print(f"   📝 {func_name}: {doc_line}")
-                        break
-            else:
-                print(f"   📝 {func_name}")
+    for func_name, _, doc_line in index.functions(data_prep_path):
+        functions.append(func_name)
+        # Function purpose from its docstring or comments
+        if doc_line:
+            print(f"   📝 {func_name}: {doc_line}")
+        else:
+            print(f"   📝 {func_name}")
     
     # 3. Look for FIELDWORK dataset structure
     print("\n📚 FIELDWORK DATASET STRUCTURE:")
     print("-" * 40)
     
+    lines = content.splitlines()
     fieldwork_refs = [line for line in lines if 'fieldwork' in line.lower()]
     if fieldwork_refs:
         for ref in fieldwork_refs[:10]:
@@ -171,15 +154,16 @@ def check_current_data_structure():
     # Check if there's a data directory or sample data
     base_path = Path(r"C:\CRF\espnet-wav2gloss\espnet-wav2gloss\egs2\wav2gloss")
     
-    data_dirs = list(base_path.rglob("data*")) + list(base_path.rglob("*fieldwork*"))
+    index = open_index(base_path)
+    data_dirs = index.rglob("data*", base_path) + index.rglob("*fieldwork*", base_path) if index else []
     
     if data_dirs:
         print("✅ Found potential data directories:")
         for dir_path in data_dirs[:5]:
-            if dir_path.is_dir():
+            if index.is_dir(dir_path):
                 print(f"   📁 {dir_path.relative_to(base_path)}")
                 try:
-                    items = list(dir_path.iterdir())[:3]
+                    items = index.iterdir(dir_path)[:3]
                     for item in items:
                         print(f"      └── {item.name}")
                 except:
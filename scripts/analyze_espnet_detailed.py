@@ -8,6 +8,8 @@ import glob
 import json
 from pathlib import Path
 
+from recipe_index import open_index
+
 def find_real_espnet_structure(base_path):
     """Find the actual ESPNet project structure"""
     print("=" * 60)
@@ -16,22 +18,23 @@ def find_real_espnet_structure(base_path):
     
     base_path = Path(base_path)
     espnet_path = base_path / "espnet-wav2gloss"
+    index = open_index(base_path)
     
     print("🔍 Exploring nested structure...")
     
     # Check what's inside espnet-wav2gloss
-    nested_items = list(espnet_path.iterdir())
+    nested_items = index.iterdir(espnet_path)
     print(f"\n📁 Contents of 'espnet-wav2gloss':")
     print("-" * 40)
     
     for item in nested_items:
-        if item.is_dir():
+        if index.is_dir(item):
             print(f"📁 {item.name}/")
             # Show first few items in subdirectories
             try:
-                sub_items = list(item.iterdir())[:3]
+                sub_items = index.iterdir(item)[:3]
                 for sub_item in sub_items:
-                    item_type = "📁" if sub_item.is_dir() else "📄"
+                    item_type = "📁" if index.is_dir(sub_item) else "📄"
                     print(f"   └── {item_type} {sub_item.name}")
             except Exception as e:
                 print(f"   └── (Error reading: {e})")
@@ -48,19 +51,19 @@ def find_real_espnet_structure(base_path):
     
     actual_path = None
     for path in possible_paths:
-        if path.exists():
+        if index.exists(path):
             actual_path = path
             print(f"\n✅ Found actual project at: {path}")
             break
     
     if actual_path:
-        return analyze_actual_espnet(actual_path)
+        return analyze_actual_espnet(actual_path, index)
     else:
         print("\n❌ Could not find standard ESPNet structure")
         print("Let's explore all subdirectories to find the real project...")
-        return explore_all_subdirectories(espnet_path)
+        return explore_all_subdirectories(espnet_path, index)
 
-def explore_all_subdirectories(project_path):
+def explore_all_subdirectories(project_path, index):
     """Explore all subdirectories to find the real project structure"""
     print("\n" + "=" * 60)
     print("DEEP EXPLORATION OF ALL SUBDIRECTORIES")
@@ -71,7 +74,7 @@ def explore_all_subdirectories(project_path):
     
     found_dirs = {}
     for target in target_dirs:
-        matches = list(project_path.rglob(target))
+        matches = index.rglob(target, project_path)
         if matches:
             found_dirs[target] = matches
             print(f"✅ Found '{target}':")
@@ -79,14 +82,14 @@ def explore_all_subdirectories(project_path):
                 print(f"   - {match.relative_to(project_path)}")
     
     # Also look for any README files to understand the structure
-    readme_files = list(project_path.rglob("README*"))
+    readme_files = index.rglob("README*", project_path)
     print(f"\n📚 README files found: {len(readme_files)}")
     for readme in readme_files[:3]:  # Show first 3 READMEs
         print(f"   - {readme.relative_to(project_path)}")
     
     return found_dirs
 
-def analyze_actual_espnet(project_path):
+def analyze_actual_espnet(project_path, index):
     """Analyze the actual ESPNet project structure"""
     print("\n" + "=" * 60)
     print("ANALYZING ACTUAL ESPNET STRUCTURE")
@@ -98,9 +101,9 @@ def analyze_actual_espnet(project_path):
     print("\n📋 MAIN DIRECTORY CONTENTS:")
     print("-" * 40)
     
-    items = list(project_path.iterdir())
-    for item in sorted(items, key=lambda x: (x.is_file(), x.name)):
-        if item.is_dir():
+    items = index.iterdir(project_path)
+    for item in sorted(items, key=lambda x: (not index.is_dir(x), x.name)):
+        if index.is_dir(item):
             print(f"📁 {item.name}/")
         else:
             print(f"📄 {item.name}")
@@ -112,18 +115,18 @@ def analyze_actual_espnet(project_path):
     # Search for wav2gloss related files
     wav2gloss_patterns = ["*wav2gloss*", "*fieldwork*", "*gloss*"]
     for pattern in wav2gloss_patterns:
-        matches = list(project_path.rglob(pattern))
+        matches = index.rglob(pattern, project_path)
         if matches:
             print(f"✅ Found '{pattern}':")
             for match in matches[:5]:  # Show first 5 matches
                 print(f"   - {match.relative_to(project_path)}")
     
     # Check for recipe directories (common in ESPNet)
-    recipe_dirs = list(project_path.rglob("egs2/*")) + list(project_path.rglob("egs/*"))
+    recipe_dirs = index.rglob("egs2/*", project_path) + index.rglob("egs/*", project_path)
     if recipe_dirs:
         print(f"\n🍳 Recipe directories found: {len(recipe_dirs)}")
         for recipe in recipe_dirs[:5]:  # Show first 5 recipes
-            if recipe.is_dir():
+            if index.is_dir(recipe):
                 print(f"   - {recipe.relative_to(project_path)}")
     
     return True
@@ -134,7 +137,8 @@ def check_readme_for_instructions(project_path):
     print("READING README FOR INSTRUCTIONS")
     print("=" * 60)
     
-    readme_files = list(project_path.rglob("README*"))
+    index = open_index(project_path)
+    readme_files = index.rglob("README*", project_path) if index else []
     
     if not readme_files:
         print("❌ No README files found")
@@ -147,11 +151,11 @@ def check_readme_for_instructions(project_path):
             main_readme = readme
             break
     
-    if main_readme and main_readme.exists():
+    if main_readme and index.exists(main_readme):
         print(f"📖 Reading: {main_readme.relative_to(project_path)}")
         try:
-            with open(main_readme, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = index.read_text(main_readme)
+            if content is not None:
                 # Extract key sections
                 lines = content.split('\n')
                 print("\n🔍 Key sections found:")
@@ -9,6 +9,8 @@ import glob
 import json
 from pathlib import Path
 
+from recipe_index import open_index
+
 def analyze_all_projects(base_path):
     """Analyze all three projects structure"""
     print("=" * 60)
@@ -16,6 +18,7 @@ def analyze_all_projects(base_path):
     print("=" * 60)
     
     base_path = Path(base_path)
+    index = open_index(base_path)
     
     projects = {
         "espnet-wav2gloss": "Main ESPNet implementation (end-to-end models)",
@@ -31,8 +34,8 @@ def analyze_all_projects(base_path):
         if project_path.exists():
             print(f"✅ {project}: {description}")
             # Count main file types
-            py_files = list(project_path.rglob("*.py"))
-            yaml_files = list(project_path.rglob("*.yaml")) + list(project_path.rglob("*.yml"))
+            py_files = index.rglob("*.py", project_path)
+            yaml_files = index.rglob("*.yaml", project_path) + index.rglob("*.yml", project_path)
             print(f"   └── Python: {len(py_files)} files, Config: {len(yaml_files)} files")
         else:
             print(f"❌ {project}: NOT FOUND")
@@ -51,6 +54,7 @@ def analyze_espnet_structure(project_path):
     if not project_path.exists():
         print(f"❌ Error: Path {project_path} does not exist!")
         return False
+    index = open_index(project_path)
     
     print(f"📁 Project location: {project_path}")
     print(f"🔍 Analyzing structure...\n")
@@ -58,9 +62,9 @@ def analyze_espnet_structure(project_path):
     # 2. List main directory contents
     print("📋 MAIN DIRECTORY CONTENTS:")
     print("-" * 40)
-    items = list(project_path.iterdir())
-    for item in sorted(items, key=lambda x: (x.is_file(), x.name)):
-        if item.is_dir():
+    items = index.iterdir(project_path)
+    for item in sorted(items, key=lambda x: (not index.is_dir(x), x.name)):
+        if index.is_dir(item):
             print(f"📁 {item.name}/")
         else:
             print(f"📄 {item.name}")
@@ -81,11 +85,11 @@ def analyze_espnet_structure(project_path):
     for category, patterns in key_files.items():
         found_files[category] = []
         for pattern in patterns:
-            matches = list(project_path.glob(pattern))
+            matches = index.glob(pattern, project_path)
             found_files[category].extend(matches)
             
             # Also check first level of subdirectories
-            subdir_matches = list(project_path.glob(f"*/{pattern}"))
+            subdir_matches = index.glob(f"*/{pattern}", project_path)
             found_files[category].extend(subdir_matches)
     
     # Display found files
@@ -110,13 +114,13 @@ def analyze_espnet_structure(project_path):
     
     for dir_name in wav2gloss_dirs:
         dir_path = project_path / dir_name
-        if dir_path.exists():
+        if index.exists(dir_path):
             print(f"✅ Found: {dir_name}/")
             # Show first few items in this directory
             try:
-                items = list(dir_path.iterdir())[:3]  # Show only first 3
+                items = index.iterdir(dir_path)[:3]  # Show only first 3
                 for item in items:
-                    item_type = "📁" if item.is_dir() else "📄"
+                    item_type = "📁" if index.is_dir(item) else "📄"
                     print(f"   {item_type} {item.name}")
             except Exception as e:
                 print(f"   └── (Error reading: {e})")
@@ -131,17 +135,13 @@ def analyze_espnet_structure(project_path):
     found_languages = []
     
     # Search in configuration files
-    config_files = list(project_path.rglob("*.yaml")) + list(project_path.rglob("*.yml"))
+    config_files = index.rglob("*.yaml", project_path) + index.rglob("*.yml", project_path)
     
     for config_file in config_files[:5]:  # Check first 5 config files
-        try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                content = f.read().lower()
-                for lang in iranian_languages:
-                    if lang in content:
-                        found_languages.append((lang, config_file.relative_to(project_path)))
-        except Exception as e:
-            pass
+        content = (index.read_text(config_file) or "").lower()
+        for lang in iranian_languages:
+            if lang in content:
+                found_languages.append((lang, config_file.relative_to(project_path)))
     
     if found_languages:
         print("✅ Found references to Iranian languages:")
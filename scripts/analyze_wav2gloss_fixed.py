@@ -6,6 +6,8 @@ Step 3-4: Complete analysis with environment setup plan
 import os
 from pathlib import Path
 
+from recipe_index import open_index
+
 def analyze_wav2gloss_structure(recipe_path):
     """Analyze the WAV2GLOSS recipe structure"""
     print("=" * 60)
@@ -17,6 +19,7 @@ def analyze_wav2gloss_structure(recipe_path):
     if not recipe_path.exists():
         print(f"❌ WAV2GLOSS recipe not found at: {recipe_path}")
         return False
+    index = open_index(recipe_path)
     
     print(f"📁 Recipe location: {recipe_path}")
     print("🔍 Note: This appears to be only ASR implementation")
@@ -26,9 +29,9 @@ def analyze_wav2gloss_structure(recipe_path):
     print("📋 MAIN RECIPE STRUCTURE:")
     print("-" * 40)
     
-    items = list(recipe_path.iterdir())
-    for item in sorted(items, key=lambda x: (x.is_file(), x.name)):
-        if item.is_dir():
+    items = index.iterdir(recipe_path)
+    for item in sorted(items, key=lambda x: (not index.is_dir(x), x.name)):
+        if index.is_dir(item):
             print(f"📁 {item.name}/")
         else:
             print(f"📄 {item.name}")
@@ -43,25 +46,25 @@ def analyze_data_preparation(recipe_path):
     
     recipe_path = Path(recipe_path)
     local_path = recipe_path / "asr1" / "local"
+    index = open_index(recipe_path)
     
-    if local_path.exists():
+    if index and index.exists(local_path):
         print("✅ Found local data preparation directory:")
-        local_files = list(local_path.iterdir())
+        local_files = index.iterdir(local_path)
         for file in local_files:
             print(f"   📄 {file.name}")
             
             # Read data preparation scripts
             if file.name in ["data.sh", "data_prep.py"]:
-                try:
-                    with open(file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        lines = content.split('\n')
-                        print(f"      First 10 lines of {file.name}:")
-                        for i, line in enumerate(lines[:10]):
-                            if line.strip() and not line.strip().startswith('#'):
-                                print(f"        {i+1}: {line.strip()}")
-                except Exception as e:
-                    print(f"      Error reading: {e}")
+                content = index.read_text(file)
+                if content is None:
+                    print(f"      Error reading: {file.name} is not indexed as text")
+                    continue
+                lines = content.split('\n')
+                print(f"      First 10 lines of {file.name}:")
+                for i, line in enumerate(lines[:10]):
+                    if line.strip() and not line.strip().startswith('#'):
+                        print(f"        {i+1}: {line.strip()}")
     else:
         print("❌ No local data preparation directory found")
 
@@ -73,36 +76,33 @@ def analyze_configurations(recipe_path):
     
     recipe_path = Path(recipe_path)
     conf_path = recipe_path / "asr1" / "conf"
+    index = open_index(recipe_path)
     
-    if conf_path.exists():
+    if index and index.exists(conf_path):
         print("✅ Found configuration directory:")
         
         # Main conf files
-        conf_files = list(conf_path.iterdir())
+        conf_files = index.iterdir(conf_path)
         for file in conf_files:
-            if file.is_file():
+            if not index.is_dir(file):
                 print(f"   📄 {file.name}")
         
         # Tuning configurations
         tuning_path = conf_path / "tuning"
-        if tuning_path.exists():
+        if index.exists(tuning_path):
             print(f"\n   🎛️  Tuning configurations:")
-            tuning_files = list(tuning_path.glob("*.yaml"))
+            tuning_files = index.glob("*.yaml", tuning_path)
             for file in tuning_files:
                 print(f"      📄 {file.name}")
                 
                 # Read config to understand model architecture
-                try:
-                    with open(file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        if 'transformer' in content.lower() or 'conformer' in content.lower():
-                            print(f"        └── Contains transformer/conformer architecture")
-                        if 'xls' in content.lower() or 'wavlm' in content.lower():
-                            print(f"        └── Uses pre-trained model: {file.name}")
-                        if 'lang' in content.lower():
-                            print(f"        └── Contains language settings")
-                except:
-                    pass
+                content = (index.read_text(file) or "").lower()
+                if 'transformer' in content or 'conformer' in content:
+                    print(f"        └── Contains transformer/conformer architecture")
+                if 'xls' in content or 'wavlm' in content:
+                    print(f"        └── Uses pre-trained model: {file.name}")
+                if 'lang' in content:
+                    print(f"        └── Contains language settings")
 
 def analyze_training_script(recipe_path):
     """Analyze the main training script"""
@@ -112,12 +112,13 @@ def analyze_training_script(recipe_path):
     
     recipe_path = Path(recipe_path)
     run_script = recipe_path / "asr1" / "run.sh"
+    index = open_index(recipe_path)
     
-    if run_script.exists():
+    if index and index.exists(run_script):
         print("✅ Found main training script: run.sh")
         try:
-            with open(run_script, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = index.read_text(run_script)
+            if content is not None:
                 lines = content.split('\n')
                 
                 # Extract key information
@@ -149,13 +150,13 @@ def check_data_prep_script(recipe_path):
     
     recipe_path = Path(recipe_path)
     data_prep_file = recipe_path / "asr1" / "local" / "data_prep.py"
+    index = open_index(recipe_path)
     
-    if data_prep_file.exists():
+    if index and index.exists(data_prep_file):
         print("✅ Found data_prep.py - This is CRITICAL for Iranian languages")
         try:
-            with open(data_prep_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
+            content = index.read_text(data_prep_file)
+            if content is not None:
                 # Look for key functions and structure
                 print("🔍 Key components found:")
                 
@@ -172,12 +173,7 @@ def check_data_prep_script(recipe_path):
                         print(f"      {imp.strip()}")
                         
                 # Show function definitions
-                lines = content.split('\n')
-                functions = []
-                for i, line in enumerate(lines):
-                    if line.strip().startswith('def '):
-                        func_name = line.strip().split('def ')[1].split('(')[0]
-                        functions.append(func_name)
+                functions = [name for name, _, _ in index.functions(data_prep_file)]
                 
                 if functions:
                     print(f"   🔧 Functions: {', '.join(functions)}")
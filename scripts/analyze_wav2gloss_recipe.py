@@ -7,6 +7,8 @@ import os
 import yaml
 from pathlib import Path
 
+from recipe_index import open_index
+
 def analyze_wav2gloss_recipe(recipe_path):
     """Analyze the WAV2GLOSS recipe structure"""
     print("=" * 60)
@@ -18,6 +20,7 @@ def analyze_wav2gloss_recipe(recipe_path):
     if not recipe_path.exists():
         print(f"❌ WAV2GLOSS recipe not found at: {recipe_path}")
         return False
+    index = open_index(recipe_path)
     
     print(f"📁 Recipe location: {recipe_path}")
     print(f"🔍 Analyzing WAV2GLOSS implementation...\n")
@@ -26,16 +29,16 @@ def analyze_wav2gloss_recipe(recipe_path):
     print("📋 RECIPE DIRECTORY STRUCTURE:")
     print("-" * 40)
     
-    items = list(recipe_path.iterdir())
-    for item in sorted(items, key=lambda x: (x.is_file(), x.name)):
-        if item.is_dir():
+    items = index.iterdir(recipe_path)
+    for item in sorted(items, key=lambda x: (not index.is_dir(x), x.name)):
+        if index.is_dir(item):
             print(f"📁 {item.name}/")
             # Show contents of important subdirectories
             if item.name in ["asr1", "gloss1", "translation1", "local", "scripts"]:
                 try:
-                    sub_items = list(item.iterdir())[:5]
+                    sub_items = index.iterdir(item)[:5]
                     for sub_item in sub_items:
-                        item_type = "📁" if sub_item.is_dir() else "📄"
+                        item_type = "📁" if index.is_dir(sub_item) else "📄"
                         print(f"   └── {item_type} {sub_item.name}")
                 except Exception as e:
                     print(f"   └── (Error reading: {e})")
@@ -46,7 +49,7 @@ def analyze_wav2gloss_recipe(recipe_path):
     print("\n🔧 CONFIGURATION FILES:")
     print("-" * 40)
     
-    config_files = list(recipe_path.rglob("*.yaml")) + list(recipe_path.rglob("*.yml"))
+    config_files = index.rglob("*.yaml", recipe_path) + index.rglob("*.yml", recipe_path)
     for config_file in config_files[:10]:  # Show first 10 configs
         print(f"   - {config_file.relative_to(recipe_path)}")
     
@@ -54,7 +57,7 @@ def analyze_wav2gloss_recipe(recipe_path):
     print("\n📊 DATA PREPARATION SCRIPTS:")
     print("-" * 40)
     
-    data_scripts = list(recipe_path.rglob("*data*.sh")) + list(recipe_path.rglob("*prep*.sh"))
+    data_scripts = index.rglob("*data*.sh", recipe_path) + index.rglob("*prep*.sh", recipe_path)
     for script in data_scripts:
         print(f"   - {script.relative_to(recipe_path)}")
     
@@ -62,7 +65,7 @@ def analyze_wav2gloss_recipe(recipe_path):
     print("\n🚀 TRAINING SCRIPTS:")
     print("-" * 40)
     
-    train_scripts = list(recipe_path.rglob("*train*.sh")) + list(recipe_path.rglob("*run*.sh"))
+    train_scripts = index.rglob("*train*.sh", recipe_path) + index.rglob("*run*.sh", recipe_path)
     for script in train_scripts:
         print(f"   - {script.relative_to(recipe_path)}")
     
@@ -71,19 +74,16 @@ def analyze_wav2gloss_recipe(recipe_path):
     print("-" * 40)
     
     # Look in config files for language settings
+    lang_lines = {}
+    for path, _, line in index.grep("lang", config_files[:5], ignore_case=True):
+        lang_lines.setdefault(path, []).append(line)
     for config_file in config_files[:5]:
-        try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if 'lang' in content.lower() or 'language' in content.lower():
-                    print(f"   📄 {config_file.relative_to(recipe_path)}")
-                    # Extract language related lines
-                    lines = content.split('\n')
-                    for line in lines:
-                        if 'lang' in line.lower() and len(line.strip()) < 100:
-                            print(f"      └── {line.strip()}")
-        except Exception as e:
-            pass
+        if config_file in lang_lines:
+            print(f"   📄 {config_file.relative_to(recipe_path)}")
+            # Extract language related lines
+            for line in lang_lines[config_file]:
+                if len(line.strip()) < 100:
+                    print(f"      └── {line.strip()}")
     
     return True
 
@@ -95,12 +95,14 @@ def analyze_implementation_details(recipe_path):
     
     # Look for how new languages are added
     print("🔍 Searching for language addition patterns...")
+    recipe_path = Path(recipe_path)
+    index = open_index(recipe_path)
     
     # Check local data preparation scripts
     local_dir = recipe_path / "local"
-    if local_dir.exists():
+    if index.exists(local_dir):
         print(f"\n📝 Local data scripts:")
-        local_scripts = list(local_dir.rglob("*.sh")) + list(local_dir.rglob("*.py"))
+        local_scripts = index.rglob("*.sh", local_dir) + index.rglob("*.py", local_dir)
         for script in local_scripts:
             print(f"   - {script.relative_to(recipe_path)}")
     
@@ -111,10 +113,10 @@ def analyze_implementation_details(recipe_path):
     task_dirs = ["asr1", "gloss1", "translation1"]
     for task_dir in task_dirs:
         task_path = recipe_path / task_dir
-        if task_path.exists():
+        if index.exists(task_path):
             print(f"\n✅ Found task directory: {task_dir}")
             # Look for config files in this task
-            configs = list(task_path.rglob("*.yaml"))
+            configs = index.rglob("*.yaml", task_path)
             if configs:
                 print(f"   Configurations:")
                 for config in configs[:3]:
@@ -122,7 +124,7 @@ def analyze_implementation_details(recipe_path):
     
     # Check for FIELDWORK dataset handling
     print(f"\n📚 FIELDWORK dataset integration:")
-    fieldwork_refs = list(recipe_path.rglob("*fieldwork*"))
+    fieldwork_refs = index.rglob("*fieldwork*", recipe_path)
     if fieldwork_refs:
         for ref in fieldwork_refs:
             print(f"   - {ref.relative_to(recipe_path)}")
@@ -152,11 +154,13 @@ def generate_iranian_language_plan(recipe_path):
         print(f"   {step}")
     
     print(f"\n📋 Key directories to focus on:")
+    recipe_path = Path(recipe_path)
+    index = open_index(recipe_path)
     key_dirs = ["local", "asr1", "gloss1", "scripts"]
     for dir_name in key_dirs:
         dir_path = recipe_path / dir_name
-        if dir_path.exists():
-            print(f"   ✅ {dir_name}/ - {len(list(dir_path.iterdir()))} items")
+        if index.exists(dir_path):
+            print(f"   ✅ {dir_name}/ - {len(index.iterdir(dir_path))} items")
         else:
             print(f"   ❌ {dir_name}/ - Not found")
 
@@ -167,18 +171,17 @@ def check_dependencies(recipe_path):
     print("=" * 60)
     
     # Look for requirements files
-    req_files = list(recipe_path.rglob("requirements*.txt")) + list(recipe_path.rglob("environment*.yml"))
+    recipe_path = Path(recipe_path)
+    index = open_index(recipe_path)
+    req_files = index.rglob("requirements*.txt", recipe_path) + index.rglob("environment*.yml", recipe_path)
     
     if req_files:
         print("✅ Found dependency files:")
         for req_file in req_files:
             print(f"   - {req_file.relative_to(recipe_path)}")
-            try:
-                with open(req_file, 'r') as f:
-                    lines = f.readlines()
-                    print(f"      Contains {len(lines)} dependency lines")
-            except:
-                pass
+            content = index.read_text(req_file)
+            if content is not None:
+                print(f"      Contains {len(content.splitlines())} dependency lines")
     else:
         print("❌ No specific dependency files found in recipe")
         print("   Will use main ESPNet requirements")
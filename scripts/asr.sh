@@ -9,6 +9,14 @@ set -o pipefail
 log() {
     local fname=${BASH_SOURCE[1]##*/}
     echo -e "$(date '+%Y-%m-%dT%H:%M:%S') (${fname}:${BASH_LINENO[0]}:${FUNCNAME[1]}) $*"
+    # "Stage N: ..." messages delimit the stages of the resource ledger (--stage_ledger)
+    if [ -n "${ledger_file:-}" ] && [[ "$*" =~ ^Stage\ ([0-9]+): ]]; then
+        ledger_mark "${BASH_REMATCH[1]}"
+    fi
+}
+ledger_mark() {
+    export STAGE_LEDGER_STAGE="$1"
+    ${python} "${local_scripts}"/stage_ledger.py mark --ledger "${ledger_file}" --stage "$1" --pid $$ "${@:2}"
 }
 min() {
   local a b
@@ -31,6 +39,9 @@ skip_data_prep=false    # Skip data preparation stages.
 skip_train=false        # Skip training stages.
 skip_eval=false         # Skip decoding and evaluation stages.
 skip_packing=true       # Skip the packing stage.
+pack_int8=false         # Also pack an int8 dynamically quantized model for CPU inference.
+int8_max_cer_increase=0.5 # Reject the int8 model if its valid CER is this many points above the float model.
+int8_guard_utts=200     # Number of valid utterances decoded for the int8 accuracy guard.
 skip_upload_hf=true     # Skip uploading to huggingface stage.
 eval_valid_set=false    # Run decoding for the validation set
 ngpu=1                  # The number of gpus ("0" uses cpu, otherwise use gpu).
@@ -41,6 +52,9 @@ gpu_inference=false     # Whether to perform gpu decoding.
 dumpdir=dump            # Directory to dump features.
 expdir=exp              # Directory to save experiments.
 python=python3          # Specify python to execute espnet commands.
+local_scripts=local     # Directory holding the Kurdish helper scripts (scripts/ of this repository).
+stage_ledger=false      # Record per-stage and per-job time, peak RSS and I/O in ${expdir}/ledger/<run>.jsonl.
+print_paths=false       # Print the resolved data/experiment paths and skipped stages, then exit.
 
 # Data preparation related
 local_data_opts= # The options given to local/data.sh.
@@ -50,14 +64,22 @@ auxiliary_data_tags= # the names of training data for auxiliary tasks
 # Speed perturbation related
 speed_perturb_factors=  # perturbation factors, e.g. "0.9 1.0 1.1" (separated by space).
 
+# Noise/reverberation augmentation related
+augment_copies=0  # Augmented copies of each training utterance added in stage 2 (augment_audio.py).
+noise_bank=       # Noise bank prefix written by "augment_audio.py bank --kind noise".
+rir_bank=         # RIR bank prefix written by "augment_audio.py bank --kind rir".
+augment_args=     # Extra options of "augment_audio.py augment", e.g. "--snr_low 5 --rir_prob 0.3".
+
 # Feature extraction related
 feats_type=raw       # Feature type (raw, raw_copy, fbank_pitch, or extracted).
 audio_format=flac    # Audio format: wav, flac, wav.ark, flac.ark  (only in feats_type=raw).
+compress_audio=none  # Re-encode the Stage 3 dump with compress_audio.py: none, flac, flac.ark or auto (chosen per set).
 multi_columns_input_wav_scp=false  # Enable multi columns mode for input wav.scp for format_wav_scp.py
 multi_columns_output_wav_scp=false # Enable multi columns mode for output wav.scp for format_wav_scp.py
 fs=16k               # Sampling rate.
 min_wav_duration=0.1 # Minimum duration in second.
 max_wav_duration=20  # Maximum duration in second.
+utt_exclude_list=    # Utterances to drop in stage 4, e.g. exclude_utts from profile_dataset.py.
 
 # Tokenization related
 token_type=bpe      # Tokenization type (char or bpe).
@@ -69,12 +91,18 @@ sos_eos="<sos/eos>" # sos and eos symbole
 bpe_input_sentence_size=100000000 # Size of input sentence for BPE.
 bpe_nlsyms=         # non-linguistic symbols list, separated by a comma or a file containing 1 symbol per line, for BPE
 bpe_char_cover=1.0  # character coverage when modeling BPE
+parallel_token_list=false # Build the token_list with build_token_list.py (parallel counts, sampled BPE text).
+bpe_sample_lines=1000000  # Lines sampled for BPE training when parallel_token_list=true.
 hugging_face_model_name_or_path="" # Hugging Face model or path for hugging_face tokenizer
 
 # Ngram model related
 use_ngram=false
 ngram_exp=
 ngram_num=3
+use_char_ngram=false    # Train the in-process array n-gram LM (char_ngram_lm.py) in stage 9 and fuse it in decoding.
+char_ngram_exp=         # Specify the directory path for the array n-gram LM.
+char_ngram_order=6      # Order of the array n-gram LM.
+char_ngram_weight=0.3   # Shallow fusion weight of the array n-gram LM.
 
 # Language model related
 use_lm=true       # Use language model for ASR decoding.
@@ -132,6 +160,15 @@ use_maskctc=false # Whether to use maskctc decoding
 
 use_text_prev=false # Whether to use the prefix text prompt
 
+use_local_inference=false # Decode with kurdish_asr_inference.py instead of espnet2.bin.asr_inference
+lm_prefix_cache_size=0    # Cache LM states of up to this many token prefixes across the utterances of a decoding job (0 disables).
+share_encoder_cache=false # Reuse encoder outputs across test sets over the same audio (e.g. the 4 w2g tasks), kept until the model changes.
+inference_scheduler=runpl # Decoding job scheduling: runpl (static key splits) or queue (shared work queue, plain asr decoding only).
+profile_decoding=false    # Record per-utterance RTF and component latencies of decoding (profile.*.jsonl).
+inference_int8=false      # Decode with the int8 dynamically quantized model written by stage 14 (pack_int8).
+scoring_backend=sclite    # Scoring in stage 13: sclite or python (score_asr.py, single reference only).
+kurdish_text_norm=false   # Normalize Kurdish spelling of references and hypotheses before scoring.
+
 batch_size=1
 inference_tag=    # Suffix to the result dir for decoding.
 inference_config= # Config for decoding.
@@ -146,6 +183,10 @@ inference_asr_model=valid.acc.ave.pth # ASR model path for decoding.
                                       # inference_asr_model=valid.acc.best.pth
                                       # inference_asr_model=valid.loss.ave.pth
 download_model= # Download a model from Model Zoo and use it for decoding.
+use_decode_cache=false      # Serve unchanged utterances from a persistent decoding result cache.
+decode_cache_dir=           # Directory of the decoding cache (default: ${expdir}/decode_cache).
+decode_cache_max_entries=1000000 # Maximum number of cached utterance results.
+decode_cache_max_mb=2048    # Maximum size of the cached results in MB.
 
 # [Task dependent] Set the datadir name created by local/data.sh
 train_set=       # Name of training set.
@@ -178,6 +219,9 @@ Options:
     --skip_train         # Skip training stages (default="${skip_train}").
     --skip_eval          # Skip decoding and evaluation stages (default="${skip_eval}").
     --skip_packing       # Skip the packing stage (default="${skip_packing}").
+    --pack_int8          # Also pack an int8 dynamically quantized model for CPU inference (default="${pack_int8}").
+    --int8_max_cer_increase # Maximum valid CER increase of the int8 model in points (default="${int8_max_cer_increase}").
+    --int8_guard_utts    # Number of valid utterances decoded for the int8 accuracy guard (default="${int8_guard_utts}").
     --skip_upload_hf     # Skip uploading to huggingface stage (default="${skip_upload_hf}").
     --eval_valid_set     # Run decoding for the validation set (default="${eval_valid_set}").
     --ngpu               # The number of gpus ("0" uses cpu, otherwise use gpu, default="${ngpu}").
@@ -188,6 +232,9 @@ Options:
     --dumpdir            # Directory to dump features (default="${dumpdir}").
     --expdir             # Directory to save experiments (default="${expdir}").
     --python             # Specify python to execute espnet commands (default="${python}").
+    --local_scripts      # Directory holding the Kurdish helper scripts (default="${local_scripts}").
+    --stage_ledger       # Record per-stage and per-job time, peak RSS and I/O in \${expdir}/ledger (default="${stage_ledger}").
+    --print_paths        # Print the resolved data/experiment paths and skipped stages, then exit (default="${print_paths}").
 
     # Data preparation related
     --local_data_opts # The options given to local/data.sh (default="${local_data_opts}").
@@ -195,12 +242,20 @@ Options:
     # Speed perturbation related
     --speed_perturb_factors # speed perturbation factors, e.g. "0.9 1.0 1.1" (separated by space, default="${speed_perturb_factors}").
 
+    # Noise/reverberation augmentation related
+    --augment_copies # Augmented copies of each training utterance added in stage 2 (default="${augment_copies}").
+    --noise_bank     # Noise bank prefix written by "augment_audio.py bank --kind noise" (default="${noise_bank}").
+    --rir_bank       # RIR bank prefix written by "augment_audio.py bank --kind rir" (default="${rir_bank}").
+    --augment_args   # Extra options of "augment_audio.py augment" (default="${augment_args}").
+
     # Feature extraction related
     --feats_type       # Feature type (raw, raw_copy, fbank_pitch or extracted, default="${feats_type}").
     --audio_format     # Audio format: wav, flac, wav.ark, flac.ark  (only in feats_type=raw or raw_copy, default="${audio_format}").
+    --compress_audio   # Re-encode the Stage 3 dump with compress_audio.py: none, flac, flac.ark or auto (default="${compress_audio}").
     --fs               # Sampling rate (default="${fs}").
     --min_wav_duration # Minimum duration in second (default="${min_wav_duration}").
     --max_wav_duration # Maximum duration in second (default="${max_wav_duration}").
+    --utt_exclude_list # Utterances to drop in stage 4, e.g. exclude_utts from profile_dataset.py (default="${utt_exclude_list}").
 
     # Tokenization related
     --token_type              # Tokenization type (char or bpe, default="${token_type}").
@@ -212,6 +267,8 @@ Options:
     --bpe_input_sentence_size # Size of input sentence for BPE (default="${bpe_input_sentence_size}").
     --bpe_nlsyms              # Non-linguistic symbol list for sentencepiece, separated by a comma or a file containing 1 symbol per line . (default="${bpe_nlsyms}").
     --bpe_char_cover          # Character coverage when modeling BPE (default="${bpe_char_cover}").
+    --parallel_token_list     # Build the token_list with build_token_list.py (default="${parallel_token_list}").
+    --bpe_sample_lines        # Lines sampled for BPE training when parallel_token_list=true (default="${bpe_sample_lines}").
 
     # Language model related
     --lm_tag          # Suffix to the result dir for language model training (default="${lm_tag}").
@@ -261,6 +318,22 @@ Options:
     --use_streaming       # Whether to use streaming decoding (default="${use_streaming}").
     --use_maskctc         # Whether to use maskctc decoding (default="${use_streaming}").
     --use_text_prev       # Whether to use the prefix text prompt (default="${use_text_prev}").
+    --use_local_inference # Decode with kurdish_asr_inference.py instead of espnet2.bin.asr_inference (default="${use_local_inference}").
+    --use_char_ngram      # Train the array n-gram LM in stage 9 and fuse it in decoding (default="${use_char_ngram}").
+    --char_ngram_exp      # Specify the directory path for the array n-gram LM (default="${char_ngram_exp}").
+    --char_ngram_order    # Order of the array n-gram LM (default="${char_ngram_order}").
+    --char_ngram_weight   # Shallow fusion weight of the array n-gram LM (default="${char_ngram_weight}").
+    --lm_prefix_cache_size # Cache LM states of up to this many token prefixes across utterances (default="${lm_prefix_cache_size}").
+    --share_encoder_cache # Reuse encoder outputs across test sets over the same audio (default="${share_encoder_cache}").
+    --inference_scheduler # Decoding job scheduling: runpl or queue, plain asr decoding only (default="${inference_scheduler}").
+    --profile_decoding    # Record per-utterance RTF and component latencies of decoding (default="${profile_decoding}").
+    --inference_int8      # Decode with the int8 dynamically quantized model written by stage 14 (default="${inference_int8}").
+    --scoring_backend     # Scoring in stage 13: sclite or python (default="${scoring_backend}").
+    --kurdish_text_norm   # Normalize Kurdish spelling of references and hypotheses before scoring (default="${kurdish_text_norm}").
+    --use_decode_cache    # Serve unchanged utterances from a persistent decoding result cache (default="${use_decode_cache}").
+    --decode_cache_dir    # Directory of the decoding cache (default="${decode_cache_dir}").
+    --decode_cache_max_entries # Maximum number of cached utterance results (default="${decode_cache_max_entries}").
+    --decode_cache_max_mb # Maximum size of the cached results in MB (default="${decode_cache_max_mb}").
 
     # [Task dependent] Set the datadir name created by local/data.sh
     --train_set     # Name of training set (required).
@@ -297,6 +370,21 @@ fi
 . ./path.sh
 . ./cmd.sh
 
+ledger_job=
+if "${stage_ledger}"; then
+    mkdir -p "${expdir}/ledger"
+    ledger_file="${expdir}/ledger/$(date '+%Y%m%dT%H%M%S')_$$.jsonl"
+    ledger_mark start --command "${run_args}"
+    trap 'ledger_mark end --status $?' EXIT
+    # Every ${cmd} launch goes through the ledger; espnet2.bin.launch needs the bare launcher
+    ledger_job="${python} ${local_scripts}/stage_ledger.py job --ledger ${ledger_file} --"
+    launch_cuda_cmd="${cuda_cmd}"
+    train_cmd="${ledger_job} ${train_cmd}"
+    cuda_cmd="${ledger_job} ${cuda_cmd}"
+    decode_cmd="${ledger_job} ${decode_cmd}"
+    log "Resource ledger: ${ledger_file} (report: ${local_scripts}/stage_ledger.py report ${expdir}/ledger)"
+fi
+
 
 # Check required arguments
 if ! "${skip_train}"; then
@@ -470,6 +558,9 @@ if [ -z "${asr_tag}" ]; then
     if [ -n "${speed_perturb_factors}" ]; then
         asr_tag+="_sp"
     fi
+    if [ "${augment_copies}" -gt 0 ]; then
+        asr_tag+="_aug${augment_copies}"
+    fi
 fi
 if [ -z "${lm_tag}" ]; then
     if [ -n "${lm_config}" ]; then
@@ -507,6 +598,9 @@ if [ -z "${asr_stats_dir}" ]; then
     if [ -n "${speed_perturb_factors}" ]; then
         asr_stats_dir+="_sp"
     fi
+    if [ "${augment_copies}" -gt 0 ]; then
+        asr_stats_dir+="_aug${augment_copies}"
+    fi
 fi
 if [ -z "${lm_stats_dir}" ]; then
     if [ "${lang}" != noinfo ]; then
@@ -528,6 +622,21 @@ fi
 if [ -z "${ngram_exp}" ]; then
     ngram_exp="${expdir}/ngram"
 fi
+if [ -z "${char_ngram_exp}" ]; then
+    char_ngram_exp="${expdir}/char_ngram_${char_ngram_order}"
+fi
+if "${use_char_ngram}" || [ "${lm_prefix_cache_size}" -gt 0 ] || "${share_encoder_cache}" \
+    || [ "${inference_scheduler}" = queue ] || "${profile_decoding}" || "${inference_int8}"; then
+    # These decoding extensions are only available through the local decoding driver
+    use_local_inference=true
+fi
+if "${use_streaming}" && [ -n "${asr_config}" ] && grep -qE "^encoder: *(vgg_)?rnn" "${asr_config}"; then
+    # espnet2.bin.asr_inference_streaming needs block-processing encoders; RNNs stream with streaming_asr.py
+    use_local_inference=true
+fi
+if [ -z "${decode_cache_dir}" ]; then
+    decode_cache_dir="${expdir}/decode_cache"
+fi
 
 
 if [ -z "${inference_tag}" ]; then
@@ -546,7 +655,13 @@ if [ -z "${inference_tag}" ]; then
     if "${use_ngram}"; then
         inference_tag+="_ngram_$(basename "${ngram_exp}")_$(echo "${inference_ngram}" | sed -e "s/\//_/g" -e "s/\.[^.]*$//g")"
     fi
+    if "${use_char_ngram}"; then
+        inference_tag+="_$(basename "${char_ngram_exp}")_weight${char_ngram_weight}"
+    fi
     inference_tag+="_asr_model_$(echo "${inference_asr_model}" | sed -e "s/\//_/g" -e "s/\.[^.]*$//g")"
+    if "${inference_int8}"; then
+        inference_tag+="_int8"
+    fi
 
     if "${use_k2}"; then
       inference_tag+="_use_k2"
@@ -563,7 +678,7 @@ if "${skip_train}"; then
 elif ! "${use_lm}"; then
     skip_stages+="6 7 8 "
 fi
-if ! "${use_ngram}"; then
+if ! "${use_ngram}" && ! "${use_char_ngram}"; then
     skip_stages+="9 "
 fi
 if "${skip_eval}"; then
@@ -579,6 +694,18 @@ fi
 skip_stages=$(echo "${skip_stages}" | tr ' ' '\n' | sort -nu | tr '\n' ' ')
 log "Skipped stages: ${skip_stages}"
 
+if "${print_paths}"; then
+    # Resolved paths for scripts/pipeline_dag.py
+    for _var in expdir data_feats train_set valid_set test_sets eval_valid_set speed_perturb_factors augment_copies \
+            asr_config token_type bpemodel token_list lm_token_list bpe_train_text lm_dev_text lm_test_text ref_text_files \
+            asr_stats_dir lm_stats_dir asr_exp lm_exp ngram_exp char_ngram_exp inference_tag \
+            inference_asr_model inference_lm inference_ngram use_lm use_ngram use_char_ngram \
+            share_encoder_cache skip_stages nj inference_nj ngpu gpu_inference; do
+        echo "asr_sh_path ${_var}=${!_var}"
+    done
+    exit 0
+fi
+
 # ========================== Main stages start from here. ==========================
 
 
@@ -610,11 +737,35 @@ if [ ${stage} -le 2 ] && [ ${stop_stage} -ge 2 ] && ! [[ " ${skip_stages} " =~ [
     else
        log "Skip stage 2: Speed perturbation"
     fi
+    if [ "${augment_copies}" -gt 0 ]; then
+        _src="data/${train_set}"
+        if [ -n "${speed_perturb_factors}" ]; then
+            _src+="_sp"
+        fi
+        if [ -z "${noise_bank}" ] && [ -z "${rir_bank}" ]; then
+            log "Error: --augment_copies needs --noise_bank and/or --rir_bank"
+            exit 1
+        fi
+        log "Stage 2: Noise/reverberation augmentation: ${_src} -> ${_src}_aug${augment_copies}"
+        # shellcheck disable=SC2086
+        ${python} "${local_scripts}"/augment_audio.py augment \
+            --data_dir "${_src}" --out_dir "${_src}_aug${augment_copies}_copies" \
+            --copies "${augment_copies}" --nj "${nj}" \
+            ${noise_bank:+--noise_bank "${noise_bank}"} ${rir_bank:+--rir_bank "${rir_bank}"} \
+            ${augment_args}
+        utils/fix_data_dir.sh "${_src}_aug${augment_copies}_copies"
+        utils/combine_data.sh \
+            ${text_files_str:+--extra_files "${text_files_str}"} \
+            "${_src}_aug${augment_copies}" "${_src}" "${_src}_aug${augment_copies}_copies"
+    fi
 fi
 
 if [ -n "${speed_perturb_factors}" ]; then
     train_set="${train_set}_sp"
 fi
+if [ "${augment_copies}" -gt 0 ]; then
+    train_set="${train_set}_aug${augment_copies}"
+fi
 
 if [ ${stage} -le 3 ] && [ ${stop_stage} -ge 3 ] && ! [[ " ${skip_stages} " =~ [[:space:]]3[[:space:]] ]]; then
     if "${skip_train}"; then
@@ -637,6 +788,10 @@ if [ ${stage} -le 3 ] && [ ${stop_stage} -ge 3 ] && ! [[ " ${skip_stages} " =~ [
         # If nothing is need, then format_wav_scp.sh does nothing:
         # i.e. the input file format and rate is same as the output.
 
+        # Data dirs whose wav.scp is a hardlink of an already formatted one (e.g. the
+        # w2g_{transcription,underlying,gloss,translation} sets from convert_kurdish_data.py)
+        # reuse its formatted audio instead of formatting the same recordings again.
+        _formatted=
         for dset in ${_dsets}; do
             if [ "${dset}" = "${train_set}" ] || [ "${dset}" = "${valid_set}" ]; then
                 _suf="/org"
@@ -668,12 +823,27 @@ if [ ${stage} -le 3 ] && [ ${stop_stage} -ge 3 ] && ! [[ " ${skip_stages} " =~ [
                 # Where the time is written in seconds.
                 _opts+="--segments data/${dset}/segments "
             fi
-            # shellcheck disable=SC2086
-            scripts/audio/format_wav_scp.sh --nj "${nj}" --cmd "${train_cmd}" \
-                --audio-format "${audio_format}" --fs "${fs}" ${_opts} \
-                --multi-columns-input "${multi_columns_input_wav_scp}" \
-                --multi-columns-output "${multi_columns_output_wav_scp}" \
-                "data/${dset}/wav.scp" "${data_feats}${_suf}/${dset}"
+            _reused=false
+            _shared=
+            for _prev in ${_formatted}; do
+                if [ "data/${dset}/wav.scp" -ef "${_prev%%:*}" ]; then
+                    _shared="${_prev#*:}"
+                    break
+                fi
+            done
+            if [ -n "${_shared}" ] && [ -z "${_opts}" ]; then
+                log "Reuse the formatted audio of ${_shared} for ${dset}"
+                cp "${_shared}"/{wav.scp,utt2num_samples} "${data_feats}${_suf}/${dset}"
+                _reused=true
+            else
+                # shellcheck disable=SC2086
+                scripts/audio/format_wav_scp.sh --nj "${nj}" --cmd "${train_cmd}" \
+                    --audio-format "${audio_format}" --fs "${fs}" ${_opts} \
+                    --multi-columns-input "${multi_columns_input_wav_scp}" \
+                    --multi-columns-output "${multi_columns_output_wav_scp}" \
+                    "data/${dset}/wav.scp" "${data_feats}${_suf}/${dset}"
+                _formatted+=" data/${dset}/wav.scp:${data_feats}${_suf}/${dset}"
+            fi
 
             echo "${feats_type}" > "${data_feats}${_suf}/${dset}/feats_type"
             if "${multi_columns_output_wav_scp}"; then
@@ -681,6 +851,17 @@ if [ ${stage} -le 3 ] && [ ${stop_stage} -ge 3 ] && ! [[ " ${skip_stages} " =~ [
             else
                 echo "${audio_format}" > "${data_feats}${_suf}/${dset}/audio_format"
             fi
+
+            if "${_reused}"; then
+                # The shared wav.scp already points to the (possibly re-encoded) audio
+                cp "${_shared}/audio_format" "${data_feats}${_suf}/${dset}"
+            elif [ "${compress_audio}" != none ]; then
+                # Parallel re-encoding of the dumped audio; auto measures storage bandwidth
+                # against decode cost and keeps WAV where compression does not pay off
+                ${python} "${local_scripts}"/compress_audio.py transcode \
+                    --data_dir "${data_feats}${_suf}/${dset}" --format "${compress_audio}" \
+                    --nj "${nj}" --remove_source
+            fi
         done
 
     elif [ "${feats_type}" = raw_copy ]; then
@@ -840,6 +1021,9 @@ if [ ${stage} -le 4 ] && [ ${stop_stage} -ge 4 ] && ! [[ " ${skip_stages} " =~ [
         # Copy data dir
         utils/copy_data_dir.sh --validate_opts --non-print "${data_feats}/org/${dset}" "${data_feats}/${dset}"
         cp "${data_feats}/org/${dset}/feats_type" "${data_feats}/${dset}/feats_type"
+        if [ -f "${data_feats}/org/${dset}/audio_format" ]; then
+            cp "${data_feats}/org/${dset}/audio_format" "${data_feats}/${dset}/audio_format"
+        fi
 
         # Remove short utterances
         _feats_type="$(<${data_feats}/${dset}/feats_type)"
@@ -882,6 +1066,19 @@ if [ ${stage} -le 4 ] && [ ${stop_stage} -ge 4 ] && ! [[ " ${skip_stages} " =~ [
                 >"${data_feats}/${dset}/feats.scp"
         fi
 
+        # Remove utterances listed by profile_dataset.py (near-silent, clipped, misaligned, ...)
+        if [ -n "${utt_exclude_list}" ]; then
+            _list_file="${data_feats}/${dset}/wav.scp"
+            [ "${_feats_type}" = raw ] || _list_file="${data_feats}/${dset}/feats.scp"
+            # Speed-perturbed and augmented copies ("sp0.9-<utt_id>", "aug1-sp0.9-<utt_id>") are
+            # removed with their source utterance
+            awk 'NR == FNR { exclude[$1]; next }
+                 { utt = $1; sub(/^(aug[0-9]+-)?(sp[0-9.]+-)?/, "", utt); if (!(utt in exclude)) print $0 }' \
+                "${utt_exclude_list}" "${_list_file}" > "${_list_file}.tmp"
+            log "Exclude $(( $(<"${_list_file}" wc -l) - $(<"${_list_file}.tmp" wc -l) )) utterances of ${dset} listed in ${utt_exclude_list}"
+            mv "${_list_file}.tmp" "${_list_file}"
+        fi
+
         # Remove empty text
         # shellcheck disable=SC2068
         if ${use_text_prev}; then
@@ -939,22 +1136,38 @@ if [ ${stage} -le 5 ] && [ ${stop_stage} -ge 5 ] && ! [[ " ${skip_stages} " =~ [
             _opts_spm+=" --user_defined_symbols=<sc>"
         fi
 
-        spm_train \
-            --input="${bpedir}"/train.txt \
-            --vocab_size="${nbpe}" \
-            --model_type="${bpemode}" \
-            --model_prefix="${bpeprefix}" \
-            --character_coverage=${bpe_char_cover} \
-            --input_sentence_size="${bpe_input_sentence_size}" \
-            ${_opts_spm}
-
-        {
-        echo "${blank}"
-        echo "${oov}"
-        # Remove <unk>, <s>, </s> from the vocabulary
-        <"${bpeprefix}".vocab awk '{ if( NR != 1 && NR != 2 && NR != 3 ){ print $1; } }'
-        echo "${sos_eos}"
-        } > "${token_list}"
+        if "${parallel_token_list}" && ! ${sot_asr}; then
+            # Trains on a sampled subset of the text, streamed to SentencePiece in process
+            ${python} "${local_scripts}"/build_token_list.py \
+                --token_type bpe \
+                --text "${bpedir}"/train.txt \
+                --output "${token_list}" \
+                --nj "${nj}" \
+                --bpe_prefix "${bpeprefix}" \
+                --nbpe "${nbpe}" \
+                --bpemode "${bpemode}" \
+                --bpe_char_cover "${bpe_char_cover}" \
+                --bpe_sample_lines "$(min "${bpe_input_sentence_size}" "${bpe_sample_lines}")" \
+                --user_defined_symbols "${_opts_spm//--user_defined_symbols=/}" \
+                --blank "${blank}" --oov "${oov}" --sos_eos "${sos_eos}"
+        else
+            spm_train \
+                --input="${bpedir}"/train.txt \
+                --vocab_size="${nbpe}" \
+                --model_type="${bpemode}" \
+                --model_prefix="${bpeprefix}" \
+                --character_coverage=${bpe_char_cover} \
+                --input_sentence_size="${bpe_input_sentence_size}" \
+                ${_opts_spm}
+
+            {
+            echo "${blank}"
+            echo "${oov}"
+            # Remove <unk>, <s>, </s> from the vocabulary
+            <"${bpeprefix}".vocab awk '{ if( NR != 1 && NR != 2 && NR != 3 ){ print $1; } }'
+            echo "${sos_eos}"
+            } > "${token_list}"
+        fi
 
     elif [ "${token_type}" = char ] || [ "${token_type}" = word ]; then
         log "Stage 5: Generate character level token_list from ${lm_train_text}"
@@ -971,16 +1184,28 @@ if [ ${stage} -le 5 ] && [ ${stop_stage} -ge 5 ] && ! [[ " ${skip_stages} " =~ [
 
         # The first symbol in token_list must be "<blank>" and the last must be also sos/eos:
         # 0 is reserved for CTC-blank for ASR and also used as ignore-index in the other task
-        ${python} -m espnet2.bin.tokenize_text  \
-            --token_type "${token_type}" \
-            --input "${data_feats}/lm_train.txt" --output "${token_list}" ${_opts} \
-            --field 2- \
-            --cleaner "${cleaner}" \
-            --g2p "${g2p}" \
-            --write_vocabulary true \
-            --add_symbol "${blank}:0" \
-            --add_symbol "${oov}:1" \
-            --add_symbol "${sos_eos}:-1"
+        if "${parallel_token_list}" && ! ${sot_asr}; then
+            # Sharded counts in a process pool; ties are broken by token so the list is deterministic
+            ${python} "${local_scripts}"/build_token_list.py \
+                --token_type "${token_type}" \
+                --text "${data_feats}/lm_train.txt" \
+                --output "${token_list}" \
+                --nj "${nj}" \
+                --non_linguistic_symbols "${nlsyms_txt}" \
+                --cleaner "${cleaner}" \
+                --blank "${blank}" --oov "${oov}" --sos_eos "${sos_eos}"
+        else
+            ${python} -m espnet2.bin.tokenize_text  \
+                --token_type "${token_type}" \
+                --input "${data_feats}/lm_train.txt" --output "${token_list}" ${_opts} \
+                --field 2- \
+                --cleaner "${cleaner}" \
+                --g2p "${g2p}" \
+                --write_vocabulary true \
+                --add_symbol "${blank}:0" \
+                --add_symbol "${oov}:1" \
+                --add_symbol "${sos_eos}:-1"
+        fi
 
             # Duplicated <sc> token may be counted for char token type,
             # so we shoud remove it
@@ -1170,8 +1395,8 @@ if [ ${stage} -le 7 ] && [ ${stop_stage} -ge 7 ] && ! [[ " ${skip_stages} " =~ [
     fi
 
     # shellcheck disable=SC2086
-    ${python} -m espnet2.bin.launch \
-        --cmd "${cuda_cmd} --name ${jobname}" \
+    ${ledger_job} ${python} -m espnet2.bin.launch \
+        --cmd "${launch_cuda_cmd:-${cuda_cmd}} --name ${jobname}" \
         --log "${lm_exp}"/train.log \
         --ngpu "${ngpu}" \
         --num_nodes "${num_nodes}" \
@@ -1217,9 +1442,35 @@ fi
 
 if [ ${stage} -le 9 ] && [ ${stop_stage} -ge 9 ] && ! [[ " ${skip_stages} " =~ [[:space:]]9[[:space:]] ]]; then
     log "Stage 9: Ngram Training: train_set=${data_feats}/lm_train.txt"
-    mkdir -p ${ngram_exp}
-    cut -f 2- -d " " ${data_feats}/lm_train.txt | lmplz -S "20%" --discount_fallback -o ${ngram_num} - >${ngram_exp}/${ngram_num}gram.arpa
-    build_binary -s ${ngram_exp}/${ngram_num}gram.arpa ${ngram_exp}/${ngram_num}gram.bin
+    if "${use_ngram}"; then
+        mkdir -p ${ngram_exp}
+        cut -f 2- -d " " ${data_feats}/lm_train.txt | lmplz -S "20%" --discount_fallback -o ${ngram_num} - >${ngram_exp}/${ngram_num}gram.arpa
+        build_binary -s ${ngram_exp}/${ngram_num}gram.arpa ${ngram_exp}/${ngram_num}gram.bin
+    fi
+    if "${use_char_ngram}"; then
+        if [ "${token_type}" != char ] && [ "${token_type}" != bpe ]; then
+            log "Error: --use_char_ngram supports only --token_type char or bpe"
+            exit 2
+        fi
+        _opts="--non_linguistic_symbols ${nlsyms_txt} "
+        if [ "${token_type}" = bpe ]; then
+            _opts+="--bpemodel ${bpemodel} "
+        fi
+        # shellcheck disable=SC2086
+        ${python} "${local_scripts}"/char_ngram_lm.py train \
+            --text "${data_feats}/lm_train.txt" \
+            --order "${char_ngram_order}" \
+            --token_list "${token_list}" \
+            --token_type "${token_type}" \
+            --out_dir "${char_ngram_exp}" \
+            ${_opts}
+        ${python} "${local_scripts}"/char_ngram_lm.py benchmark \
+            --lm_dir "${char_ngram_exp}" \
+            --text "${lm_dev_text}" \
+            --token_list "${token_list}" \
+            --token_type "${token_type}" \
+            ${_opts} | tee "${char_ngram_exp}/benchmark.log"
+    fi
 fi
 
 
@@ -1476,8 +1727,8 @@ if [ ${stage} -le 11 ] && [ ${stop_stage} -ge 11 ] && ! [[ " ${skip_stages} " =~
     fi
 
     # shellcheck disable=SC2086
-    ${python} -m espnet2.bin.launch \
-        --cmd "${cuda_cmd} --name ${jobname}" \
+    ${ledger_job} ${python} -m espnet2.bin.launch \
+        --cmd "${launch_cuda_cmd:-${cuda_cmd}} --name ${jobname}" \
         --log "${asr_exp}"/train.log \
         --ngpu "${ngpu}" \
         --num_nodes "${num_nodes}" \
@@ -1560,7 +1811,39 @@ if [ ${stage} -le 12 ] && [ ${stop_stage} -ge 12 ] && ! [[ " ${skip_stages} " =~
         fi
     fi
     if "${use_ngram}"; then
-         _opts+="--ngram_file ${ngram_exp}/${inference_ngram}"
+         _opts+="--ngram_file ${ngram_exp}/${inference_ngram} "
+    fi
+    if "${use_char_ngram}"; then
+        _opts+="--char_ngram_dir ${char_ngram_exp} --char_ngram_weight ${char_ngram_weight} "
+    fi
+    if [ "${lm_prefix_cache_size}" -gt 0 ]; then
+        _opts+="--lm_prefix_cache_size ${lm_prefix_cache_size} "
+    fi
+    if "${inference_int8}"; then
+        _int8_model="${asr_exp}/${inference_asr_model%.*}_int8.pth"
+        if [ ! -f "${_int8_model}" ]; then
+            log "Error: ${_int8_model} does not exist. Please run stage 14 with --pack_int8 true first."
+            exit 1
+        fi
+        _opts+="--int8_asr_model_file ${_int8_model} "
+    fi
+    if "${share_encoder_cache}"; then
+        # The test sets are decoded one after another (also as separate stage 12 runs, e.g. from
+        # pipeline_dag.py), so later tasks find the encoder outputs of the first. Entries are keyed by
+        # the input only: the cache is emptied when the model files change.
+        _encoder_cache="${asr_exp}/${inference_tag}/encoder_cache"
+        _model_files="${asr_exp}/config.yaml ${asr_exp}/${inference_asr_model}"
+        if "${inference_int8}"; then
+            _model_files+=" ${_int8_model}"
+        fi
+        # shellcheck disable=SC2086
+        _model_digest=$(stat -L -c '%n %s %Y' ${_model_files} | sha1sum | cut -d' ' -f1)
+        if [ "$(cat "${_encoder_cache}/model_digest" 2>/dev/null)" != "${_model_digest}" ]; then
+            rm -rf "${_encoder_cache}"
+            mkdir -p "${_encoder_cache}"
+            echo "${_model_digest}" > "${_encoder_cache}/model_digest"
+        fi
+        _opts+="--encoder_cache_dir ${_encoder_cache} "
     fi
 
     # 2. Generate run.sh
@@ -1584,6 +1867,24 @@ if [ ${stage} -le 12 ] && [ ${stop_stage} -ge 12 ] && ! [[ " ${skip_stages} " =~
             inference_bin_tag="_maskctc"
         fi
     fi
+    if "${use_local_inference}"; then
+        if [ ${asr_task} = "asr" ] && [ "${inference_bin_tag}" = "_streaming" ]; then
+            # Chunk-wise decoding of the unidirectional RNN models (options such as chunk_ms in the inference config)
+            _inference_bin="${local_scripts}/streaming_asr.py"
+        elif [ ${asr_task} != "asr" ] || [ -n "${inference_bin_tag}" ]; then
+            log "Error: --use_local_inference supports only plain and streaming asr decoding"
+            exit 2
+        else
+            _inference_bin="${local_scripts}/kurdish_asr_inference.py"
+        fi
+    else
+        _inference_bin="-m espnet2.bin.${asr_task}_inference${inference_bin_tag}"
+    fi
+    if [ "${inference_scheduler}" = queue ] && [ "${_inference_bin}" != "${local_scripts}/kurdish_asr_inference.py" ]; then
+        # decode_scheduler.py always decodes with kurdish_asr_inference.py's offline beam search
+        log "Error: --inference_scheduler queue supports only plain asr decoding (not ${asr_task}${inference_bin_tag})"
+        exit 2
+    fi
 
     if "${eval_valid_set}"; then
         _dsets="org/${valid_set} ${test_sets}"
@@ -1600,7 +1901,7 @@ if [ ${stage} -le 12 ] && [ ${stop_stage} -ge 12 ] && ! [[ " ${skip_stages} " =~
         _audio_format="$(cat ${_data}/audio_format 2>/dev/null || echo ${audio_format})"
         if [ "${_feats_type}" = raw ]; then
             _scp=wav.scp
-            if [[ "${audio_format}" == *ark* ]]; then
+            if [[ "${_audio_format}" == *ark* ]]; then
                 _type=kaldi_ark
             elif [[ "${_audio_format}" == *multi* ]]; then
                 _type=multi_columns_sound
@@ -1616,9 +1917,59 @@ if [ ${stage} -le 12 ] && [ ${stop_stage} -ge 12 ] && ! [[ " ${skip_stages} " =~
         if ${use_text_prev}; then
             _dataset_specific_opts+="--data_path_and_name_and_type ${_data}/text_prev,text_prev,text "
         fi
+        if "${profile_decoding}"; then
+            rm -f "${_logdir}"/profile.*.jsonl*
+            _fs=$(python3 -c "import humanfriendly as h;print(h.parse_size('${fs}'))")
+            _dataset_specific_opts+="--profile_jsonl ${_logdir}/profile.JOB.jsonl --profile_fs ${_fs} "
+            # The RTF needs audio durations; the length of a feature matrix is not one
+            if [ -e "${_data}/utt2dur" ]; then
+                _dataset_specific_opts+="--profile_utt2dur ${_data}/utt2dur "
+            elif [ -e "${_data}/utt2num_samples" ]; then
+                <"${_data}/utt2num_samples" awk -v fs="${_fs}" '{ print $1, $2 / fs }' >"${_logdir}/utt2dur"
+                _dataset_specific_opts+="--profile_utt2dur ${_logdir}/utt2dur "
+            elif [ "${_feats_type}" != raw ]; then
+                log "Error: --profile_decoding needs ${_data}/utt2dur or utt2num_samples for ${_feats_type} features"
+                exit 1
+            fi
+        fi
 
         # 1. Split the key file
         key_file=${_data}/${_scp}
+        if "${use_decode_cache}"; then
+            # Unchanged utterances (same audio, model and inference config) are taken from the cache
+            _cache_opts=
+            if ${use_text_prev}; then
+                _cache_opts+="--extra_text ${_data}/text_prev "
+            fi
+            if "${use_lm}"; then
+                _cache_opts+="--model_files ${lm_exp}/${inference_lm} "
+            fi
+            if "${use_ngram}"; then
+                _cache_opts+="--model_files ${ngram_exp}/${inference_ngram} "
+            fi
+            if "${use_char_ngram}"; then
+                # The arrays, not the directory name, so retraining stage 9 in place invalidates the entries
+                _cache_opts+="--model_files $(echo "${char_ngram_exp}"/meta.json "${char_ngram_exp}"/*.npy) "
+            fi
+            if "${inference_int8}"; then
+                _cache_opts+="--model_files ${_int8_model} "
+            fi
+            rm -rf "${_logdir}"/output.*
+            # shellcheck disable=SC2086
+            ${python} "${local_scripts}"/decode_cache.py lookup \
+                --cache_dir "${decode_cache_dir}" \
+                --max_entries "${decode_cache_max_entries}" \
+                --max_mb "${decode_cache_max_mb}" \
+                --wav_scp "${key_file}" \
+                --model_files "${asr_exp}"/config.yaml "${asr_exp}"/"${inference_asr_model}" \
+                --config_files ${inference_config} \
+                --config_string "${asr_task}${inference_bin_tag} ${batch_size} ${_opts} ${inference_args}" \
+                --output_dir "${_logdir}"/cached \
+                --miss_scp "${_logdir}"/uncached.scp \
+                --info "${_logdir}"/decode_cache.json \
+                ${_cache_opts} | tee "${_logdir}"/decode_cache.log
+            key_file="${_logdir}"/uncached.scp
+        fi
         split_scps=""
         if "${use_k2}"; then
           # Now only _nj=1 is verified if using k2
@@ -1627,29 +1978,50 @@ if [ ${stage} -le 12 ] && [ ${stop_stage} -ge 12 ] && ! [[ " ${skip_stages} " =~
           _nj=$(min "${inference_nj}" "$(<${key_file} wc -l)")
         fi
 
-        for n in $(seq "${_nj}"); do
-            split_scps+=" ${_logdir}/keys.${n}.scp"
-        done
-        # shellcheck disable=SC2086
-        utils/split_scp.pl "${key_file}" ${split_scps}
-
-        # 2. Submit decoding jobs
-        log "Decoding started... log: '${_logdir}/asr_inference.*.log'"
-        rm -f "${_logdir}/*.log"
-        # shellcheck disable=SC2046,SC2086
-        ${_cmd} --gpu "${_ngpu}" JOB=1:"${_nj}" "${_logdir}"/asr_inference.JOB.log \
-            ${python} -m espnet2.bin.${asr_task}_inference${inference_bin_tag} \
-                --batch_size ${batch_size} \
-                --ngpu "${_ngpu}" \
-                --data_path_and_name_and_type "${_data}/${_scp},speech,${_type}" \
-                --key_file "${_logdir}"/keys.JOB.scp \
-                --asr_train_config "${asr_exp}"/config.yaml \
-                --asr_model_file "${asr_exp}"/"${inference_asr_model}" \
-                --output_dir "${_logdir}"/output.JOB \
-                ${_opts} ${_dataset_specific_opts} ${inference_args} || { cat $(grep -l -i error "${_logdir}"/asr_inference.*.log) ; exit 1; }
+        if [ "${_nj}" -gt 0 ] && [ "${inference_scheduler}" = queue ]; then
+            # One job holding a pool of ${_nj} workers that pull utterances longest-first
+            log "Decoding started with a work queue of ${_nj} workers... log: '${_logdir}/asr_inference.1.log'"
+            rm -f "${_logdir}/*.log"
+            # shellcheck disable=SC2046,SC2086
+            ${_cmd} --gpu "${_ngpu}" "${_logdir}"/asr_inference.1.log \
+                ${python} "${local_scripts}"/decode_scheduler.py \
+                    --nj "${_nj}" \
+                    --static_nj "${_nj}" \
+                    --ngpu "${_ngpu}" \
+                    --data_path_and_name_and_type "${_data}/${_scp},speech,${_type}" \
+                    --key_file "${key_file}" \
+                    --asr_train_config "${asr_exp}"/config.yaml \
+                    --asr_model_file "${asr_exp}"/"${inference_asr_model}" \
+                    --output_dir "${_logdir}"/output.1 \
+                    ${_opts} ${_dataset_specific_opts//JOB/1} ${inference_args} || { cat "${_logdir}"/asr_inference.1.log ; exit 1; }
+            _nj=1
+        elif [ "${_nj}" -gt 0 ]; then
+            for n in $(seq "${_nj}"); do
+                split_scps+=" ${_logdir}/keys.${n}.scp"
+            done
+            # shellcheck disable=SC2086
+            utils/split_scp.pl "${key_file}" ${split_scps}
+
+            # 2. Submit decoding jobs
+            log "Decoding started... log: '${_logdir}/asr_inference.*.log'"
+            rm -f "${_logdir}/*.log"
+            # shellcheck disable=SC2046,SC2086
+            ${_cmd} --gpu "${_ngpu}" JOB=1:"${_nj}" "${_logdir}"/asr_inference.JOB.log \
+                ${python} ${_inference_bin} \
+                    --batch_size ${batch_size} \
+                    --ngpu "${_ngpu}" \
+                    --data_path_and_name_and_type "${_data}/${_scp},speech,${_type}" \
+                    --key_file "${_logdir}"/keys.JOB.scp \
+                    --asr_train_config "${asr_exp}"/config.yaml \
+                    --asr_model_file "${asr_exp}"/"${inference_asr_model}" \
+                    --output_dir "${_logdir}"/output.JOB \
+                    ${_opts} ${_dataset_specific_opts} ${inference_args} || { cat $(grep -l -i error "${_logdir}"/asr_inference.*.log) ; exit 1; }
+        else
+            log "All utterances of ${dset} were served from the decode cache"
+        fi
 
         # 3. Calculate and report RTF based on decoding logs
-        if [ ${asr_task} == "asr" ] && [ -z ${inference_bin_tag} ]; then
+        if [ ${asr_task} == "asr" ] && [ -z ${inference_bin_tag} ] && [ "${_nj}" -gt 0 ]; then
             log "Calculating RTF & latency... log: '${_logdir}/calculate_rtf.log'"
             rm -f "${_logdir}"/calculate_rtf.log
             _fs=$(python3 -c "import humanfriendly as h;print(h.parse_size('${fs}'))")
@@ -1669,14 +2041,35 @@ if [ ${stage} -le 12 ] && [ ${stop_stage} -ge 12 ] && ! [[ " ${skip_stages} " =~
         for ref_txt in "${ref_text_files[@]}"; do
             suffix=$(echo ${ref_txt} | sed 's/text//')
             for f in token token_int score text; do
-                if [ -f "${_logdir}/output.1/1best_recog/${f}${suffix}" ]; then
+                if [ -f "${_logdir}/output.1/1best_recog/${f}${suffix}" ] || [ -f "${_logdir}/cached/1best_recog/${f}${suffix}" ]; then
+                    {
                     for i in $(seq "${_nj}"); do
                         cat "${_logdir}/output.${i}/1best_recog/${f}${suffix}"
-                    done | sort -k1 >"${_dir}/${f}${suffix}"
+                    done
+                    if "${use_decode_cache}" && [ -f "${_logdir}/cached/1best_recog/${f}${suffix}" ]; then
+                        cat "${_logdir}/cached/1best_recog/${f}${suffix}"
+                    fi
+                    } | sort -k1 >"${_dir}/${f}${suffix}"
                 fi
             done
         done
 
+        # 5. Summarize RTF percentiles and the per-component cost of decoding
+        if "${profile_decoding}" && [ "${_nj}" -gt 0 ]; then
+            ${python} "${local_scripts}"/decode_profiler.py "${_logdir}/profile.*.jsonl*" \
+                --output "${_dir}"/decode_profile.md > /dev/null
+            log "Decoding profile: ${_dir}/decode_profile.md"
+        fi
+
+        # 6. Add the newly decoded utterances to the decode cache
+        if "${use_decode_cache}"; then
+            ${python} "${local_scripts}"/decode_cache.py store \
+                --info "${_logdir}"/decode_cache.json \
+                --logdir "${_logdir}" \
+                --max_entries "${decode_cache_max_entries}" \
+                --max_mb "${decode_cache_max_mb}" | tee -a "${_logdir}"/decode_cache.log
+        fi
+
     done
 fi
 
@@ -1693,89 +2086,126 @@ if [ ${stage} -le 13 ] && [ ${stop_stage} -ge 13 ] && ! [[ " ${skip_stages} " =~
     else
         _dsets="${test_sets}"
     fi
-    for dset in ${_dsets}; do
-        _data="${data_feats}/${dset}"
-        _dir="${asr_exp}/${inference_tag}/${dset}"
+    if [ "${scoring_backend}" = python ] && [ "${num_ref}" -eq 1 ]; then
+        _opts="--non_linguistic_symbols ${nlsyms_txt} "
+        if grep -q "whisper" <<< ${token_type}; then
+            log "Non linguistic_symbols used for prompting"
+            _opts+="--remove_non_linguistic_symbols false "
+        fi
+        if [ -f "${bpemodel}" ]; then
+            _opts+="--bpemodel ${bpemodel} "
+        fi
+        if "${kurdish_text_norm}"; then
+            _opts+="--kurdish_text_norm true "
+        fi
+        # shellcheck disable=SC2086
+        ${python} "${local_scripts}"/score_asr.py \
+            --data_root "${data_feats}" \
+            --decode_root "${asr_exp}/${inference_tag}" \
+            --dsets ${_dsets} \
+            --text_name "${ref_text_files[0]}" \
+            --cleaner "${cleaner}" \
+            --hyp_cleaner "${hyp_cleaner}" \
+            --nj "${nj}" \
+            ${_opts}
+    else
+        for dset in ${_dsets}; do
+            _data="${data_feats}/${dset}"
+            _dir="${asr_exp}/${inference_tag}/${dset}"
+            _ref_dir="${_data}"
+            _hyp_dir="${_dir}"
+            if "${kurdish_text_norm}"; then
+                _ref_dir="${_dir}/text_norm/ref"
+                _hyp_dir="${_dir}/text_norm/hyp"
+                mkdir -p "${_ref_dir}" "${_hyp_dir}"
+                for ref_txt in "${ref_text_files[@]}"; do
+                    ${python} "${local_scripts}"/kurdish_text_norm.py apply --kaldi \
+                        --input "${_data}/${ref_txt}" --output "${_ref_dir}/${ref_txt}"
+                    ${python} "${local_scripts}"/kurdish_text_norm.py apply --kaldi \
+                        --input "${_dir}/${ref_txt}" --output "${_hyp_dir}/${ref_txt}"
+                done
+            fi
 
-        for _tok_type in "char" "word" "bpe"; do
-            [ "${_tok_type}" = bpe ] && [ ! -f "${bpemodel}" ] && continue
+            for _tok_type in "char" "word" "bpe"; do
+                [ "${_tok_type}" = bpe ] && [ ! -f "${bpemodel}" ] && continue
 
-            _opts="--token_type ${_tok_type} "
-            if [ "${_tok_type}" = "char" ] || [ "${_tok_type}" = "word" ]; then
-                _type="${_tok_type:0:1}er"
-                _opts+="--non_linguistic_symbols ${nlsyms_txt} "
-                if grep -q "whisper" <<< ${token_type}; then
-                    log "Non linguistic_symbols used for prompting"
-                else
-                    _opts+="--remove_non_linguistic_symbols true "
-                fi
+                _opts="--token_type ${_tok_type} "
+                if [ "${_tok_type}" = "char" ] || [ "${_tok_type}" = "word" ]; then
+                    _type="${_tok_type:0:1}er"
+                    _opts+="--non_linguistic_symbols ${nlsyms_txt} "
+                    if grep -q "whisper" <<< ${token_type}; then
+                        log "Non linguistic_symbols used for prompting"
+                    else
+                        _opts+="--remove_non_linguistic_symbols true "
+                    fi
 
-            elif [ "${_tok_type}" = "bpe" ]; then
-                _type="ter"
-                _opts+="--bpemodel ${bpemodel} "
+                elif [ "${_tok_type}" = "bpe" ]; then
+                    _type="ter"
+                    _opts+="--bpemodel ${bpemodel} "
 
-            else
-                log "Error: unsupported token type ${_tok_type}"
-            fi
+                else
+                    log "Error: unsupported token type ${_tok_type}"
+                fi
 
-            _scoredir="${_dir}/score_${_type}"
-            mkdir -p "${_scoredir}"
+                _scoredir="${_dir}/score_${_type}"
+                mkdir -p "${_scoredir}"
 
-            # shellcheck disable=SC2068
-            for ref_txt in "${ref_text_files[@]}"; do
-                # Note(simpleoier): to get the suffix after text, e.g. "text_spk1" -> "_spk1"
-                suffix=$(echo ${ref_txt} | sed 's/text//')
-
-                # Tokenize text to ${_tok_type} level
-                paste \
-                    <(<"${_data}/${ref_txt}" \
-                        ${python} -m espnet2.bin.tokenize_text  \
-                            -f 2- --input - --output - \
-                            --cleaner "${cleaner}" \
-                            ${_opts} \
-                            ) \
-                    <(<"${_data}/utt2spk" awk '{ print "(" $2 "-" $1 ")" }') \
-                        >"${_scoredir}/ref${suffix:-${suffix}}.trn"
-
-                # NOTE(kamo): Don't use cleaner for hyp
-                paste \
-                    <(<"${_dir}/${ref_txt}"  \
-                        ${python} -m espnet2.bin.tokenize_text  \
-                            -f 2- --input - --output - \
-                            ${_opts} \
-                            --cleaner "${hyp_cleaner}" \
-                            ) \
-                    <(<"${_data}/utt2spk" awk '{ print "(" $2 "-" $1 ")" }') \
-                        >"${_scoredir}/hyp${suffix:-${suffix}}.trn"
+                # shellcheck disable=SC2068
+                for ref_txt in "${ref_text_files[@]}"; do
+                    # Note(simpleoier): to get the suffix after text, e.g. "text_spk1" -> "_spk1"
+                    suffix=$(echo ${ref_txt} | sed 's/text//')
+
+                    # Tokenize text to ${_tok_type} level
+                    paste \
+                        <(<"${_ref_dir}/${ref_txt}" \
+                            ${python} -m espnet2.bin.tokenize_text  \
+                                -f 2- --input - --output - \
+                                --cleaner "${cleaner}" \
+                                ${_opts} \
+                                ) \
+                        <(<"${_data}/utt2spk" awk '{ print "(" $2 "-" $1 ")" }') \
+                            >"${_scoredir}/ref${suffix:-${suffix}}.trn"
+
+                    # NOTE(kamo): Don't use cleaner for hyp
+                    paste \
+                        <(<"${_hyp_dir}/${ref_txt}"  \
+                            ${python} -m espnet2.bin.tokenize_text  \
+                                -f 2- --input - --output - \
+                                ${_opts} \
+                                --cleaner "${hyp_cleaner}" \
+                                ) \
+                        <(<"${_data}/utt2spk" awk '{ print "(" $2 "-" $1 ")" }') \
+                            >"${_scoredir}/hyp${suffix:-${suffix}}.trn"
 
-            done
+                done
 
-            # Note(simpleoier): score across all possible permutations
-            if [ ${num_ref} -gt 1 ] && [ -n "${suffix}" ]; then
-                for i in $(seq ${num_ref}); do
-                    for j in $(seq ${num_inf}); do
-                        sclite \
-                            ${score_opts} \
-                            -r "${_scoredir}/ref_spk${i}.trn" trn \
-                            -h "${_scoredir}/hyp_spk${j}.trn" trn \
-                            -i rm -o all stdout > "${_scoredir}/result_r${i}h${j}.txt"
+                # Note(simpleoier): score across all possible permutations
+                if [ ${num_ref} -gt 1 ] && [ -n "${suffix}" ]; then
+                    for i in $(seq ${num_ref}); do
+                        for j in $(seq ${num_inf}); do
+                            sclite \
+                                ${score_opts} \
+                                -r "${_scoredir}/ref_spk${i}.trn" trn \
+                                -h "${_scoredir}/hyp_spk${j}.trn" trn \
+                                -i rm -o all stdout > "${_scoredir}/result_r${i}h${j}.txt"
+                        done
                     done
-                done
-                # Generate the oracle permutation hyp.trn and ref.trn
-                pyscripts/utils/eval_perm_free_error.py --num-spkrs ${num_ref} \
-                    --results-dir ${_scoredir}
-            fi
+                    # Generate the oracle permutation hyp.trn and ref.trn
+                    pyscripts/utils/eval_perm_free_error.py --num-spkrs ${num_ref} \
+                        --results-dir ${_scoredir}
+                fi
 
-            sclite \
-                ${score_opts} \
-                -r "${_scoredir}/ref.trn" trn \
-                -h "${_scoredir}/hyp.trn" trn \
-                -i rm -o all stdout > "${_scoredir}/result.txt"
+                sclite \
+                    ${score_opts} \
+                    -r "${_scoredir}/ref.trn" trn \
+                    -h "${_scoredir}/hyp.trn" trn \
+                    -i rm -o all stdout > "${_scoredir}/result.txt"
 
-            log "Write ${_type} result in ${_scoredir}/result.txt"
-            grep -e Avg -e SPKR -m 2 "${_scoredir}/result.txt"
+                log "Write ${_type} result in ${_scoredir}/result.txt"
+                grep -e Avg -e SPKR -m 2 "${_scoredir}/result.txt"
+            done
         done
-    done
+    fi
 
     [ -f local/score.sh ] && local/score.sh ${local_score_opts} "${asr_exp}"
 
@@ -1806,6 +2236,21 @@ if [ ${stage} -le 14 ] && [ ${stop_stage} -ge 14 ] && ! [[ " ${skip_stages} " =~
     if [ "${nlsyms_txt}" != none ]; then
         _opts+="--option ${nlsyms_txt} "
     fi
+    if "${pack_int8}"; then
+        _int8_model="${asr_exp}/${inference_asr_model%.*}_int8.pth"
+        log "Quantizing ${inference_asr_model} to int8: ${_int8_model}"
+        if ${python} "${local_scripts}"/quantize_asr_model.py \
+                --asr_train_config "${asr_exp}"/config.yaml \
+                --asr_model_file "${asr_exp}"/"${inference_asr_model}" \
+                --output "${_int8_model}" \
+                --valid_dir "${data_feats}/org/${valid_set}" \
+                --max_utts "${int8_guard_utts}" \
+                --max_cer_increase "${int8_max_cer_increase}"; then
+            _opts+="--option ${_int8_model} --option ${_int8_model%.*}.json "
+        else
+            log "Warning: the int8 model failed the accuracy guard and is not packed (see ${_int8_model%.*}.json)"
+        fi
+    fi
     # shellcheck disable=SC2086
     ${python} -m espnet2.bin.pack asr \
         --asr_train_config "${asr_exp}"/config.yaml \
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Additive-Noise and Room-Impulse-Response Augmentation
+bank:      packs the audio of a noise or RIR wav.scp into one float32 file with a JSON index;
+           every loader process maps it read-only instead of holding its own copy
+augment:   writes augmented copies of a Kaldi data dir in a process pool (offline, asr.sh Stage 2)
+benchmark: augmented samples per second per core, batched vs one utterance at a time
+Online use: BatchAugmenter(noise_bank, rir_bank)(batch, lengths) on a padded (batch, samples)
+float32 array, e.g. in a DataLoader collate_fn. Whole batches are convolved with their RIRs in
+one FFT and noise is mixed at the sampled SNRs with array operations.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from kaldi_data import (audio_duration, read_kaldi_map, read_wav_scp_audio, utt_speaker, wav_scp_path,
+                        write_kaldi_map)
+from normalize_audio import TARGET_FS, resample
+
+# Per-utterance files whose first column is the utterance id
+UTT_FILES = ("utt2dur", "utt2num_samples", "utt2lang", "utt2category")
+MAX_RIR_SECONDS = 1.0
+
+
+class AudioBank:
+    """Noise or RIR clips packed in <prefix>.f32 (memory-mapped) with <prefix>.json offsets"""
+
+    def __init__(self, prefix):
+        with open(f"{prefix}.json", 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.fs = index["fs"]
+        self.kind = index["kind"]
+        self.names = index["names"]
+        self.offsets = index["offsets"]
+        self.data = np.memmap(f"{prefix}.f32", dtype=np.float32, mode='r')
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+    def segment(self, i, length, rng):
+        """A random length-sample crop of clip i, tiled when the clip is shorter"""
+        clip = self[i]
+        if len(clip) >= length:
+            start = rng.integers(len(clip) - length + 1)
+            return clip[start:start + length]
+        return np.resize(clip, length)
+
+
+def prepare_clip(audio, kind, fs):
+    """Noise as it is; RIRs start at the direct path, are cut to MAX_RIR_SECONDS and have unit energy"""
+    if kind == "noise":
+        return audio
+    audio = audio[np.argmax(np.abs(audio)):][:int(MAX_RIR_SECONDS * fs)]
+    return audio / max(np.sqrt(np.sum(audio ** 2)), 1e-8)
+
+
+def build_bank(wav_scp, prefix, kind, fs=TARGET_FS):
+    """Stream the clips of a wav.scp into <prefix>.f32 / <prefix>.json at fs mono"""
+    import soundfile
+
+    names, offsets = [], [0]
+    Path(prefix).parent.mkdir(parents=True, exist_ok=True)
+    with open(f"{prefix}.f32", 'wb') as out:
+        for name, value in read_kaldi_map(wav_scp).items():
+            path = wav_scp_path(value)
+            if path is None or '.ark:' in value:
+                continue
+            audio, sr = soundfile.read(path, dtype="float32", always_2d=True)
+            clip = prepare_clip(resample(audio.mean(axis=1), sr, fs), kind, fs).astype(np.float32)
+            if not len(clip):
+                continue
+            out.write(clip.tobytes())
+            names.append(name)
+            offsets.append(offsets[-1] + len(clip))
+    with open(f"{prefix}.json", 'w', encoding='utf-8') as f:
+        json.dump({"kind": kind, "fs": fs, "names": names, "offsets": offsets}, f)
+    print(f"✅ {prefix}: {len(names)} {kind} clips, {offsets[-1] / fs / 3600:.2f}h")
+
+
+class BatchAugmenter:
+    """Reverberation (probability rir_prob) then additive noise (probability noise_prob, SNR
+    uniform in snr_range dB) on a padded batch; speech power is kept by the reverberation"""
+
+    def __init__(self, noise_bank=None, rir_bank=None, snr_range=(0.0, 20.0),
+                 noise_prob=1.0, rir_prob=0.5, seed=None):
+        self.noise = AudioBank(noise_bank) if isinstance(noise_bank, (str, Path)) else noise_bank
+        self.rir = AudioBank(rir_bank) if isinstance(rir_bank, (str, Path)) else rir_bank
+        banks = [b for b in (self.noise, self.rir) if b is not None]
+        if len({b.fs for b in banks}) > 1:
+            raise ValueError("Noise and RIR banks have different sampling rates")
+        self.fs = banks[0].fs if banks else TARGET_FS
+        self.snr_range = snr_range
+        self.noise_prob = noise_prob if self.noise is not None and len(self.noise) else 0.0
+        self.rir_prob = rir_prob if self.rir is not None and len(self.rir) else 0.0
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, batch, lengths=None):
+        x = np.array(batch, dtype=np.float32)
+        n, t = x.shape
+        lengths = np.full(n, t) if lengths is None else np.asarray(lengths)
+        mask = np.arange(t)[None, :] < lengths[:, None]
+        power = np.sum(x ** 2, axis=1) / np.maximum(lengths, 1)
+
+        rows = np.flatnonzero(self.rng.random(n) < self.rir_prob)
+        if len(rows):
+            x[rows] = self.reverberate(x[rows], mask[rows], power[rows])
+        rows = np.flatnonzero(self.rng.random(n) < self.noise_prob)
+        if len(rows):
+            x[rows] = self.add_noise(x[rows], mask[rows], power[rows])
+        return x
+
+    def reverberate(self, x, mask, power):
+        """Linear convolution of every row with its own RIR, in one batched real FFT"""
+        rirs = [self.rir[i] for i in self.rng.integers(len(self.rir), size=len(x))]
+        size = x.shape[1] + max(len(r) for r in rirs) - 1
+        n_fft = 1 << (size - 1).bit_length()
+        h = np.zeros((len(x), max(len(r) for r in rirs)), dtype=np.float32)
+        for row, rir in zip(h, rirs):
+            row[:len(rir)] = rir
+        y = np.fft.irfft(np.fft.rfft(x, n_fft) * np.fft.rfft(h, n_fft), n_fft)[:, :x.shape[1]]
+        y = y.astype(np.float32) * mask
+        reverb_power = np.sum(y ** 2, axis=1) / np.maximum(mask.sum(axis=1), 1)
+        return y * np.sqrt(power / np.maximum(reverb_power, 1e-10))[:, None]
+
+    def add_noise(self, x, mask, power):
+        t = x.shape[1]
+        noise = np.stack([self.noise.segment(i, t, self.rng)
+                          for i in self.rng.integers(len(self.noise), size=len(x))])
+        noise_power = np.sum((noise * mask) ** 2, axis=1) / np.maximum(mask.sum(axis=1), 1)
+        snr = self.rng.uniform(*self.snr_range, size=len(x))
+        scale = np.sqrt(power / np.maximum(noise_power * 10 ** (snr / 10), 1e-10))
+        return x + (scale[:, None] * noise * mask).astype(np.float32)
+
+
+def augment_one(audio, rir, noise, snr):
+    """One utterance with scipy's convolution, as per-utterance preprocessors do; for the benchmark"""
+    from scipy.signal import fftconvolve
+
+    power = np.mean(audio ** 2)
+    if rir is not None:
+        audio = fftconvolve(audio, rir)[:len(audio)]
+        audio = audio * np.sqrt(power / max(np.mean(audio ** 2), 1e-10))
+    if noise is not None:
+        audio = audio + noise * np.sqrt(power / max(np.mean(noise ** 2) * 10 ** (snr / 10), 1e-10))
+    return audio
+
+
+def pad_batch(clips):
+    lengths = np.array([len(c) for c in clips])
+    batch = np.zeros((len(clips), lengths.max()), dtype=np.float32)
+    for row, clip in zip(batch, clips):
+        row[:len(clip)] = clip
+    return batch, lengths
+
+
+_augmenter = None
+
+
+def init_worker(noise_bank, rir_bank, snr_range, noise_prob, rir_prob):
+    global _augmenter
+    _augmenter = BatchAugmenter(noise_bank, rir_bank, snr_range, noise_prob, rir_prob)
+
+
+def augment_batch(job):
+    """Augment and write one length-sorted batch; returns [(new utt, output path)]"""
+    import soundfile
+
+    seed, items, out_dir = job
+    _augmenter.rng = np.random.default_rng(seed)
+    clips, done = [], []
+    for new_utt, src in items:
+        try:
+            audio, fs = read_wav_scp_audio(src)
+        except RuntimeError:
+            continue
+        clips.append(resample(audio.mean(axis=1), fs, _augmenter.fs))
+        done.append(new_utt)
+    if not clips:
+        return []
+    batch, lengths = pad_batch(clips)
+    out = []
+    for new_utt, row, length in zip(done, _augmenter(batch, lengths), lengths):
+        path = str(out_dir / f"{new_utt}.wav")
+        soundfile.write(path, np.clip(row[:length], -1.0, 1.0), _augmenter.fs, subtype="PCM_16")
+        out.append((new_utt, path))
+    return out
+
+
+def augment_dir(data_dir, out_dir, copies, augmenter_args, batch_size, nj, seed):
+    """Write copies x the utterances of data_dir as aug<k>-<utt> into out_dir (Kaldi data dir)"""
+    data_dir, out_dir = Path(data_dir), Path(out_dir)
+    if (data_dir / "segments").exists():
+        raise SystemExit(f"❌ {data_dir}: segments files are not supported")
+    wav_scp = read_kaldi_map(data_dir / "wav.scp")
+    utt2spk = read_kaldi_map(data_dir / "utt2spk")
+    wav_dir = out_dir / "wav"
+    wav_dir.mkdir(parents=True, exist_ok=True)
+
+    # Entries are audio paths or pipes such as the "sox ... speed 0.9 |" of speed perturbation
+    ark = [u for u, v in wav_scp.items() if '.ark:' in v]
+    if ark:
+        raise SystemExit(f"❌ {data_dir}: {len(ark)} wav.scp entries are ark offsets (e.g. {ark[0]}), "
+                         "augment the data dir before dump/format")
+    sources = {u: v.strip() for u, v in wav_scp.items()}
+
+    # Length-sorted batches so the padding of each FFT stays small; pipes are timed by utt2dur
+    utt2dur = read_kaldi_map(data_dir / "utt2dur") if (data_dir / "utt2dur").exists() else {}
+    durations = {u: float(utt2dur[u]) if u in utt2dur else audio_duration(v) or 0.0
+                 for u, v in sources.items()}
+    order = sorted(sources, key=durations.get)
+    jobs = []
+    for k in range(1, copies + 1):
+        items = [(f"aug{k}-{u}", sources[u]) for u in order]
+        for i in range(0, len(items), batch_size):
+            jobs.append((seed * 1000003 + len(jobs), items[i:i + batch_size], wav_dir))
+
+    start = time.time()
+    new_wav = {}
+    with ProcessPoolExecutor(nj, initializer=init_worker, initargs=augmenter_args) as pool:
+        for written in pool.map(augment_batch, jobs):
+            new_wav.update(written)
+
+    # Speaker ids carry the prefix too, so utterance ids keep starting with their speaker
+    new_keys = {new: new.split('-', 1)[1] for new in new_wav}
+    write_kaldi_map(out_dir / "wav.scp", dict(sorted(new_wav.items())))
+    write_kaldi_map(out_dir / "utt2spk", {
+        new: f"{new.split('-', 1)[0]}-{utt2spk.get(utt, utt_speaker(utt))}"
+        for new, utt in sorted(new_keys.items())})
+    for name in os.listdir(data_dir):
+        if name.startswith("text") or name in UTT_FILES:
+            values = read_kaldi_map(data_dir / name)
+            write_kaldi_map(out_dir / name, {new: values[utt] for new, utt in sorted(new_keys.items())
+                                             if utt in values})
+    seconds = sum(audio_duration(p) or 0.0 for p in new_wav.values())
+    print(f"✅ {out_dir}: {len(new_wav)}/{copies * len(sources)} augmented utterances "
+          f"({seconds / 3600:.2f}h) in {time.time() - start:.1f}s")
+    missing = sorted(set(sources) - set(new_keys.values()))
+    if missing:
+        print(f"⚠️  {len(missing)} utterances could not be read and were not augmented, e.g. "
+              f"{missing[0]}: {sources[missing[0]]}")
+
+
+def benchmark(paths, augmenter, batch_size, repeats=3):
+    """Audio samples per second in this process (one core): BatchAugmenter vs augment_one"""
+    import soundfile
+
+    clips = []
+    for path in paths:
+        audio, fs = soundfile.read(path, dtype="float32", always_2d=True)
+        clips.append(resample(audio.mean(axis=1), fs, augmenter.fs))
+    clips.sort(key=len)
+    samples = sum(len(c) for c in clips)
+    batches = [pad_batch(clips[i:i + batch_size]) for i in range(0, len(clips), batch_size)]
+
+    best_batched = best_single = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for batch, lengths in batches:
+            augmenter(batch, lengths)
+        best_batched = min(best_batched, time.perf_counter() - start)
+
+        rng = augmenter.rng
+        start = time.perf_counter()
+        for clip in clips:
+            rir = augmenter.rir[rng.integers(len(augmenter.rir))] \
+                if augmenter.rir_prob and rng.random() < augmenter.rir_prob else None
+            noise = augmenter.noise.segment(rng.integers(len(augmenter.noise)), len(clip), rng) \
+                if augmenter.noise_prob and rng.random() < augmenter.noise_prob else None
+            augment_one(clip, rir, noise, rng.uniform(*augmenter.snr_range))
+        best_single = min(best_single, time.perf_counter() - start)
+    return {"utterances": len(clips), "audio_seconds": samples / augmenter.fs, "fs": augmenter.fs,
+            "batched_samples_per_s": samples / best_batched,
+            "single_samples_per_s": samples / best_single}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("bank", help="Pack a noise or RIR wav.scp for memory-mapped reading")
+    p.add_argument("--wav_scp", required=True)
+    p.add_argument("--output", required=True, help="Bank prefix (writes <prefix>.f32 and <prefix>.json)")
+    p.add_argument("--kind", choices=("noise", "rir"), required=True)
+    p.add_argument("--fs", type=int, default=TARGET_FS)
+
+    def add_augment_args(p):
+        p.add_argument("--data_dir", required=True, help="Kaldi data dir to augment")
+        p.add_argument("--noise_bank", help="Noise bank prefix")
+        p.add_argument("--rir_bank", help="RIR bank prefix")
+        p.add_argument("--snr_low", type=float, default=0.0)
+        p.add_argument("--snr_high", type=float, default=20.0)
+        p.add_argument("--noise_prob", type=float, default=1.0)
+        p.add_argument("--rir_prob", type=float, default=0.5)
+        p.add_argument("--batch_size", type=int, default=32)
+
+    p = sub.add_parser("augment", help="Write augmented copies of a data dir")
+    add_augment_args(p)
+    p.add_argument("--out_dir", required=True)
+    p.add_argument("--copies", type=int, default=1)
+    p.add_argument("--nj", type=int, default=os.cpu_count())
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("benchmark", help="Augmented samples per second per core, batched vs per utterance")
+    add_augment_args(p)
+    p.add_argument("--samples", type=int, default=200, help="Utterances to benchmark")
+    args = parser.parse_args()
+
+    if args.cmd == "bank":
+        build_bank(args.wav_scp, args.output, args.kind, args.fs)
+        return
+    if not (args.noise_bank or args.rir_bank):
+        parser.error("Give --noise_bank and/or --rir_bank")
+    augmenter_args = (args.noise_bank, args.rir_bank, (args.snr_low, args.snr_high),
+                      args.noise_prob, args.rir_prob)
+    if args.cmd == "augment":
+        augment_dir(args.data_dir, args.out_dir, args.copies, augmenter_args, args.batch_size,
+                    args.nj, args.seed)
+        return
+
+    wav_scp = read_kaldi_map(Path(args.data_dir) / "wav.scp")
+    paths = [p for p in (wav_scp_path(v) for v in wav_scp.values() if '.ark:' not in v) if p]
+    paths = random.Random(0).sample(paths, min(args.samples, len(paths)))
+    report = benchmark(paths, BatchAugmenter(*augmenter_args, seed=0), args.batch_size)
+    print(f"📊 {report['utterances']} utterances, {report['audio_seconds']:.0f}s of audio, "
+          f"batch size {args.batch_size}, one core")
+    print(f"   batched FFT:   {report['batched_samples_per_s'] / 1e6:.2f}M samples/s "
+          f"({report['batched_samples_per_s'] / report['fs']:.0f}x real time)")
+    print(f"   per utterance: {report['single_samples_per_s'] / 1e6:.2f}M samples/s "
+          f"({report['single_samples_per_s'] / report['fs']:.0f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+End-to-End Pipeline Benchmark on a Synthetic Corpus
+Generates a corpus with create_sample_data.py, then times conversion, Stage 3-5 prep, Stage 10
+statistics, a fixed number of training steps, decoding and scoring; records wall/CPU time,
+peak memory and throughput per step and fails if a step regresses beyond the baseline tolerance
+Run from the ESPnet recipe directory (where asr.sh, utils/ and path.sh live)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+STEPS = ("generate", "convert", "prep", "stats", "train", "decode", "score")
+ASR_STAGES = {"prep": (3, 5), "stats": (10, 10), "train": (11, 11), "decode": (12, 12), "score": (13, 13)}
+
+
+def corpus_seconds(corpus_dir, lang, splits):
+    total = 0.0
+    for split in splits:
+        with open(corpus_dir / lang / split / "data.json", 'r', encoding='utf-8') as f:
+            total += sum(item["duration"] for item in json.load(f))
+    return total
+
+
+def step_command(step, args, work_dir):
+    tag = args.data_tag
+    if step == "generate":
+        return [sys.executable, str(SCRIPTS_DIR / "create_sample_data.py"), "--out_dir", str(work_dir / "corpus"),
+                "--languages", args.language, "--num_utts", str(args.num_utts),
+                "--num_speakers", str(args.num_speakers), "--nj", str(args.nj), "--seed", str(args.seed)]
+    if step == "convert":
+        return [sys.executable, str(SCRIPTS_DIR / "convert_kurdish_data.py"),
+                "--kurdish_base", str(work_dir / "corpus" / args.language), "--lang", tag]
+    stage, stop_stage = ASR_STAGES[step]
+    return ["./asr.sh", "--stage", str(stage), "--stop_stage", str(stop_stage),
+            "--train_set", f"w2g_all_{tag}_train", "--valid_set", f"w2g_all_{tag}_dev",
+            "--test_sets", f"w2g_transcription_{tag}_test",
+            "--token_type", "char", "--feats_type", "raw", "--audio_format", "wav",
+            "--min_wav_duration", "0.5", "--max_wav_duration", "20",
+            "--asr_config", args.asr_config, "--asr_tag", f"benchmark_{tag}",
+            "--asr_args", f"--max_epoch 1 --num_iters_per_epoch {args.train_steps}",
+            "--use_lm", "false", "--ngpu", str(args.ngpu), "--nj", str(args.nj), "--inference_nj", str(args.nj),
+            "--dumpdir", str(work_dir / "dump"), "--expdir", str(work_dir / "exp"),
+            "--local_scripts", str(SCRIPTS_DIR), "--scoring_backend", "python"]
+
+
+def run_step(cmd, log_path):
+    """Run one step; wall time plus the rusage of the process tree (wait4)"""
+    start = time.time()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return proc.returncode, {
+        "wall_s": round(time.time() - start, 3),
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 3),
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),  # kilobytes on Linux
+        "read_mb": round(usage.ru_inblock * 512 / 1e6, 1),
+        "written_mb": round(usage.ru_oublock * 512 / 1e6, 1),
+    }
+
+
+def step_work(step, args, work_dir):
+    """Amount of work per step, so throughput stays comparable across corpus sizes"""
+    if step == "train":
+        return args.train_steps, "iters/s"
+    corpus = work_dir / "corpus"
+    splits = {"stats": ("train", "dev"), "decode": ("test",), "score": ("test",)}.get(step, ("train", "dev", "test"))
+    return corpus_seconds(corpus, args.language, splits), "audio s/s"
+
+
+def compare(results, baseline, tolerance, mem_tolerance):
+    """Per-step regressions of throughput and peak memory against the baseline"""
+    regressions = []
+    for step, cur in results["steps"].items():
+        ref = baseline["steps"].get(step)
+        if ref is None:
+            continue
+        if cur["throughput"] < ref["throughput"] * (1 - tolerance):
+            regressions.append(f"{step}: throughput {cur['throughput']:.3g} < {ref['throughput']:.3g} "
+                               f"{cur['unit']} (-{100 * tolerance:.0f}% allowed)")
+        if cur["peak_rss_mb"] > ref["peak_rss_mb"] * (1 + mem_tolerance):
+            regressions.append(f"{step}: peak RSS {cur['peak_rss_mb']:.0f}MB > {ref['peak_rss_mb']:.0f}MB "
+                               f"(+{100 * mem_tolerance:.0f}% allowed)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--work_dir", default="benchmark")
+    parser.add_argument("--steps", nargs="+", default=list(STEPS), choices=STEPS)
+    parser.add_argument("--language", default="kurdish_sorani")
+    parser.add_argument("--num_utts", type=int, default=2000)
+    parser.add_argument("--num_speakers", type=int, default=100)
+    parser.add_argument("--train_steps", type=int, default=50, help="Training iterations in Stage 11")
+    parser.add_argument("--asr_config", default=str(SCRIPTS_DIR.parent / "configs" / "train_asr_rnn_correct.yaml"))
+    parser.add_argument("--data_tag", default="bench", help="Language tag of the benchmark data dirs")
+    parser.add_argument("--ngpu", type=int, default=0)
+    parser.add_argument("--nj", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default="benchmark_baseline.json")
+    parser.add_argument("--update_baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative throughput drop")
+    parser.add_argument("--mem_tolerance", type=float, default=0.2, help="Allowed relative peak RSS growth")
+    args = parser.parse_args()
+
+    work_dir = Path(args.work_dir).resolve()
+    (work_dir / "logs").mkdir(parents=True, exist_ok=True)
+    config = {k: getattr(args, k) for k in ("language", "num_utts", "num_speakers", "train_steps",
+                                            "asr_config", "ngpu", "nj", "seed")}
+    results = {"config": config, "date": time.strftime("%Y-%m-%d %H:%M:%S"), "steps": {}}
+
+    print("=" * 60)
+    print("PIPELINE BENCHMARK")
+    print("=" * 60)
+    for step in STEPS:
+        if step not in args.steps:
+            continue
+        log_path = work_dir / "logs" / f"{step}.log"
+        returncode, usage = run_step(step_command(step, args, work_dir), log_path)
+        if returncode != 0:
+            sys.exit(f"❌ Step {step} failed (exit {returncode}), see {log_path}")
+        work, unit = step_work(step, args, work_dir)
+        usage.update({"throughput": round(work / max(usage["wall_s"], 1e-9), 3), "unit": unit})
+        results["steps"][step] = usage
+        print(f"⚡ {step:9s} {usage['wall_s']:8.1f}s wall {usage['cpu_s']:8.1f}s cpu "
+              f"{usage['peak_rss_mb']:8.0f}MB peak  {usage['throughput']:10.3g} {unit}")
+
+    with open(work_dir / "results.json", 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline or not baseline_path.exists():
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"📝 Baseline written to {baseline_path}")
+        return
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline["config"] != config:
+        sys.exit(f"❌ Baseline {baseline_path} was recorded with a different configuration: {baseline['config']}")
+    regressions = compare(results, baseline, args.tolerance, args.mem_tolerance)
+    if regressions:
+        print("❌ Regressions against the baseline of " + baseline["date"] + ":")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+    print(f"✅ No regressions against {baseline_path} ({baseline['date']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Parallel Token List Builder for Stage 5
+Counts char or word tokens over byte-range shards of the training text in a process pool and
+writes an ESPnet token_list in a deterministic order; for BPE, streams a sampled subset of the
+text into SentencePiece instead of the full file
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from score_asr import Tokenizer
+
+
+def shard_offsets(path, n_shards):
+    """Byte ranges of about equal size, each starting at a line boundary"""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, n_shards):
+            f.seek(max(size * i // n_shards, bounds[-1]))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def iter_shard(path, start, end, field2=True):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            text = line.decode('utf-8').rstrip("\n")
+            if field2:
+                parts = text.split(maxsplit=1)
+                text = parts[1] if len(parts) > 1 else ""
+            yield text
+
+
+def count_shard(job):
+    path, start, end, token_type, tokenizer_opts = job
+    tokenize = Tokenizer(token_type, **tokenizer_opts)
+    counts = Counter()
+    for text in iter_shard(path, start, end):
+        counts.update(tokenize(text))
+    return counts
+
+
+def sample_shard(job):
+    """Reservoir sample of one shard, seeded by its offset so reruns pick the same lines"""
+    path, start, end, k, field2 = job
+    rng = random.Random(start)
+    sample = []
+    n_lines = 0
+    for text in iter_shard(path, start, end, field2):
+        if n_lines < k:
+            sample.append(text)
+        else:
+            j = rng.randint(0, n_lines)
+            if j < k:
+                sample[j] = text
+        n_lines += 1
+    return sample, n_lines
+
+
+def count_tokens(path, token_type, tokenizer_opts, nj):
+    shards = shard_offsets(path, nj)
+    jobs = [(path, a, b, token_type, tokenizer_opts) for a, b in shards]
+    counts = Counter()
+    if nj == 1:
+        for job in jobs:
+            counts.update(count_shard(job))
+        return counts
+    with ProcessPoolExecutor(nj) as pool:
+        for shard_counts in pool.map(count_shard, jobs):
+            counts.update(shard_counts)
+    return counts
+
+
+def sample_text(path, n_lines, nj, field2=False):
+    shards = shard_offsets(path, nj)
+    per_shard = -(-n_lines // max(len(shards), 1))
+    with ProcessPoolExecutor(nj) as pool:
+        results = list(pool.map(sample_shard, [(path, a, b, per_shard, field2) for a, b in shards]))
+    return [t for sample, _ in results for t in sample], sum(n for _, n in results)
+
+
+def write_token_list(path, tokens, blank, oov, sos_eos):
+    with open(path, 'w', encoding='utf-8') as f:
+        for token in [blank, oov, *tokens, sos_eos]:
+            f.write(token + "\n")
+
+
+def build_char_word(args, tokenizer_opts):
+    start = time.time()
+    counts = count_tokens(args.text, args.token_type, tokenizer_opts, args.nj)
+    elapsed = time.time() - start
+    reserved = {args.blank, args.oov, args.sos_eos}
+    tokens = [t for t, c in sorted(counts.items(), key=lambda x: (-x[1], x[0]))
+              if c > args.cutoff and t not in reserved]
+    if args.vocabulary_size > 0:
+        tokens = tokens[:args.vocabulary_size - 3]
+    write_token_list(args.output, tokens, args.blank, args.oov, args.sos_eos)
+    print(f"✅ {len(tokens) + 3} tokens from {sum(counts.values()):,} {args.token_type}s "
+          f"with {args.nj} processes in {elapsed:.1f}s -> {args.output}")
+    if args.benchmark:
+        start = time.time()
+        serial = count_tokens(args.text, args.token_type, tokenizer_opts, 1)
+        serial_time = time.time() - start
+        print(f"⚡ Serial count: {serial_time:.1f}s ({serial_time / max(elapsed, 1e-9):.1f}x slower), "
+              f"identical counts: {serial == counts}")
+
+
+def build_bpe(args):
+    import sentencepiece as spm
+
+    start = time.time()
+    sample, n_total = sample_text(args.text, args.bpe_sample_lines, args.nj, args.has_utt_id)
+    sample_time = time.time() - start
+    Path(args.bpe_prefix).parent.mkdir(parents=True, exist_ok=True)
+    opts = dict(model_prefix=args.bpe_prefix, vocab_size=args.nbpe, model_type=args.bpemode,
+                character_coverage=args.bpe_char_cover,
+                input_sentence_size=args.bpe_sample_lines)
+    if args.user_defined_symbols:
+        opts["user_defined_symbols"] = args.user_defined_symbols
+    start = time.time()
+    spm.SentencePieceTrainer.train(sentence_iterator=iter(sample), **opts)
+    train_time = time.time() - start
+    with open(f"{args.bpe_prefix}.vocab", 'r', encoding='utf-8') as f:
+        # Drop <unk>, <s>, </s> like Stage 5 does
+        tokens = [line.split("\t")[0] for line in f][3:]
+    write_token_list(args.output, tokens, args.blank, args.oov, args.sos_eos)
+    print(f"✅ {args.bpemode}{args.nbpe} trained on {len(sample):,}/{n_total:,} sampled lines "
+          f"(sampling {sample_time:.1f}s, training {train_time:.1f}s) -> {args.output}")
+    if args.benchmark:
+        full_prefix = f"{args.bpe_prefix}_full"
+        start = time.time()
+        full = [t for a, b in shard_offsets(args.text, 1) for t in iter_shard(args.text, a, b, args.has_utt_id)]
+        spm.SentencePieceTrainer.train(sentence_iterator=iter(full),
+                                       **dict(opts, model_prefix=full_prefix, input_sentence_size=0))
+        full_time = time.time() - start
+        sampled_sp = spm.SentencePieceProcessor(model_file=f"{args.bpe_prefix}.model")
+        full_sp = spm.SentencePieceProcessor(model_file=f"{full_prefix}.model")
+        probe = full[:1000]
+        ratio = (sum(len(sampled_sp.encode(t)) for t in probe)
+                 / max(sum(len(full_sp.encode(t)) for t in probe), 1))
+        print(f"⚡ Full-text training: {full_time:.1f}s vs {sample_time + train_time:.1f}s sampled; "
+              f"sampled model uses {ratio:.3f}x the tokens of the full-text model")
+        for suffix in (".model", ".vocab"):
+            os.remove(full_prefix + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--text", required=True,
+                        help="Kaldi-style text (<utt_id> <text>); for bpe, plain text as given to spm_train")
+    parser.add_argument("--output", required=True, help="token_list to write")
+    parser.add_argument("--token_type", default="char", choices=["char", "word", "bpe"])
+    parser.add_argument("--nj", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--non_linguistic_symbols", default="none")
+    parser.add_argument("--cleaner", default="none")
+    parser.add_argument("--cutoff", type=int, default=0)
+    parser.add_argument("--vocabulary_size", type=int, default=0)
+    parser.add_argument("--blank", default="<blank>")
+    parser.add_argument("--oov", default="<unk>")
+    parser.add_argument("--sos_eos", default="<sos/eos>")
+    parser.add_argument("--bpe_prefix", help="SentencePiece model prefix (token_type=bpe)")
+    parser.add_argument("--nbpe", type=int, default=30)
+    parser.add_argument("--bpemode", default="unigram")
+    parser.add_argument("--bpe_char_cover", type=float, default=1.0)
+    parser.add_argument("--bpe_sample_lines", type=int, default=1000000,
+                        help="Lines sampled from the text for SentencePiece training")
+    parser.add_argument("--has_utt_id", action="store_true",
+                        help="The bpe --text lines start with an utterance id to drop")
+    parser.add_argument("--user_defined_symbols", default="",
+                        help="Comma separated symbols kept as single BPE pieces")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Also time the serial count (char/word) or full-text training (bpe)")
+    args = parser.parse_args()
+
+    if args.token_type == "bpe":
+        if not args.bpe_prefix:
+            sys.exit("--bpe_prefix is required for --token_type bpe")
+        build_bpe(args)
+        return
+    nlsyms = []
+    if args.non_linguistic_symbols != "none":
+        with open(args.non_linguistic_symbols, 'r', encoding='utf-8') as f:
+            nlsyms = [line.strip() for line in f if line.strip()]
+    build_char_word(args, {"nlsyms": nlsyms, "cleaner": args.cleaner})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Compact In-Process Character / BPE N-gram LM
+Trained from lm_train.txt in one streaming pass, stored as sorted integer arrays
+(memory-mappable .npy files) and scored for all beam extensions in one vectorized call
+"""
+import argparse
+import json
+import math
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import torch
+    from espnet.nets.scorer_interface import BatchScorerInterface
+except ImportError:
+    torch = None
+    BatchScorerInterface = object
+
+from kaldi_data import read_kaldi_map
+from score_asr import char_error_rate
+
+
+def read_token_list(path):
+    """Read an ESPnet token_list (one token per line, id = line number)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n').split(' ')[0] for line in f if line.strip()]
+
+
+def read_nlsyms(path):
+    """Read non_linguistic_symbols.txt, longest symbols first"""
+    if not path or path == "none" or not Path(path).exists():
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        symbols = [line.strip() for line in f if line.strip()]
+    return sorted(symbols, key=len, reverse=True)
+
+
+class TextToIds:
+    """Tokenize text the same way as the ASR token_list (char with <space>, or BPE)"""
+
+    def __init__(self, token_list, token_type="char", bpemodel=None, nlsyms=()):
+        self.token2id = {t: i for i, t in enumerate(token_list)}
+        self.unk = self.token2id.get("<unk>", 1)
+        self.token_type = token_type
+        self.nlsyms = list(nlsyms)
+        self.sp = None
+        if token_type == "bpe":
+            import sentencepiece as spm
+            self.sp = spm.SentencePieceProcessor()
+            self.sp.load(bpemodel)
+
+    def tokens(self, text):
+        if self.sp is not None:
+            return self.sp.encode_as_pieces(text)
+        tokens = []
+        i = 0
+        while i < len(text):
+            for sym in self.nlsyms:
+                if text.startswith(sym, i):
+                    tokens.append(sym)
+                    i += len(sym)
+                    break
+            else:
+                tokens.append("<space>" if text[i] == " " else text[i])
+                i += 1
+        return tokens
+
+    def __call__(self, text):
+        return [self.token2id.get(t, self.unk) for t in self.tokens(text)]
+
+
+class ArrayNgramLM:
+    """Witten-Bell interpolated n-gram LM over integer token ids, held in sorted arrays"""
+
+    def __init__(self, order, vocab_size, sos, unigram, ngram_keys, ngram_counts,
+                 ctx_keys, ctx_totals, ctx_types):
+        self.order = order
+        self.vocab_size = vocab_size
+        self.sos = sos
+        self.unigram = unigram
+        # index k-2 holds the arrays of order k (k = 2..order)
+        self.ngram_keys = ngram_keys
+        self.ngram_counts = ngram_counts
+        self.ctx_keys = ctx_keys
+        self.ctx_totals = ctx_totals
+        self.ctx_types = ctx_types
+
+    @classmethod
+    def train(cls, id_lines, order, vocab_size, sos):
+        """Count all n-grams in one pass over tokenized lines and build the arrays"""
+        if vocab_size ** order >= 2 ** 62:
+            raise ValueError(f"order {order} is too high for a vocabulary of {vocab_size}")
+        counters = [Counter() for _ in range(order)]
+        pad = [sos] * (order - 1)
+        for ids in id_lines:
+            seq = pad + list(ids) + [sos]
+            for i in range(order - 1, len(seq)):
+                key = 0
+                scale = 1
+                for k in range(order):
+                    key += seq[i - k] * scale
+                    scale *= vocab_size
+                    counters[k][key] += 1
+
+        unigram_counts = np.zeros(vocab_size, dtype=np.float64)
+        for key, count in counters[0].items():
+            unigram_counts[key] = count
+        unigram = (unigram_counts + 1.0) / (unigram_counts.sum() + vocab_size)
+
+        ngram_keys, ngram_counts, ctx_keys, ctx_totals, ctx_types = [], [], [], [], []
+        for k in range(1, order):
+            keys = np.fromiter(counters[k].keys(), dtype=np.int64, count=len(counters[k]))
+            counts = np.fromiter(counters[k].values(), dtype=np.int64, count=len(counters[k]))
+            sort = np.argsort(keys, kind="stable")
+            keys, counts = keys[sort], counts[sort]
+            ctx, starts, types = np.unique(keys // vocab_size, return_index=True, return_counts=True)
+            ngram_keys.append(keys)
+            ngram_counts.append(counts.astype(np.int32))
+            ctx_keys.append(ctx)
+            ctx_totals.append(np.add.reduceat(counts, starts).astype(np.int64) if len(keys) else counts)
+            ctx_types.append(types.astype(np.int32))
+        return cls(order, vocab_size, sos, unigram, ngram_keys, ngram_counts,
+                   ctx_keys, ctx_totals, ctx_types)
+
+    def save(self, out_dir):
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        with open(out_dir / "meta.json", 'w', encoding='utf-8') as f:
+            json.dump({"order": self.order, "vocab_size": self.vocab_size, "sos": self.sos}, f)
+        np.save(out_dir / "unigram.npy", self.unigram)
+        for k in range(2, self.order + 1):
+            i = k - 2
+            np.save(out_dir / f"ngram{k}_keys.npy", self.ngram_keys[i])
+            np.save(out_dir / f"ngram{k}_counts.npy", self.ngram_counts[i])
+            np.save(out_dir / f"ctx{k}_keys.npy", self.ctx_keys[i])
+            np.save(out_dir / f"ctx{k}_totals.npy", self.ctx_totals[i])
+            np.save(out_dir / f"ctx{k}_types.npy", self.ctx_types[i])
+
+    @classmethod
+    def load(cls, lm_dir, mmap=True):
+        lm_dir = Path(lm_dir)
+        mode = 'r' if mmap else None
+        with open(lm_dir / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {name: [] for name in ("nk", "nc", "ck", "ct", "cy")}
+        for k in range(2, meta["order"] + 1):
+            arrays["nk"].append(np.load(lm_dir / f"ngram{k}_keys.npy", mmap_mode=mode))
+            arrays["nc"].append(np.load(lm_dir / f"ngram{k}_counts.npy", mmap_mode=mode))
+            arrays["ck"].append(np.load(lm_dir / f"ctx{k}_keys.npy", mmap_mode=mode))
+            arrays["ct"].append(np.load(lm_dir / f"ctx{k}_totals.npy", mmap_mode=mode))
+            arrays["cy"].append(np.load(lm_dir / f"ctx{k}_types.npy", mmap_mode=mode))
+        return cls(meta["order"], meta["vocab_size"], meta["sos"],
+                   np.load(lm_dir / "unigram.npy"), arrays["nk"], arrays["nc"],
+                   arrays["ck"], arrays["ct"], arrays["cy"])
+
+    def contexts(self, ys):
+        """Last (order-1) tokens of each prefix, left-padded with <sos>"""
+        width = self.order - 1
+        out = np.full((len(ys), width), self.sos, dtype=np.int64)
+        for b, y in enumerate(ys):
+            tail = np.asarray(y, dtype=np.int64)[-width:] if width else []
+            if len(tail):
+                out[b, width - len(tail):] = tail
+        return out
+
+    @staticmethod
+    def _lookup(sorted_keys, queries):
+        """Binary search; returns (index, found) for every query"""
+        if len(sorted_keys) == 0:
+            return np.zeros(queries.shape, dtype=np.int64), np.zeros(queries.shape, dtype=bool)
+        idx = np.searchsorted(sorted_keys, queries)
+        idx = np.minimum(idx, len(sorted_keys) - 1)
+        return idx, sorted_keys[idx] == queries
+
+    def probs(self, contexts, candidates):
+        """Interpolated probabilities of candidates (B, C) after contexts (B, order-1)"""
+        V = self.vocab_size
+        p = self.unigram[candidates]
+        hkey = np.zeros(len(contexts), dtype=np.int64)
+        for k in range(2, self.order + 1):
+            i = k - 2
+            hkey = hkey + contexts[:, -(k - 1)] * V ** (k - 2)
+            cidx, cfound = self._lookup(self.ctx_keys[i], hkey)
+            total = np.where(cfound, self.ctx_totals[i][cidx], 0).astype(np.float64)
+            types = np.where(cfound, self.ctx_types[i][cidx], 0).astype(np.float64)
+            nidx, nfound = self._lookup(self.ngram_keys[i], hkey[:, None] * V + candidates)
+            count = np.where(nfound, self.ngram_counts[i][nidx], 0)
+            interpolated = (count + types[:, None] * p) / np.maximum(total + types, 1.0)[:, None]
+            p = np.where(cfound[:, None], interpolated, p)
+        return p
+
+    def next_log_probs(self, contexts):
+        """Log-probabilities of every vocabulary entry for each context, shape (B, V)"""
+        candidates = np.broadcast_to(np.arange(self.vocab_size), (len(contexts), self.vocab_size))
+        return np.log(self.probs(contexts, candidates))
+
+    def sentence_log_prob(self, ids):
+        """Total natural-log probability of one tokenized line including </s>"""
+        seq = [self.sos] * (self.order - 1) + list(ids) + [self.sos]
+        width = self.order - 1
+        contexts = np.array([seq[i - width:i] for i in range(width, len(seq))], dtype=np.int64)
+        targets = np.array(seq[width:], dtype=np.int64)[:, None]
+        if width == 0:
+            contexts = np.zeros((len(targets), 0), dtype=np.int64)
+        return float(np.log(self.probs(contexts, targets)).sum()), len(targets)
+
+
+class CharNgramScorer(BatchScorerInterface):
+    """ESPnet full scorer for shallow fusion of an ArrayNgramLM in beam search"""
+
+    def __init__(self, lm_dir, token_list):
+        self.lm = ArrayNgramLM.load(lm_dir)
+        if self.lm.vocab_size != len(token_list):
+            raise ValueError(f"n-gram vocabulary ({self.lm.vocab_size}) does not match "
+                             f"the ASR token_list ({len(token_list)})")
+
+    def init_state(self, x):
+        return None
+
+    def score(self, y, state, x):
+        scores = self.lm.next_log_probs(self.lm.contexts([y.cpu().numpy()]))[0]
+        return torch.from_numpy(scores).to(device=x.device, dtype=x.dtype), state
+
+    def batch_score(self, ys, states, xs):
+        scores = self.lm.next_log_probs(self.lm.contexts(ys.cpu().numpy()))
+        return torch.from_numpy(scores).to(device=xs.device, dtype=xs.dtype), states
+
+
+def iter_lines(path, field2=True):
+    """Stream the transcript part of lm_train.txt-style lines"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if field2:
+                parts = line.split(maxsplit=1)
+                line = parts[1] if len(parts) > 1 else ""
+            if line.strip():
+                yield line
+
+
+def train(args):
+    token_list = read_token_list(args.token_list)
+    to_ids = TextToIds(token_list, args.token_type, args.bpemodel, read_nlsyms(args.non_linguistic_symbols))
+    start = time.time()
+    lm = ArrayNgramLM.train((to_ids(line) for line in iter_lines(args.text)),
+                            args.order, len(token_list), len(token_list) - 1)
+    lm.save(args.out_dir)
+    n_entries = sum(len(k) for k in lm.ngram_keys)
+    print(f"✅ Trained {args.order}-gram LM over {len(token_list)} tokens: "
+          f"{n_entries} n-grams in {time.time() - start:.1f}s -> {args.out_dir}")
+
+
+def benchmark(args):
+    """Perplexity, vectorized scoring speed and optional CER comparison"""
+    print("=" * 60)
+    print("CHARACTER N-GRAM LM BENCHMARK")
+    print("=" * 60)
+    token_list = read_token_list(args.token_list)
+    to_ids = TextToIds(token_list, args.token_type, args.bpemodel, read_nlsyms(args.non_linguistic_symbols))
+    lm = ArrayNgramLM.load(args.lm_dir)
+
+    total_lp, total_n = 0.0, 0
+    lines = list(iter_lines(args.text))
+    for line in lines:
+        lp, n = lm.sentence_log_prob(to_ids(line))
+        total_lp += lp
+        total_n += n
+    print(f"📊 Perplexity on {len(lines)} lines: {math.exp(-total_lp / max(total_n, 1)):.2f}")
+
+    rng = np.random.default_rng(0)
+    prefixes = [rng.integers(0, lm.vocab_size, size=rng.integers(1, 30)) for _ in range(args.beam_size)]
+    contexts = lm.contexts(prefixes)
+    start = time.time()
+    for _ in range(args.steps):
+        lm.next_log_probs(contexts)
+    vectorized = (time.time() - start) / args.steps
+    start = time.time()
+    for _ in range(max(args.steps // 10, 1)):
+        for b in range(len(contexts)):
+            lm.next_log_probs(contexts[b:b + 1])
+    per_hyp = (time.time() - start) / max(args.steps // 10, 1)
+    print(f"⚡ Beam step ({args.beam_size} hyps x {lm.vocab_size} tokens): "
+          f"{vectorized * 1000:.3f} ms vectorized, {per_hyp * 1000:.3f} ms per-hypothesis "
+          f"({per_hyp / max(vectorized, 1e-9):.1f}x)")
+
+    if args.ref:
+        refs = read_kaldi_map(args.ref)
+        for spec in args.hyp:
+            label, path = spec.split("=", 1)
+            cer = char_error_rate(refs, read_kaldi_map(path))
+            print(f"📝 {label}: CER {cer:.2f}% over {len(refs)} utterances")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("train", help="Train from lm_train.txt in one streaming pass")
+    p.add_argument("--text", required=True, help="lm_train.txt ('utt_id transcript' lines)")
+    p.add_argument("--order", type=int, default=6)
+    p.add_argument("--out_dir", required=True)
+
+    p = sub.add_parser("benchmark", help="Perplexity, scoring speed and CER comparison")
+    p.add_argument("--lm_dir", required=True)
+    p.add_argument("--text", required=True, help="Held-out 'utt_id transcript' lines")
+    p.add_argument("--beam_size", type=int, default=10)
+    p.add_argument("--steps", type=int, default=200)
+    p.add_argument("--ref", help="Reference text for the CER comparison")
+    p.add_argument("--hyp", action="append", default=[],
+                   help="label=path of a decoded text file, e.g. ngram=exp/.../text")
+
+    for p in sub.choices.values():
+        p.add_argument("--token_list", required=True)
+        p.add_argument("--token_type", default="char", choices=["char", "bpe"])
+        p.add_argument("--bpemodel")
+        p.add_argument("--non_linguistic_symbols")
+
+    args = parser.parse_args()
+    if args.command == "train":
+        train(args)
+    else:
+        benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Compressed Audio Store for the Stage 3 Dump
+benchmark: reads sampled utterances of a data dir cold (page cache dropped) to measure storage
+           bandwidth, times decoding them as WAV and as FLAC, and projects the throughput of
+           loaders reading each format
+transcode: re-encodes the audio of a wav.scp as FLAC files or packed flac.ark shards in a
+           process pool and rewrites wav.scp and audio_format; --format auto picks raw or
+           compressed per data dir from the benchmark
+"""
+import argparse
+import io
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from kaldi_data import read_kaldi_map, wav_scp_path, write_kaldi_map
+
+FORMATS = ("auto", "wav", "flac", "flac.ark")
+FLAC_SUBTYPES = ("PCM_S8", "PCM_16", "PCM_24")
+DECODE_REPEATS = 3
+
+
+def drop_cache(path):
+    """Evict a file from the page cache so the next read hits the storage (Linux only)"""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def cold_read(path):
+    drop_cache(path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def flac_subtype(subtype):
+    # FLAC stores integer PCM only; float WAVs are kept at 24 bit
+    return subtype if subtype in FLAC_SUBTYPES else "PCM_24"
+
+
+def decode_seconds(data):
+    """Fastest of DECODE_REPEATS in-memory decodes of an encoded file"""
+    import soundfile
+
+    best = float("inf")
+    for _ in range(DECODE_REPEATS):
+        start = time.perf_counter()
+        soundfile.read(io.BytesIO(data), dtype="int16")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def decode_costs(data):
+    """Audio seconds, WAV/FLAC bytes and decode seconds of one utterance"""
+    import soundfile
+
+    info = soundfile.info(io.BytesIO(data))
+    audio, fs = soundfile.read(io.BytesIO(data), dtype="int16", always_2d=True)
+    buf = io.BytesIO()
+    soundfile.write(buf, audio, fs, format="FLAC", subtype=flac_subtype(info.subtype))
+    flac = buf.getvalue()
+    return {
+        "audio_seconds": len(audio) / fs,
+        "wav_bytes": len(data),
+        "flac_bytes": len(flac),
+        "wav_decode_s": decode_seconds(data),
+        "flac_decode_s": decode_seconds(flac),
+    }
+
+
+def benchmark(data_dir, samples, readers, bandwidth_mbps=None, seed=0):
+    """Measured storage bandwidth and per-format decode cost, with the projected loader throughput"""
+    wav_scp = read_kaldi_map(Path(data_dir) / "wav.scp")
+    paths = [p for p in (wav_scp_path(v) for v in wav_scp.values() if '.ark:' not in v) if p]
+    paths = random.Random(seed).sample(paths, min(samples, len(paths)))
+    if not paths:
+        raise ValueError(f"No readable audio files in {data_dir}/wav.scp")
+
+    # Storage: concurrent cold reads, as the loader workers of a training job would issue them
+    start = time.perf_counter()
+    with ThreadPoolExecutor(readers) as pool:
+        blobs = list(pool.map(cold_read, paths))
+    read_s = time.perf_counter() - start
+    measured_mbps = sum(len(b) for b in blobs) / 1e6 / max(read_s, 1e-9)
+    mbps = bandwidth_mbps or measured_mbps
+
+    # Decoding: CPU seconds per audio second, in this process
+    costs = [decode_costs(b) for b in blobs]
+    total = {k: sum(c[k] for c in costs) for k in costs[0]}
+    seconds = max(total["audio_seconds"], 1e-9)
+    report = {
+        "data_dir": str(data_dir),
+        "utterances": len(costs),
+        "readers": readers,
+        "measured_read_mbps": measured_mbps,
+        "read_mbps": mbps,
+        "compression_ratio": total["flac_bytes"] / max(total["wav_bytes"], 1),
+    }
+    for fmt in ("wav", "flac"):
+        mb_per_s = total[f"{fmt}_bytes"] / 1e6 / seconds
+        cpu_per_s = total[f"{fmt}_decode_s"] / seconds
+        # Audio seconds per wall second: decode-bound with 'readers' cores, or bandwidth-bound
+        report[fmt] = {
+            "mb_per_audio_second": mb_per_s,
+            "decode_cpu_per_audio_second": cpu_per_s,
+            "decode_bound": readers / max(cpu_per_s, 1e-9),
+            "io_bound": mbps / max(mb_per_s, 1e-9),
+        }
+        report[fmt]["throughput"] = min(report[fmt]["decode_bound"], report[fmt]["io_bound"])
+    return report
+
+
+def choose_format(report, margin, packed):
+    """flac (or flac.ark) when it loads faster than raw WAV by more than margin"""
+    if report["flac"]["throughput"] > report["wav"]["throughput"] * (1 + margin):
+        return "flac.ark" if packed else "flac"
+    return "wav"
+
+
+def print_report(report, fmt):
+    print(f"📊 {report['data_dir']}: {report['utterances']} utterances, {report['readers']} readers, "
+          f"storage {report['read_mbps']:.0f} MB/s (measured {report['measured_read_mbps']:.0f}), "
+          f"FLAC is {100 * report['compression_ratio']:.0f}% of WAV")
+    for name in ("wav", "flac"):
+        r = report[name]
+        print(f"   {name:5s} {r['mb_per_audio_second']:.3f} MB and {1000 * r['decode_cpu_per_audio_second']:.2f} ms "
+              f"CPU per audio second -> {r['throughput']:.0f} audio s/s "
+              f"({'I/O' if r['io_bound'] < r['decode_bound'] else 'decode'} bound)")
+    print(f"   ➡️  {fmt}")
+
+
+def encode_file(job):
+    """Write one utterance as FLAC; returns (utt, new wav.scp value or None on failure)"""
+    import soundfile
+
+    utt, src, dst = job
+    try:
+        info = soundfile.info(src)
+        audio, fs = soundfile.read(src, dtype="int16" if info.subtype != "PCM_24" else "int32")
+        soundfile.write(dst, audio, fs, format="FLAC", subtype=flac_subtype(info.subtype))
+    except (RuntimeError, OSError):
+        return utt, None
+    return utt, dst
+
+
+def encode_shard(job):
+    """Pack a shard of utterances as FLAC frames into one ark; returns {utt: 'ark:offset'}"""
+    import kaldiio
+    import soundfile
+
+    shard, ark, items = job
+    scp = ark[:-len(".ark")] + ".scp"
+    with kaldiio.WriteHelper(f"ark,scp:{ark},{scp}", write_function="soundfile_flac") as writer:
+        for utt, src in items:
+            try:
+                audio, fs = soundfile.read(src, dtype="int16")
+            except (RuntimeError, OSError):
+                continue
+            writer[utt] = (fs, audio)
+    return read_kaldi_map(scp)
+
+
+def transcode(data_dir, fmt, out_dir, nj, shards, remove_source):
+    """Re-encode wav.scp audio to fmt; entries that cannot be read are kept as they are"""
+    data_dir = Path(data_dir)
+    wav_scp = read_kaldi_map(data_dir / "wav.scp")
+    sources = {u: wav_scp_path(v) for u, v in wav_scp.items() if '.ark:' not in v}
+    sources = {u: p for u, p in sources.items() if p and not p.endswith(".flac")}
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.time()
+    new = {}
+    with ProcessPoolExecutor(nj) as pool:
+        if fmt == "flac":
+            jobs = [(u, p, str(out_dir / f"{u}.flac")) for u, p in sources.items()]
+            for utt, value in pool.map(encode_file, jobs, chunksize=16):
+                if value:
+                    new[utt] = value
+        else:
+            items = list(sources.items())
+            jobs = [(i, str(out_dir / f"audio.{i}.ark"), items[i::shards]) for i in range(shards)]
+            for mapping in pool.map(encode_shard, jobs):
+                new.update(mapping)
+
+    before = sum(os.path.getsize(p) for u, p in sources.items() if u in new)
+    outputs = set(new.values()) if fmt == "flac" else {v.rsplit(':', 1)[0] for v in new.values()}
+    after = sum(os.path.getsize(p) for p in outputs)
+    wav_scp.update(new)
+    write_kaldi_map(data_dir / "wav.scp", wav_scp)
+    with open(data_dir / "audio_format", 'w', encoding='utf-8') as f:
+        f.write(f"{fmt}\n")
+
+    if remove_source:
+        # Only dumped copies inside the data dir; original recordings are never touched
+        root = data_dir.resolve()
+        for utt in new:
+            src = Path(sources[utt]).resolve()
+            if root in src.parents:
+                src.unlink()
+    print(f"✅ {data_dir}: {len(new)}/{len(sources)} utterances -> {fmt} in {time.time() - start:.1f}s, "
+          f"{before / 1e6:.0f} MB -> {after / 1e6:.0f} MB")
+
+
+def cmd_benchmark(args):
+    report = benchmark(args.data_dir, args.samples, args.readers, args.bandwidth_mbps)
+    fmt = choose_format(report, args.margin, args.packed)
+    print_report(report, fmt)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({**report, "choice": fmt}, f, indent=2)
+
+
+def cmd_transcode(args):
+    data_dir = Path(args.data_dir)
+    audio_format = data_dir / "audio_format"
+    if audio_format.exists() and audio_format.read_text().strip().startswith("multi_"):
+        raise SystemExit(f"❌ {data_dir}: multi-column wav.scp is not supported")
+    fmt = args.format
+    if fmt == "auto":
+        report = benchmark(data_dir, args.samples, args.readers, args.bandwidth_mbps)
+        fmt = choose_format(report, args.margin, args.packed)
+        print_report(report, fmt)
+        with open(data_dir / "compress_audio.json", 'w', encoding='utf-8') as f:
+            json.dump({**report, "choice": fmt}, f, indent=2)
+    if fmt == "wav":
+        print(f"⏭️  {data_dir}: keeping raw WAV")
+        return
+    out_dir = Path(args.out_dir) if args.out_dir else data_dir / f"data_{fmt.replace('.', '_')}"
+    transcode(data_dir, fmt, out_dir, args.nj, args.shards or args.nj, args.remove_source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    def add_benchmark_args(p):
+        p.add_argument("--data_dir", required=True, help="Kaldi data dir (e.g. dump/raw/org/<train_set>)")
+        p.add_argument("--samples", type=int, default=200, help="Utterances to benchmark")
+        p.add_argument("--readers", type=int, default=8,
+                       help="Concurrent loader processes to plan for (e.g. the training num_workers)")
+        p.add_argument("--bandwidth_mbps", type=float,
+                       help="Storage bandwidth to plan for instead of the measured one")
+        p.add_argument("--margin", type=float, default=0.1,
+                       help="Relative throughput gain required to choose FLAC")
+        p.add_argument("--packed", action="store_true", help="Choose flac.ark shards instead of FLAC files")
+
+    p = sub.add_parser("benchmark", help="Measure WAV vs FLAC loading cost of a data dir")
+    add_benchmark_args(p)
+    p.add_argument("--output", help="Write the report as JSON")
+    p.set_defaults(func=cmd_benchmark)
+
+    p = sub.add_parser("transcode", help="Re-encode the audio of a data dir")
+    add_benchmark_args(p)
+    p.add_argument("--format", choices=FORMATS, default="auto")
+    p.add_argument("--out_dir", help="Audio output directory (default: <data_dir>/data_<format>)")
+    p.add_argument("--nj", type=int, default=os.cpu_count())
+    p.add_argument("--shards", type=int, default=0, help="flac.ark shards (default: --nj)")
+    p.add_argument("--remove_source", action="store_true",
+                   help="Delete the replaced source files that live inside the data dir")
+    p.set_defaults(func=cmd_transcode)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,74 +1,166 @@
+import argparse
 import os
 import json
+import shutil
 
-def convert_json_to_espnet():
+from kaldi_data import utt_speaker
+from kurdish_text_norm import normalize
+from normalize_audio import TARGET_FS, normalize_paths
+
+# WAV2GLOSS task name -> field of the Kurdish JSON
+TASK_FIELDS = {
+    "transcription": "transcription",
+    "underlying": "underlying_form",
+    "gloss": "gloss",
+    "translation": "translation",
+}
+SHARED_FILES = ("wav.scp", "utt2spk", "spk2utt")
+KURDISH_BASE = "/c/Kurdish_WAV2GLOSS/clean_project/03_wav2gloss_input/sorani"
+# 16 kHz mono copies of recordings that arrive at other rates or with more channels
+AUDIO_CACHE = os.path.join("data", "audio_cache")
+
+
+def write_kaldi_dir(dir_path, wav_scp, utt2spk, texts):
+    """Write wav.scp, utt2spk, spk2utt and text files ({name: lines}) of one data dir"""
+    os.makedirs(dir_path, exist_ok=True)
+
+    # Create spk2utt from utt2spk
+    spk_utt_map = {}
+    for line in utt2spk:
+        utt_id, spk_id = line.strip().split()
+        if spk_id not in spk_utt_map:
+            spk_utt_map[spk_id] = []
+        spk_utt_map[spk_id].append(utt_id)
+    spk2utt = [f"{spk_id} {' '.join(utt_ids)}\n" for spk_id, utt_ids in spk_utt_map.items()]
+
+    write_kaldi_texts(dir_path, {"wav.scp": wav_scp, "utt2spk": utt2spk, "spk2utt": spk2utt, **texts})
+
+
+def write_kaldi_texts(dir_path, files):
+    """Write {name: lines} into dir_path"""
+    for name, lines in files.items():
+        path = os.path.join(dir_path, name)
+        # Unlink first: the file may be a hardlink shared with other task dirs
+        if os.path.lexists(path):
+            os.remove(path)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+
+
+def read_drop_list(path):
+    """Utterance ids (first field per line) to skip; empty without a path"""
+    if not path:
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        return {line.split()[0] for line in f if line.strip()}
+
+
+def link_shared_files(src_dir, dir_path):
+    """Hardlink the audio manifests of src_dir into dir_path (copy if links are unsupported),
+    so Stage 3 can recognize the shared wav.scp and format the audio only once"""
+    os.makedirs(dir_path, exist_ok=True)
+    for name in SHARED_FILES:
+        src = os.path.join(src_dir, name)
+        dst = os.path.join(dir_path, name)
+        if os.path.lexists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+
+
+def convert_json_to_espnet(kurdish_base=KURDISH_BASE, lang="full", target_fs=TARGET_FS, nj=None,
+                           drop_list=None):
     # Map your Kurdish data splits to ESPNet data directories
-    kurdish_base = "/c/Kurdish_WAV2GLOSS/clean_project/03_wav2gloss_input/sorani"
     espnet_data_dirs = {
-        "train": "w2g_all_full_train",
-        "dev": "w2g_all_full_dev", 
-        "test": "w2g_all_full_test"
+        "train": f"w2g_all_{lang}_train",
+        "dev": f"w2g_all_{lang}_dev",
+        "test": f"w2g_all_{lang}_test"
     }
-    
+
+    drop_utts = read_drop_list(drop_list)
+    if drop_utts:
+        print(f"Dropping {len(drop_utts)} utterances listed in {drop_list}")
+    dropped = set()
+
     for split, espnet_dir in espnet_data_dirs.items():
         json_path = os.path.join(kurdish_base, split, "data.json")
         espnet_dir_path = os.path.join("data", espnet_dir)
-        
-        # Create ESPNet directory
-        os.makedirs(espnet_dir_path, exist_ok=True)
-        
+
         if os.path.exists(json_path):
             print(f"Processing {split} -> {espnet_dir}")
-            
+
             with open(json_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-            
-            # Create ESPNet files
-            wav_scp = []
-            text = []
+
+            # Create ESPNet files, every task in the same pass over the JSON
+            audio_paths = {}
             utt2spk = []
-            
+            task_text = {task: [] for task in TASK_FIELDS}
+            lm_text = []
+
             for item in data:
                 utt_id = item["utterance_id"]
+                if utt_id in drop_utts:
+                    dropped.add(utt_id)
+                    continue
                 audio_path = os.path.join(kurdish_base, split, "audio", item["audio_path"])
-                transcription = item["transcription"]
-                
-                # Add to wav.scp
-                wav_scp.append(f"{utt_id} {audio_path}\n")
-                
-                # Add to text
-                text.append(f"{utt_id} {transcription}\n")
-                
+
+                audio_paths[utt_id] = audio_path
+
                 # Add to utt2spk (use first part of utt_id as speaker)
-                spk_id = utt_id.split('_')[0] if '_' in utt_id else 'spk1'
+                spk_id = utt_speaker(utt_id)
                 utt2spk.append(f"{utt_id} {spk_id}\n")
-            
-            # Write files
-            with open(os.path.join(espnet_dir_path, "wav.scp"), 'w', encoding='utf-8') as f:
-                f.writelines(wav_scp)
-            
-            with open(os.path.join(espnet_dir_path, "text"), 'w', encoding='utf-8') as f:
-                f.writelines(text)
-            
-            with open(os.path.join(espnet_dir_path, "utt2spk"), 'w', encoding='utf-8') as f:
-                f.writelines(utt2spk)
-            
-            # Create spk2utt from utt2spk
-            spk_utt_map = {}
-            for line in utt2spk:
-                utt_id, spk_id = line.strip().split()
-                if spk_id not in spk_utt_map:
-                    spk_utt_map[spk_id] = []
-                spk_utt_map[spk_id].append(utt_id)
-            
-            with open(os.path.join(espnet_dir_path, "spk2utt"), 'w', encoding='utf-8') as f:
-                for spk_id, utt_ids in spk_utt_map.items():
-                    f.write(f"{spk_id} {' '.join(utt_ids)}\n")
-            
+
+                # Unify Arabic/Kurdish code points so every later stage sees one spelling
+                for task, field in TASK_FIELDS.items():
+                    value = normalize(item.get(field) or "")
+                    if value:
+                        task_text[task].append(f"{utt_id} {value}\n")
+                        lm_text.append(f"{utt_id}_{task} {value}\n")
+
+            if target_fs:
+                # Resample/downmix in a process pool; unchanged recordings come from the cache
+                mapping = normalize_paths(sorted(set(audio_paths.values())), AUDIO_CACHE, target_fs, nj)
+                audio_paths = {utt_id: mapping[path] for utt_id, path in audio_paths.items()}
+            wav_scp = [f"{utt_id} {path}\n" for utt_id, path in audio_paths.items()]
+
+            write_kaldi_dir(espnet_dir_path, wav_scp, utt2spk,
+                            {"text": task_text["transcription"], "lm.txt": lm_text})
             print(f"Created {len(wav_scp)} entries for {espnet_dir}")
+
+            for task, lines in task_text.items():
+                task_dir_path = os.path.join("data", f"w2g_{task}_{lang}_{split}")
+                if len(lines) == len(wav_scp):
+                    # Same utterances as the all-task dir: share its audio manifests
+                    link_shared_files(espnet_dir_path, task_dir_path)
+                    write_kaldi_texts(task_dir_path, {"text": lines})
+                else:
+                    # Some utterances lack this field; write a manifest subset
+                    keep = {line.split(maxsplit=1)[0] for line in lines}
+                    write_kaldi_dir(task_dir_path,
+                                    [l for l in wav_scp if l.split(maxsplit=1)[0] in keep],
+                                    [l for l in utt2spk if l.split(maxsplit=1)[0] in keep],
+                                    {"text": lines})
+                print(f"Created {len(lines)} {task} entries for w2g_{task}_{lang}_{split}")
         else:
             print(f"JSON file not found: {json_path}")
 
+    if len(dropped) < len(drop_utts):
+        print(f"{len(drop_utts) - len(dropped)} of the {len(drop_utts)} utterances in {drop_list} "
+              f"were not found in any split")
+
 if __name__ == "__main__":
-    convert_json_to_espnet()
+    parser = argparse.ArgumentParser(description="Convert Kurdish JSON splits to ESPnet data dirs")
+    parser.add_argument("--kurdish_base", default=KURDISH_BASE,
+                        help="Directory with <split>/data.json and <split>/audio/")
+    parser.add_argument("--lang", default="full", help="Language tag of the data dir names")
+    parser.add_argument("--fs", type=int, default=TARGET_FS,
+                        help="Resample and downmix audio to this rate, mono (0: keep the audio as is)")
+    parser.add_argument("--nj", type=int, default=None, help="Audio normalization processes")
+    parser.add_argument("--drop_list", default=None,
+                        help="Utterance ids to leave out, e.g. the drop_utts written by find_duplicate_audio.py")
+    args = parser.parse_args()
+    convert_json_to_espnet(args.kurdish_base, args.lang, args.fs, args.nj, args.drop_list)
     print("Kurdish data conversion completed!")
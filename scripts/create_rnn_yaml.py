@@ -1,3 +1,26 @@
+#!/usr/bin/env python3
+"""
+RNN ASR Config for Kurdish, and a Successive-Halving Search Around It
+Without a command, writes conf/train_asr_rnn.yaml as before.
+search: samples configs from a parameter space around the config being tuned (--asr_config of
+        the asr.sh command unless --base_config is given), trains them with asr.sh Stage 11 on CPU
+        (several at a time) for a short budget, and keeps training only the best 1/eta of each
+        budget rung by validation CER (asynchronous successive halving, ASHA), so full runs are
+        spent on promising settings only
+
+Usage: create_rnn_yaml.py search --trials 27 --max_parallel 4 -- ./run.sh
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
 yaml_content = """# Simple RNN ASR config for Kurdish
 # Model - Using simpler RNN instead of transformer
 encoder: rnn
@@ -47,7 +70,249 @@ bpemodel: data/token_list/bpe_unigram100/bpe.model
 log_interval: 10
 """
 
-with open('conf/train_asr_rnn.yaml', 'w') as f:
-    f.write(yaml_content)
+# Set by asr.sh from its --token_type/--bpemodel, so the search configs leave them out
+TOKENIZER_KEYS = ("token_type", "bpemodel")
+# Dotted config key -> list of choices, or {"log_uniform": [low, high]} / {"uniform": [low, high]}
+SEARCH_SPACE = {
+    "encoder_conf.hidden_size": [256, 320, 512],
+    "encoder_conf.num_layers": [2, 3, 4],
+    "encoder_conf.dropout": [0.1, 0.2, 0.3],
+    "decoder_conf.hidden_size": [256, 320, 512],
+    "decoder_conf.num_layers": [1, 2],
+    "decoder_conf.dropout": [0.1, 0.2, 0.3],
+    "model_conf.ctc_weight": [0.3, 0.5, 0.7],
+    "optim_conf.lr": {"log_uniform": [0.0003, 0.003]},
+    "scheduler_conf.warmup_steps": [500, 1000, 2000],
+}
+EPOCH_RESULTS = re.compile(r"(\d+)epoch results: .*?\[valid\]([^\[]*)")
+
+
+def sample_params(space, rng):
+    params = {}
+    for key, spec in space.items():
+        if isinstance(spec, list):
+            params[key] = rng.choice(spec)
+        elif "log_uniform" in spec:
+            low, high = spec["log_uniform"]
+            params[key] = float(f"{math.exp(rng.uniform(math.log(low), math.log(high))):.3g}")
+        else:
+            params[key] = float(f"{rng.uniform(*spec['uniform']):.3g}")
+    return params
+
+
+def load_base_config(path):
+    """The config being tuned, without the tokenizer settings asr.sh supplies"""
+    import yaml
+
+    with open(path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f) or {}
+    for key in TOKENIZER_KEYS:
+        config.pop(key, None)
+    return config
+
+
+def make_config(base, params, max_epoch):
+    """The base config with the sampled values and the rung's epoch budget"""
+    config = json.loads(json.dumps(base))
+    for key, value in params.items():
+        *parents, leaf = key.split(".")
+        node = config
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = value
+    config["max_epoch"] = max_epoch
+    return config
+
+
+def budget_rungs(min_epochs, max_epochs, eta):
+    """Epoch budgets min_epochs * eta^k, ending with max_epochs"""
+    rungs = []
+    epochs = min_epochs
+    while epochs < max_epochs:
+        rungs.append(epochs)
+        epochs *= eta
+    return rungs + [max_epochs]
+
+
+def valid_cer(train_log, max_epoch):
+    """Best validation CER (attention decoder, else CTC) logged up to max_epoch, or None"""
+    if not train_log.exists():
+        return None
+    best = None
+    for epoch, valid in EPOCH_RESULTS.findall(train_log.read_text(encoding='utf-8', errors='replace')):
+        found = re.search(r"\bcer=([0-9.eE+-]+)", valid) or re.search(r"\bcer_ctc=([0-9.eE+-]+)", valid)
+        if found and int(epoch) <= max_epoch:
+            cer = float(found.group(1))
+            best = cer if best is None else min(best, cer)
+    return best
+
+
+class HalvingSearch:
+    """ASHA bookkeeping, saved to <search_dir>/search.json after every finished job so an
+    interrupted search picks up where it stopped (training itself resumes from checkpoints)"""
+
+    def __init__(self, search_dir, space, rungs, eta, n_trials, seed):
+        self.dir = Path(search_dir)
+        self.state_file = self.dir / "search.json"
+        self.space, self.rungs, self.eta, self.n_trials = space, rungs, eta, n_trials
+        self.rng = random.Random(seed)
+        self.trials = []
+        if self.state_file.exists():
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self.trials = json.load(f)["trials"]
+            for _ in self.trials:
+                sample_params(space, self.rng)
+
+    def save(self):
+        tmp = self.state_file.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"space": self.space, "rungs": self.rungs, "eta": self.eta, "trials": self.trials},
+                      f, indent=2)
+        os.replace(tmp, self.state_file)
+
+    def next_job(self, running):
+        """(trial, rung) to run next: a promotion from the highest rung possible, else a new trial"""
+        for rung in reversed(range(len(self.rungs) - 1)):
+            finished = [t for t in self.trials if t["rung"] >= rung and not t["failed"]]
+            ranked = sorted(finished, key=lambda t: t["cer"][rung])
+            for trial in ranked[:len(finished) // self.eta]:
+                if trial["rung"] == rung and trial["id"] not in running:
+                    return trial, rung + 1
+        for trial in self.trials:
+            # Started before an interruption and never finished its first rung
+            if trial["rung"] < 0 and not trial["failed"] and trial["id"] not in running:
+                return trial, 0
+        if len(self.trials) < self.n_trials:
+            trial = {"id": f"t{len(self.trials):03d}", "params": sample_params(self.space, self.rng),
+                     "rung": -1, "cer": [], "failed": False}
+            self.trials.append(trial)
+            return trial, 0
+        return None
+
+    def finish(self, trial, rung, cer):
+        if cer is None:
+            trial["failed"] = True
+        else:
+            trial["rung"] = rung
+            trial["cer"] = trial["cer"][:rung] + [cer]
+        self.save()
+
+    def epochs_spent(self):
+        return sum(self.rungs[t["rung"]] for t in self.trials if t["rung"] >= 0)
+
+    def ranking(self):
+        """Finished trials, furthest rung first, then by CER at that rung"""
+        done = [t for t in self.trials if t["rung"] >= 0]
+        return sorted(done, key=lambda t: (-t["rung"], t["cer"][t["rung"]]))
+
+
+def search(args, command):
+    from pipeline_dag import resolve_paths
+
+    import yaml
+
+    paths = resolve_paths(command)
+    expdir = Path(paths["expdir"])
+    base_config = args.base_config or paths.get("asr_config")
+    if not base_config:
+        sys.exit("No config to tune: give --base_config or --asr_config in the asr.sh command")
+    base = load_base_config(base_config)
+    space = SEARCH_SPACE
+    if args.space:
+        with open(args.space, 'r', encoding='utf-8') as f:
+            space = yaml.safe_load(f)
+    elif base.get("encoder") not in ("rnn", "vgg_rnn"):
+        sys.exit(f"The default search space is for RNN encoders, {base_config} uses "
+                 f"'{base.get('encoder')}'; give a --space")
+    rungs = budget_rungs(args.min_epochs, args.max_epochs, args.eta)
+    hs = HalvingSearch(args.search_dir, space, rungs, args.eta, args.trials, args.seed)
+    (hs.dir / "configs").mkdir(parents=True, exist_ok=True)
+    (hs.dir / "logs").mkdir(parents=True, exist_ok=True)
+    cpus = args.cpus_per_trial or max(1, (os.cpu_count() or 1) // args.max_parallel)
+    env = {**os.environ, "OMP_NUM_THREADS": str(cpus), "MKL_NUM_THREADS": str(cpus)}
+
+    print("=" * 60)
+    print(f"SUCCESSIVE HALVING: {args.trials} trials, epoch rungs {rungs}, keep 1/{args.eta} per rung, "
+          f"{args.max_parallel} at a time x {cpus} CPUs")
+    print(f"Base config: {base_config} (encoder {base.get('encoder')}, {paths.get('token_type')} tokens from asr.sh)")
+    print("=" * 60)
+    running = {}  # trial id -> (trial, rung, Popen, start, log file)
+    start_all = time.time()
+    while True:
+        while len(running) < args.max_parallel:
+            job = hs.next_job(running)
+            if job is None:
+                break
+            trial, rung = job
+            config = hs.dir / "configs" / f"{trial['id']}_e{rungs[rung]}.yaml"
+            with open(config, 'w', encoding='utf-8') as f:
+                yaml.safe_dump(make_config(base, trial["params"], rungs[rung]), f, sort_keys=False)
+            # Later options win in parse_options.sh; Stage 11 resumes from the last rung's checkpoint
+            cmd = command + ["--stage", "11", "--stop_stage", "11", "--ngpu", "0",
+                             "--asr_config", str(config), "--asr_tag", f"search_{trial['id']}"]
+            log = open(hs.dir / "logs" / f"{trial['id']}_e{rungs[rung]}.log", 'w')
+            print(f"▶️  {trial['id']} -> {rungs[rung]} epochs {trial['params']}")
+            running[trial["id"]] = (trial, rung, subprocess.Popen(
+                cmd, stdout=log, stderr=subprocess.STDOUT, env=env), time.time(), log)
+        if not running:
+            break
+        time.sleep(args.poll_seconds)
+        for trial_id, (trial, rung, proc, start, log) in list(running.items()):
+            if proc.poll() is None:
+                continue
+            log.close()
+            del running[trial_id]
+            cer = valid_cer(expdir / f"asr_search_{trial_id}" / "train.log", rungs[rung]) \
+                if proc.returncode == 0 else None
+            hs.finish(trial, rung, cer)
+            if cer is None:
+                print(f"❌ {trial_id}: no validation CER after {time.time() - start:.0f}s, log: {log.name}")
+            else:
+                print(f"✅ {trial_id}: CER {cer:.4f} at {rungs[rung]} epochs ({time.time() - start:.0f}s)")
+
+    ranking = hs.ranking()
+    print("\n" + "=" * 60)
+    print(f"Done in {(time.time() - start_all) / 3600:.2f}h: {hs.epochs_spent()} epochs trained "
+          f"instead of {len(hs.trials) * rungs[-1]} for full runs of every trial")
+    for trial in ranking[:10]:
+        print(f"   {trial['id']}  CER {trial['cer'][trial['rung']]:.4f} at {rungs[trial['rung']]:3d} epochs  "
+              f"{trial['params']}")
+    if ranking:
+        best = ranking[0]
+        with open(hs.dir / "best.yaml", 'w', encoding='utf-8') as f:
+            yaml.safe_dump(make_config(base, best["params"], rungs[-1]), f, sort_keys=False)
+        print(f"🏆 {best['id']} -> {hs.dir / 'best.yaml'} (model: {expdir / ('asr_search_' + best['id'])})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="conf/train_asr_rnn.yaml")
+    sub = parser.add_subparsers(dest="cmd")
+    p = sub.add_parser("search", help="Successive-halving search over RNN configs")
+    p.add_argument("--base_config", help="Config to search around (default: --asr_config of the asr.sh command)")
+    p.add_argument("--space", help="YAML search space (default: SEARCH_SPACE)")
+    p.add_argument("--search_dir", default="exp/rnn_search")
+    p.add_argument("--trials", type=int, default=27)
+    p.add_argument("--min_epochs", type=int, default=1)
+    p.add_argument("--max_epochs", type=int, default=18)
+    p.add_argument("--eta", type=int, default=3, help="Keep the best 1/eta of each rung")
+    p.add_argument("--max_parallel", type=int, default=4, help="Trainings at a time")
+    p.add_argument("--cpus_per_trial", type=int, default=0, help="Threads per training (default: CPUs / max_parallel)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--poll_seconds", type=float, default=10.0)
+    p.add_argument("command", nargs=argparse.REMAINDER, help="-- ./run.sh [asr.sh options]")
+    args = parser.parse_args()
+
+    if args.cmd != "search":
+        with open(args.output, 'w') as f:
+            f.write(yaml_content)
+        print("RNN YAML file created successfully!")
+        return
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        sys.exit("Give the asr.sh command after --")
+    search(args, command)
+
 
-print("RNN YAML file created successfully!")
+if __name__ == "__main__":
+    main()
@@ -1,89 +1,214 @@
 ﻿#!/usr/bin/env python3
 """
 Create Sample Iranian Language Data for WAV2GLOSS
+Generates N utterances per language with lognormal durations, Zipf-distributed speakers
+(disjoint across splits), synthetic 16 kHz voiced audio and text sampled from per-field
+character bigram models of the seed sentences, for load-testing the pipeline
 """
+import argparse
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def create_sample_data_structure():
+import numpy as np
+
+LANGUAGE_CODES = {"balochi": "bal", "kurdish_sorani": "ckb", "kurdish_kurmanji": "kmr"}
+SPLIT_RATIOS = {"train": 0.8, "dev": 0.1, "test": 0.1}
+FIELDS = ("transcription", "underlying_form", "gloss", "translation")
+# (F1, F2) in Hz of the vowels the synthetic syllables cycle through
+VOWEL_FORMANTS = np.array([(730, 1090), (270, 2290), (300, 870), (530, 1840), (570, 840), (440, 1020)])
+
+
+def seed_utterances(lang):
+    """Hand-written seed sentences the character models are trained on"""
+    return {
+        "balochi": [
+            ("من شهْرِ ستّار ءَ", "man šahre stār a", "1SG city Star COP", "I am from Star City"),
+            ("منی نام احمد اِنت", "manī nām ahmad int", "1SG.GEN name Ahmad COP", "My name is Ahmad"),
+        ],
+        "kurdish_sorani": [
+            ("من له شاری هەولێرم", "min le sharî hewlêrim", "1SG from city Hawler COP", "I am from Hawler city"),
+            ("ئەمڕۆ کەشوهەوا زۆر خۆشە", "emro keşuhewa zor xoşe", "today weather very nice.COP",
+             "The weather is very nice today"),
+            ("ئێمە دەچینە بازاڕ", "ême deçîne bazar", "1PL IPFV.go.1PL.to market", "We are going to the market"),
+            ("کتێبەکەم خوێندەوە", "ktêbekem xwêndewe", "book.DEF.1SG read.PST", "I read my book"),
+            ("باوکم لە سلێمانی کار دەکات", "bawkim le slêmanî kar dekat",
+             "father.1SG in Sulaymaniyah work IPFV.do.3SG", "My father works in Sulaymaniyah"),
+        ],
+        "kurdish_kurmanji": [
+            ("Ez ji Amedê me", "ez ji Amedê me", "1SG from Diyarbakir COP", "I am from Diyarbakir"),
+            ("Îro hewa pir xweş e", "îro hewa pir xweş e", "today weather very nice COP",
+             "The weather is very nice today"),
+            ("Em diçin bazarê", "em diçin bazarê", "1PL IPFV.go.1PL market.OBL", "We are going to the market"),
+            ("Min pirtûka xwe xwend", "min pirtûka xwe xwend", "1SG.OBL book.EZ REFL read.PST", "I read my book"),
+            ("Bavê min li Wanê dixebite", "bavê min li Wanê dixebite",
+             "father.EZ 1SG.OBL in Van.OBL IPFV.work.3SG", "My father works in Van"),
+        ],
+    }[lang]
+
+
+class CharBigramModel:
+    """Add-k smoothed character bigram model; sentence boundaries are a newline symbol"""
+
+    def __init__(self, texts, k=0.05):
+        self.symbols = ["\n"] + sorted({c for t in texts for c in t})
+        index = {c: i for i, c in enumerate(self.symbols)}
+        counts = np.full((len(self.symbols), len(self.symbols)), k)
+        for text in texts:
+            ids = [0] + [index[c] for c in text] + [0]
+            np.add.at(counts, (ids[:-1], ids[1:]), 1.0)
+        # Never end a sentence through the model; the caller decides the length
+        counts[:, 0] = 0.0
+        self.cdf = np.cumsum(counts / counts.sum(axis=1, keepdims=True), axis=1)
+
+    def sample(self, rng, n_chars):
+        ids = np.empty(n_chars, dtype=np.int64)
+        state = 0
+        for i, u in enumerate(rng.random(n_chars)):
+            state = min(int(np.searchsorted(self.cdf[state], u)), len(self.symbols) - 1)
+            ids[i] = state
+        return " ".join("".join(self.symbols[i] for i in ids).split())
+
+
+def synthesize(duration, f0, fs, rng):
+    """Voiced syllables with formant-shaped harmonics, pauses, intonation and a noise floor"""
+    n = int(duration * fs)
+    audio = np.zeros(n)
+    syllable = int(fs * rng.uniform(0.15, 0.3))
+    margin = int(fs * rng.uniform(0.1, 0.3))
+    t = np.arange(syllable) / fs
+    harmonics = np.arange(1, int(4000 // f0) + 1)
+    for start in range(margin, n - margin - syllable, syllable):
+        if rng.random() < 0.15:
+            continue  # pause
+        f1, f2 = VOWEL_FORMANTS[rng.integers(len(VOWEL_FORMANTS))] * rng.uniform(0.9, 1.1)
+        pitch = f0 * rng.uniform(0.9, 1.1)
+        freqs = harmonics * pitch
+        weights = np.exp(-((freqs - f1) / 150) ** 2) + 0.5 * np.exp(-((freqs - f2) / 250) ** 2)
+        block = np.sin(2 * np.pi * t[:, None] * freqs[None, :]) @ weights
+        audio[start:start + syllable] += block * np.hanning(syllable)
+    peak = np.abs(audio).max()
+    if peak > 0:
+        audio *= rng.uniform(0.2, 0.7) / peak
+    audio += 10 ** (-rng.uniform(35, 55) / 20) * rng.standard_normal(n)
+    return np.clip(audio, -1, 1)
+
+
+def generate_chunk(job):
+    """Write the audio of one chunk of utterances and return their JSON items"""
+    import soundfile
+
+    split_dir, lang, chunk, fs, seed = job
+    rng = np.random.default_rng(seed)
+    seeds = seed_utterances(lang)
+    models = {field: CharBigramModel([s[i] for s in seeds]) for i, field in enumerate(FIELDS)}
+    # Average length of every field relative to the transcription
+    lengths = np.array([[len(x) for x in s] for s in seeds], dtype=np.float64).mean(axis=0)
+    items = []
+    for utt_id, speaker_f0, duration in chunk:
+        audio_name = f"{utt_id}.wav"
+        soundfile.write(os.path.join(split_dir, "audio", audio_name),
+                        synthesize(duration, speaker_f0, fs, rng), fs, subtype="PCM_16")
+        n_chars = max(int(duration * rng.normal(12.0, 2.0)), 3)
+        item = {"utterance_id": utt_id, "audio_path": f"audio/{audio_name}"}
+        for field, length in zip(FIELDS, lengths):
+            item[field] = models[field].sample(rng, max(int(n_chars * length / lengths[0]), 2))
+        item["translation_language"] = "en"
+        item["duration"] = round(duration, 3)
+        items.append(item)
+    return items
+
+
+def plan_split(lang, split, num_utts, num_speakers, first_speaker, args, rng):
+    """(utt_id, speaker f0, duration) per utterance; speakers follow a Zipf distribution"""
+    ranks = np.arange(1, num_speakers + 1)
+    speaker_p = ranks ** -args.zipf_exponent
+    speakers = rng.choice(num_speakers, num_utts, p=speaker_p / speaker_p.sum()) + first_speaker
+    # Per-speaker pitch, male/female-like spread
+    f0 = {s: float(np.random.default_rng([args.seed, s]).lognormal(np.log(150), 0.3))
+          for s in np.unique(speakers)}
+    durations = np.clip(rng.lognormal(np.log(args.median_duration), args.duration_sigma, num_utts),
+                        args.min_duration, args.max_duration)
+    code = LANGUAGE_CODES[lang]
+    return [(f"{code}s{s:05d}_{split}_{i:07d}", f0[s], float(d))
+            for i, (s, d) in enumerate(zip(speakers, durations))]
+
+
+def create_sample_data_structure(args):
     """Create sample FIELDWORK-style data structure for Iranian languages"""
     print("=" * 60)
     print("CREATING SAMPLE IRANIAN LANGUAGE DATA")
     print("=" * 60)
-    
+
     # Base directory for sample data
-    sample_data_dir = Path(r"C:\CRF\sample_iranian_data")
-    sample_data_dir.mkdir(exist_ok=True)
-    
-    # Iranian languages to add
-    iranian_languages = ["balochi", "kurdish_sorani", "kurdish_kurmanji"]
-    
+    sample_data_dir = Path(args.out_dir)
+    sample_data_dir.mkdir(parents=True, exist_ok=True)
+
     print("📁 Creating sample data structure...")
-    
-    for lang in iranian_languages:
-        lang_dir = sample_data_dir / lang
-        lang_dir.mkdir(exist_ok=True)
-        
-        # Create splits (train, dev, test)
-        for split in ["train", "dev", "test"]:
-            split_dir = lang_dir / split
-            split_dir.mkdir(exist_ok=True)
-            
-            # Create JSON metadata file
-            create_sample_json(split_dir, lang, split)
-            
-            print(f"✅ Created: {lang}/{split}/")
-    
+
+    # Plan every split first, then generate all chunks in one pool pass
+    jobs, owners, splits = [], [], {}
+    for lang in args.languages:
+        rng = np.random.default_rng([args.seed, list(LANGUAGE_CODES).index(lang)])
+        first_speaker = 0
+        for split, ratio in SPLIT_RATIOS.items():
+            split_dir = sample_data_dir / lang / split
+            (split_dir / "audio").mkdir(parents=True, exist_ok=True)
+            num_utts = max(int(round(args.num_utts * ratio)), 1)
+            num_speakers = max(int(round(args.num_speakers * ratio)), 1)
+            plan = plan_split(lang, split, num_utts, num_speakers, first_speaker, args, rng)
+            first_speaker += num_speakers
+            splits[(lang, split)] = (split_dir, num_speakers, [])
+            for i in range(0, len(plan), args.chunk_size):
+                jobs.append((str(split_dir), lang, plan[i:i + args.chunk_size], args.fs,
+                             [args.seed, list(LANGUAGE_CODES).index(lang), first_speaker, i]))
+                owners.append((lang, split))
+
+    with ProcessPoolExecutor(args.nj) as pool:
+        for owner, items in zip(owners, pool.map(generate_chunk, jobs)):
+            splits[owner][2].extend(items)
+
+    summary = {}
+    for (lang, split), (split_dir, num_speakers, items) in splits.items():
+        create_sample_json(split_dir, split, items)
+        hours = sum(item["duration"] for item in items) / 3600
+        summary[f"{lang}/{split}"] = {"utterances": len(items), "speakers": num_speakers, "hours": hours}
+        print(f"✅ Created: {lang}/{split}/ ({len(items)} utterances, {hours:.2f}h)")
+
+    with open(sample_data_dir / "summary.json", 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
     print(f"\n🎉 Sample data structure created at: {sample_data_dir}")
+    return summary
+
+
+def create_sample_json(split_dir, split, items):
+    """Write <split>.json, and data.json with audio paths relative to audio/ for convert_kurdish_data.py"""
+    with open(split_dir / f"{split}.json", 'w', encoding='utf-8') as f:
+        json.dump(items, f, ensure_ascii=False, indent=2)
+    converter_items = [dict(item, audio_path=item["audio_path"][len("audio/"):]) for item in items]
+    with open(split_dir / "data.json", 'w', encoding='utf-8') as f:
+        json.dump(converter_items, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out_dir", default=r"C:\CRF\sample_iranian_data")
+    parser.add_argument("--languages", nargs="+", default=list(LANGUAGE_CODES), choices=list(LANGUAGE_CODES))
+    parser.add_argument("--num_utts", type=int, default=100, help="Utterances per language (all splits)")
+    parser.add_argument("--num_speakers", type=int, default=20, help="Speakers per language (all splits)")
+    parser.add_argument("--zipf_exponent", type=float, default=1.1)
+    parser.add_argument("--median_duration", type=float, default=4.0, help="Seconds")
+    parser.add_argument("--duration_sigma", type=float, default=0.5, help="Lognormal sigma of durations")
+    parser.add_argument("--min_duration", type=float, default=0.5)
+    parser.add_argument("--max_duration", type=float, default=20.0)
+    parser.add_argument("--fs", type=int, default=16000)
+    parser.add_argument("--chunk_size", type=int, default=16, help="Utterances per worker job")
+    parser.add_argument("--nj", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    create_sample_data_structure(parser.parse_args())
 
-def create_sample_json(split_dir, lang, split):
-    """Create sample JSON metadata file"""
-    
-    sample_data = {
-        "balochi": [
-            {
-                "utterance_id": f"{lang}_{split}_001",
-                "audio_path": f"audio/{lang}_{split}_001.wav",
-                "transcription": "من شهْرِ ستّار ءَ",
-                "underlying_form": "man šahre stār a",
-                "gloss": "1SG city Star COP",
-                "translation": "I am from Star City",
-                "translation_language": "en"
-            }
-        ],
-        "kurdish_sorani": [
-            {
-                "utterance_id": f"{lang}_{split}_001",
-                "audio_path": f"audio/{lang}_{split}_001.wav", 
-                "transcription": "من له شاری هەولێرم",
-                "underlying_form": "min le sharî hewlêrim",
-                "gloss": "1SG from city Hawler COP",
-                "translation": "I am from Hawler city",
-                "translation_language": "en"
-            }
-        ],
-        "kurdish_kurmanji": [
-            {
-                "utterance_id": f"{lang}_{split}_001",
-                "audio_path": f"audio/{lang}_{split}_001.wav",
-                "transcription": "Ez ji Amedê me",
-                "underlying_form": "ez ji Amedê me", 
-                "gloss": "1SG from Diyarbakir COP",
-                "translation": "I am from Diyarbakir",
-                "translation_language": "en"
-            }
-        ]
-    }
-    
-    json_file = split_dir / f"{split}.json"
-    with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(sample_data[lang], f, ensure_ascii=False, indent=2)
-    
-    # Create placeholder audio directory
-    audio_dir = split_dir / "audio"
-    audio_dir.mkdir(exist_ok=True)
 
 if __name__ == "__main__":
-    create_sample_data_structure()
+    main()
     print("\n📝 Sample data ready for testing!")
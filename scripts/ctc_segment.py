@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+CTC Segmentation of Long Recordings into Utterances
+Force-aligns paragraph-level transcripts against long recordings with the CTC branch of a
+trained model (ctc_weight > 0). The audio is encoded in overlapping windows, the Viterbi pass
+over the CTC trellis runs in a band of states around the diagonal with NumPy, one recording per
+worker process, and every utterance gets its boundaries and a confidence score (the lowest
+mean log-posterior over any confidence_window frames of its path). Writes audio/, data.json
+(ready for convert_kurdish_data.py), segments and alignments.tsv.
+Input: JSON list of {"recording_id", "audio_path", "speaker"?} with either "utterances"
+(a list of {"transcription", "underlying_form", "gloss", "translation"}) or "transcript"
+(paragraph text, split at line breaks and sentence-final punctuation).
+"""
+import json
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from kurdish_asr_inference import build_speech2text, get_parser, parse_args
+from kurdish_text_norm import normalize
+from normalize_audio import read_audio
+
+SENTENCE_END = re.compile(r"(?<=[.!?؟۔])\s+|\n+")
+
+
+def get_segment_parser():
+    parser = get_parser()
+    group = parser.add_argument_group("Segmentation related")
+    group.add_argument("--input", required=True, help="JSON list of recordings with their transcripts")
+    group.add_argument("--fs", type=int, default=16000, help="Sampling rate of the model")
+    group.add_argument("--window_seconds", type=float, default=30.0, help="Audio encoded per window")
+    group.add_argument("--context_seconds", type=float, default=2.0,
+                       help="Extra audio on both sides of a window, encoded and then dropped")
+    group.add_argument("--batch_windows", type=int, default=4, help="Windows per encoder batch")
+    group.add_argument("--band_states", type=int, default=2000,
+                       help="Trellis states kept per frame around the diagonal")
+    group.add_argument("--confidence_window", type=int, default=30, help="Frames per confidence window")
+    group.add_argument("--min_confidence", type=float,
+                       help="Leave out utterances scoring below this (log posterior)")
+    group.add_argument("--pad_seconds", type=float, default=0.2,
+                       help="Silence kept around each utterance, at most half of the gap to its neighbours")
+    group.add_argument("--nj", type=int, default=None, help="Alignment processes")
+    return parser
+
+
+def split_transcript(recording):
+    """Utterance field dicts of a recording"""
+    if "utterances" in recording:
+        return recording["utterances"]
+    return [{"transcription": s.strip()} for s in SENTENCE_END.split(recording["transcript"]) if s.strip()]
+
+
+def ctc_log_probs(speech2text, audio, fs, window_s, context_s, batch_windows):
+    """(frames, vocab) CTC log-posteriors of a long recording, encoded window by window"""
+    import torch
+
+    model = speech2text.asr_model
+    device = getattr(speech2text, "device", "cpu")
+    win, ctx = int(window_s * fs), int(context_s * fs)
+    chunks = [(s, max(s - ctx, 0), min(s + win + ctx, len(audio))) for s in range(0, len(audio), win)]
+    parts = []
+    for i in range(0, len(chunks), batch_windows):
+        batch = chunks[i:i + batch_windows]
+        lengths = torch.tensor([end - begin for _, begin, end in batch])
+        speech = torch.zeros(len(batch), int(lengths.max()))
+        for row, (_, begin, end) in enumerate(batch):
+            speech[row, :end - begin] = torch.from_numpy(audio[begin:end])
+        with torch.no_grad():
+            enc, enc_lens = model.encode(speech.to(device), lengths.to(device))
+            lpz = model.ctc.log_softmax(enc).cpu().numpy()
+        for row, (s, begin, end) in enumerate(batch):
+            # Keep the frames of the window itself, not of its context
+            rate = int(enc_lens[row]) / (end - begin)
+            first = int(round((s - begin) * rate))
+            last = int(round((min(s + win, len(audio)) - begin) * rate))
+            parts.append(lpz[row, first:last])
+    return np.concatenate(parts)
+
+
+def ctc_states(token_ids, blank):
+    """Blank-interleaved state sequence and the (first, last) state of each utterance"""
+    ext, spans = [blank], []
+    for ids in token_ids:
+        first = len(ext)
+        for i in ids:
+            ext += [i, blank]
+        spans.append((first, len(ext) - 2) if ids else None)
+    return np.array(ext), spans
+
+
+def viterbi(lpz, ext, blank, band):
+    """Best CTC path (state index per frame) through the states within `band` of the diagonal"""
+    n_frames, n_states = len(lpz), len(ext)
+    band = min(band, n_states)
+    lo = np.arange(n_frames) * (n_states - 1) // max(n_frames - 1, 1) - band // 2
+    lo = np.clip(lo, 0, n_states - band)
+    skip = np.zeros(n_states, dtype=bool)
+    skip[2:] = (ext[2:] != blank) & (ext[2:] != ext[:-2])
+
+    # score[s + 2] is state s; the two -inf cells stand in for the predecessors of states 0 and 1
+    score = np.full(n_states + 2, -np.inf)
+    score[2] = lpz[0, ext[0]]
+    if n_states > 1:
+        score[3] = lpz[0, ext[1]]
+    back = np.zeros((n_frames, band), dtype=np.int8)
+    for t in range(1, n_frames):
+        a = lo[t]
+        b = a + band
+        stay, prev = score[a + 2:b + 2], score[a + 1:b + 1]
+        prev2 = np.where(skip[a:b], score[a:b], -np.inf)
+        best = np.maximum(stay, prev)
+        choice = (prev > stay).astype(np.int8)
+        better = prev2 > best
+        best = np.where(better, prev2, best)
+        choice[better] = 2
+        back[t] = choice
+        score[lo[t - 1] + 2:a + 2] = -np.inf
+        score[a + 2:b + 2] = best + lpz[t, ext[a:b]]
+
+    ends = [n_states - 1] + ([n_states - 2] if n_states > 1 else [])
+    state = max(ends, key=lambda s: score[s + 2])
+    if not np.isfinite(score[state + 2]):
+        raise ValueError("no path within the band; raise --band_states or check the transcript")
+    path = np.empty(n_frames, dtype=np.int64)
+    for t in range(n_frames - 1, -1, -1):
+        path[t] = state
+        if t:
+            state -= back[t, state - lo[t]]
+    return path
+
+
+def confidence(frame_lp, window):
+    """Lowest mean log-posterior over `window` consecutive frames"""
+    window = min(window, len(frame_lp))
+    csum = np.concatenate([[0.0], np.cumsum(frame_lp)])
+    return float(np.min(csum[window:] - csum[:-window]) / window)
+
+
+def align_recording(job):
+    """Align, score and cut one recording; returns (recording id, [utterance rows], error)"""
+    import soundfile
+
+    rec, audio, lpz, ext, spans, blank, opts = job
+    try:
+        path = viterbi(lpz, ext, blank, opts["band_states"])
+    except ValueError as e:
+        return rec["recording_id"], [], str(e)
+    frame_lp = lpz[np.arange(len(path)), ext[path]]
+    frame_s = len(audio) / opts["fs"] / len(lpz)
+
+    bounds = []
+    for span in spans:
+        if span is None:
+            bounds.append(None)
+            continue
+        start = int(np.searchsorted(path, span[0]))
+        end = int(np.searchsorted(path, span[1], side="right")) - 1
+        bounds.append((start, end))
+    found = [b for b in bounds if b]
+    rows = []
+    i = -1
+    for k, (fields, b) in enumerate(zip(rec["utterances"], bounds)):
+        if b is None:
+            continue
+        i += 1
+        start_s, end_s = b[0] * frame_s, (b[1] + 1) * frame_s
+        prev_end = (found[i - 1][1] + 1) * frame_s if i else 0.0
+        next_start = found[i + 1][0] * frame_s if i + 1 < len(found) else len(audio) / opts["fs"]
+        start_s = max(start_s - opts["pad_seconds"], (prev_end + start_s) / 2)
+        end_s = min(end_s + opts["pad_seconds"], (end_s + next_start) / 2)
+        score = confidence(frame_lp[b[0]:b[1] + 1], opts["confidence_window"])
+        if opts["min_confidence"] is not None and score < opts["min_confidence"]:
+            continue
+        utt_id = f"{rec['utt_prefix']}_{k:04d}"
+        soundfile.write(str(Path(opts["audio_dir"]) / f"{utt_id}.wav"),
+                        audio[int(start_s * opts["fs"]):int(end_s * opts["fs"])], opts["fs"],
+                        subtype="PCM_16")
+        rows.append({**fields, "utterance_id": utt_id, "audio_path": f"{utt_id}.wav",
+                     "recording_id": rec["recording_id"], "start": round(start_s, 3),
+                     "end": round(end_s, 3), "confidence": round(score, 4)})
+    return rec["recording_id"], rows, None
+
+
+def utt_prefix(rec):
+    """Utterance ids start with the speaker, as utt_speaker() expects"""
+    speaker = rec.get("speaker")
+    if speaker and not rec["recording_id"].startswith(f"{speaker}_"):
+        return f"{speaker}_{rec['recording_id']}"
+    return rec["recording_id"]
+
+
+def main(argv=None):
+    args = parse_args(argv, get_segment_parser())
+    logging.basicConfig(
+        level=args.log_level,
+        format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+    )
+    with open(args.input, 'r', encoding='utf-8') as f:
+        recordings = json.load(f)
+    speech2text = build_speech2text(args)
+    model = speech2text.asr_model
+    if getattr(model, "ctc", None) is None:
+        raise SystemExit("❌ The model has no CTC branch (trained with ctc_weight 0)")
+    blank = getattr(model, "blank_id", 0)
+    unk = speech2text.converter.token2id.get("<unk>")
+
+    out_dir = Path(args.output_dir)
+    audio_dir = out_dir / "audio"
+    audio_dir.mkdir(parents=True, exist_ok=True)
+    opts = {"fs": args.fs, "band_states": args.band_states, "confidence_window": args.confidence_window,
+            "min_confidence": args.min_confidence, "pad_seconds": args.pad_seconds,
+            "audio_dir": str(audio_dir)}
+
+    start = time.time()
+    futures = []
+    with ProcessPoolExecutor(args.nj) as pool:
+        # Encoding (here) overlaps with the alignment of earlier recordings (in the pool)
+        for rec in recordings:
+            rec = {**rec, "utterances": split_transcript(rec), "utt_prefix": utt_prefix(rec)}
+            token_ids = []
+            for fields in rec["utterances"]:
+                tokens = speech2text.tokenizer.text2tokens(normalize(fields.get("transcription") or ""))
+                token_ids.append([i for i in speech2text.converter.tokens2ids(tokens) if i != unk])
+            audio = read_audio(rec["audio_path"], args.fs)
+            lpz = ctc_log_probs(speech2text, audio, args.fs, args.window_seconds,
+                                args.context_seconds, args.batch_windows)
+            ext, spans = ctc_states(token_ids, blank)
+            # Ship only the vocabulary columns the transcript uses, and the audio already read to cut it
+            columns, ext_cols = np.unique(ext, return_inverse=True)
+            futures.append(pool.submit(align_recording, (
+                rec, audio, lpz[:, columns], ext_cols, spans, int(np.flatnonzero(columns == blank)[0]), opts)))
+        results = [f.result() for f in futures]
+
+    items, failed = [], []
+    for rec_id, rows, error in results:
+        if error:
+            failed.append(rec_id)
+            logging.error(f"{rec_id}: {error}")
+        items.extend(rows)
+    with open(out_dir / "data.json", 'w', encoding='utf-8') as f:
+        json.dump(items, f, ensure_ascii=False, indent=2)
+    with open(out_dir / "segments", 'w', encoding='utf-8') as f:
+        for item in items:
+            f.write(f"{item['utterance_id']} {item['recording_id']} {item['start']:.3f} {item['end']:.3f}\n")
+    with open(out_dir / "alignments.tsv", 'w', encoding='utf-8') as f:
+        f.write("utterance_id\trecording_id\tstart\tend\tconfidence\ttranscription\n")
+        for item in sorted(items, key=lambda x: x["confidence"]):
+            f.write(f"{item['utterance_id']}\t{item['recording_id']}\t{item['start']:.3f}\t{item['end']:.3f}\t"
+                    f"{item['confidence']:.4f}\t{item.get('transcription', '')}\n")
+
+    total = sum(len(split_transcript(r)) for r in recordings)
+    print("=" * 60)
+    print(f"Segmented {len(recordings) - len(failed)}/{len(recordings)} recordings into "
+          f"{len(items)}/{total} utterances in {time.time() - start:.1f}s -> {out_dir}")
+    if items:
+        scores = np.array([item["confidence"] for item in items])
+        print(f"   confidence: median {np.median(scores):.3f}, lowest {scores.min():.3f} "
+              f"(lowest first in alignments.tsv)")
+    print(f"   copy {out_dir}/audio and data.json to <kurdish_base>/<split>/ and run convert_kurdish_data.py")
+
+
+if __name__ == "__main__":
+    main()
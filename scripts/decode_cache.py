@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Persistent Decoding Result Cache for Stage 12
+Results are keyed by audio content hash, packed model hash and inference config hash,
+so re-running Stage 12 only decodes new or changed utterances
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from kaldi_data import read_kaldi_map, sha1_file, wav_scp_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    audio_hash TEXT NOT NULL,
+    model_hash TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (audio_hash, model_hash, config_hash)
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL
+);
+"""
+
+
+class DecodeCache:
+    """SQLite-backed store of 1best_recog outputs with size-bounded LRU eviction"""
+
+    def __init__(self, cache_dir, max_entries=1000000, max_mb=2048):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.cache_dir / "decode_cache.db"))
+        self.db.executescript(SCHEMA)
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def file_hash(self, path):
+        """Content hash of a file, memoized by (mtime, size) so unchanged files are not re-read"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        row = self.db.execute(
+            "SELECT sha1 FROM file_hashes WHERE path = ? AND mtime = ? AND size = ?",
+            (path, st.st_mtime, st.st_size)).fetchone()
+        if row:
+            return row[0]
+        digest = sha1_file(path)
+        self.db.execute(
+            "INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+            (path, st.st_mtime, st.st_size, digest))
+        return digest
+
+    def audio_hash(self, wav_value, extra=""):
+        """Hash one wav.scp entry; pipes and ark offsets are hashed by their descriptor"""
+        path = wav_scp_path(wav_value)
+        digest = hashlib.sha1()
+        if path is None or '.ark:' in wav_value:
+            digest.update(wav_value.encode('utf-8'))
+        if path is not None:
+            digest.update(self.file_hash(path).encode('utf-8'))
+        digest.update(extra.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, audio_hash, model_hash, config_hash):
+        """Return the cached outputs dict, or None on a miss"""
+        row = self.db.execute(
+            "SELECT outputs FROM results WHERE audio_hash = ? AND model_hash = ? AND config_hash = ?",
+            (audio_hash, model_hash, config_hash)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.db.execute(
+            "UPDATE results SET last_used = ? WHERE audio_hash = ? AND model_hash = ? AND config_hash = ?",
+            (time.time(), audio_hash, model_hash, config_hash))
+        return json.loads(row[0])
+
+    def put(self, audio_hash, model_hash, config_hash, outputs):
+        """Store the outputs dict ({file name: value}) of one utterance"""
+        payload = json.dumps(outputs, ensure_ascii=False)
+        self.db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+            (audio_hash, model_hash, config_hash, payload, len(payload.encode('utf-8')), time.time()))
+
+    def evict(self):
+        """Drop least recently used entries until both size bounds hold"""
+        count, nbytes = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM results").fetchone()
+        cursor = self.db.execute(
+            "SELECT rowid, nbytes FROM results ORDER BY last_used ASC")
+        doomed = []
+        for rowid, size in cursor:
+            if count <= self.max_entries and nbytes <= self.max_bytes:
+                break
+            doomed.append((rowid,))
+            count -= 1
+            nbytes -= size
+        self.db.executemany("DELETE FROM results WHERE rowid = ?", doomed)
+        self.evicted += len(doomed)
+        return count, nbytes
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def hash_many(cache, files, extra_string=""):
+    """Combined hash of several files plus a free-form string"""
+    digest = hashlib.sha1()
+    for path in files:
+        if path and os.path.isfile(path):
+            digest.update(os.path.basename(path).encode('utf-8'))
+            digest.update(cache.file_hash(path).encode('utf-8'))
+    digest.update(extra_string.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def utterance_hashes(cache, wav_scp, extra_texts):
+    """Audio hash per utterance, folding in per-utterance prompts such as text_prev"""
+    wavs = read_kaldi_map(wav_scp)
+    extras = [read_kaldi_map(p) for p in extra_texts]
+    return {
+        utt: cache.audio_hash(value, "\t".join(e.get(utt, "") for e in extras))
+        for utt, value in wavs.items()
+    }, wavs
+
+
+def lookup(args):
+    """Split a key file into cached results and a key file of utterances still to decode"""
+    cache = DecodeCache(args.cache_dir, args.max_entries, args.max_mb)
+    model_hash = hash_many(cache, args.model_files)
+    config_hash = hash_many(cache, args.config_files, args.config_string)
+    hashes, wavs = utterance_hashes(cache, args.wav_scp, args.extra_text)
+
+    cached = {}
+    misses = []
+    for utt in wavs:
+        outputs = cache.get(hashes[utt], model_hash, config_hash)
+        if outputs is None:
+            misses.append(utt)
+        else:
+            for name, value in outputs.items():
+                cached.setdefault(name, []).append(f"{utt} {value}\n")
+
+    out_dir = Path(args.output_dir) / "1best_recog"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old in out_dir.iterdir():
+        old.unlink()
+    for name, lines in cached.items():
+        with open(out_dir / name, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+
+    with open(args.miss_scp, 'w', encoding='utf-8') as f:
+        for utt in misses:
+            f.write(f"{utt} {wavs[utt]}\n")
+
+    with open(args.info, 'w', encoding='utf-8') as f:
+        json.dump({
+            "cache_dir": str(args.cache_dir),
+            "model_hash": model_hash,
+            "config_hash": config_hash,
+            "misses": {utt: hashes[utt] for utt in misses},
+            "hits": cache.hits,
+        }, f, ensure_ascii=False)
+
+    total = cache.hits + cache.misses
+    rate = 100.0 * cache.hits / total if total else 0.0
+    print(f"decode cache: {cache.hits}/{total} utterances served from cache "
+          f"(hit rate {rate:.1f}%), {cache.misses} to decode")
+    cache.close()
+
+
+def store(args):
+    """Insert freshly decoded utterances into the cache and apply eviction"""
+    with open(args.info, 'r', encoding='utf-8') as f:
+        info = json.load(f)
+    cache = DecodeCache(info["cache_dir"], args.max_entries, args.max_mb)
+
+    decoded = {}
+    for path in sorted(glob.glob(os.path.join(args.logdir, "output.*", "1best_recog", "*"))):
+        name = os.path.basename(path)
+        for utt, value in read_kaldi_map(path).items():
+            decoded.setdefault(utt, {})[name] = value
+
+    stored = 0
+    for utt, audio_hash in info["misses"].items():
+        if utt in decoded:
+            cache.put(audio_hash, info["model_hash"], info["config_hash"], decoded[utt])
+            stored += 1
+    count, nbytes = cache.evict()
+    print(f"decode cache: stored {stored} new results, evicted {cache.evicted}, "
+          f"now {count} entries / {nbytes / 1024 / 1024:.1f} MB")
+    cache.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("lookup", help="Serve cached results and write the key file of misses")
+    p.add_argument("--cache_dir", required=True)
+    p.add_argument("--wav_scp", required=True)
+    p.add_argument("--extra_text", action="append", default=[],
+                   help="Per-utterance text folded into the key, e.g. text_prev")
+    p.add_argument("--model_files", nargs="+", action="extend", default=[])
+    p.add_argument("--config_files", nargs="*", default=[])
+    p.add_argument("--config_string", default="", help="Inference args not stored in a file")
+    p.add_argument("--output_dir", required=True, help="Receives 1best_recog/ for cache hits")
+    p.add_argument("--miss_scp", required=True)
+    p.add_argument("--info", required=True, help="JSON handed over to the store command")
+
+    p = sub.add_parser("store", help="Add newly decoded utterances to the cache")
+    p.add_argument("--info", required=True)
+    p.add_argument("--logdir", required=True, help="Decode logdir holding output.*/1best_recog")
+
+    for p in sub.choices.values():
+        p.add_argument("--max_entries", type=int, default=1000000)
+        p.add_argument("--max_mb", type=float, default=2048)
+
+    args = parser.parse_args()
+    if args.command == "lookup":
+        lookup(args)
+    else:
+        store(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+One-Pass Multi-Task Decoding over Shared Audio
+Decodes the w2g_{transcription,underlying,gloss,translation}_<lang>_test sets together:
+the encoder runs once per recording and every task decoder reuses its output.
+Run it after stage 11 and score with stage 13 (see the example at the end of run.sh)
+"""
+import logging
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from encoder_cache import attach_encoder_cache
+from kaldi_data import read_kaldi_map, sha1_file, wav_scp_path
+from kurdish_asr_inference import (UtteranceReader, build_speech2text, get_parser,
+                                   parse_args, recognize, write_results)
+
+
+def get_multitask_parser():
+    parser = get_parser()
+    group = parser.add_argument_group("Multi-task related")
+    group.add_argument("--task_data_dirs", nargs="+", required=True,
+                       help="Dumped test sets of the different tasks over the same audio")
+    group.add_argument("--use_text_prev", default="false",
+                       help="Feed each task's text_prev prompt to the decoder")
+    group.add_argument("--encoder_cache_size", type=int, default=8,
+                       help="Encoder outputs kept in memory")
+    group.add_argument("--benchmark_utts", type=int, default=0,
+                       help="Also time this many recordings with the per-task loop for comparison")
+    return parser
+
+
+def group_by_audio(task_dirs):
+    """Map each recording (by content hash, since Stage 3 dumps a copy per test set)
+    to the (task, utt_id) pairs that use it"""
+    groups = OrderedDict()
+    for task_dir in task_dirs:
+        for utt, wav in read_kaldi_map(Path(task_dir) / "wav.scp").items():
+            path = wav_scp_path(wav)
+            key = sha1_file(path) if path and '.ark:' not in wav else wav
+            groups.setdefault(key, []).append((task_dir, utt))
+    return groups
+
+
+def build_readers(args, speech2text):
+    readers = {}
+    for task_dir in args.task_data_dirs:
+        specs = [f"{task_dir}/wav.scp,speech,sound"]
+        if str(args.use_text_prev).lower() == "true":
+            specs.append(f"{task_dir}/text_prev,text_prev,text")
+        readers[task_dir] = UtteranceReader(specs, speech2text)
+    return readers
+
+
+def decode_groups(speech2text, readers, groups, writers=None):
+    """Decode recording by recording so consecutive tasks hit the in-memory encoder cache"""
+    for pairs in groups:
+        for task_dir, utt in pairs:
+            results = recognize(speech2text, utt, readers[task_dir][utt])
+            if writers is not None:
+                write_results(writers[task_dir], utt, results)
+
+
+def benchmark(speech2text, readers, groups, cache, n):
+    """Time the per-task loop (no sharing) against the shared-encoder pass on n recordings"""
+    sample = groups[:n]
+    cache.detach()
+    start = time.time()
+    decode_groups(speech2text, readers, sample)
+    per_task = time.time() - start
+    speech2text.asr_model.encode = cache
+    cache.memory.clear()
+    start = time.time()
+    decode_groups(speech2text, readers, sample)
+    shared = time.time() - start
+    cache.memory.clear()
+    logging.info(f"Benchmark on {len(sample)} recordings: per-task loop {per_task:.1f}s, "
+                 f"shared encoder {shared:.1f}s, speedup {per_task / max(shared, 1e-9):.2f}x")
+
+
+def main(argv=None):
+    args = parse_args(argv, get_multitask_parser())
+    logging.basicConfig(
+        level=args.log_level,
+        format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+    )
+    from espnet2.fileio.datadir_writer import DatadirWriter
+
+    speech2text = build_speech2text(args)
+    cache = getattr(speech2text, "encoder_cache", None)
+    if cache is None:
+        cache = attach_encoder_cache(speech2text, args.encoder_cache_size)
+    readers = build_readers(args, speech2text)
+    groups = list(group_by_audio(args.task_data_dirs).values())
+    n_utts = sum(len(g) for g in groups)
+    logging.info(f"{len(args.task_data_dirs)} tasks, {n_utts} utterances over {len(groups)} recordings")
+
+    if args.benchmark_utts > 0:
+        benchmark(speech2text, readers, groups, cache, args.benchmark_utts)
+
+    start = time.time()
+    writers = {d: DatadirWriter(Path(args.output_dir) / Path(d).name / "logdir" / "output.1")
+               for d in args.task_data_dirs}
+    decode_groups(speech2text, readers, groups, writers)
+    for writer in writers.values():
+        writer.close()
+
+    # Same final layout as Stage 12: <output_dir>/<dset>/{text,token,token_int,score}
+    for task_dir in args.task_data_dirs:
+        dset_dir = Path(args.output_dir) / Path(task_dir).name
+        for result in sorted((dset_dir / "logdir" / "output.1" / "1best_recog").iterdir()):
+            lines = sorted(result.read_text(encoding='utf-8').splitlines(keepends=True))
+            (dset_dir / result.name).write_text("".join(lines), encoding='utf-8')
+    logging.info(f"Decoded {n_utts} utterances in {time.time() - start:.1f}s")
+    logging.info(cache.summary())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Per-Utterance RTF and Component Latency Profiling for Stage 12
+Times the frontend, encoder, CTC prefix scoring, attention decoder and LM fusion of every
+utterance into a JSONL file per decode job, and summarizes RTF percentiles and cost breakdowns
+"""
+import argparse
+import glob
+import json
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+COMPONENT_SCORERS = {
+    "ctc": ("ctc",),
+    "decoder": ("decoder",),
+    "lm": ("lm", "ngram", "char_ngram", "word_lm"),
+}
+SCORER_METHODS = ("init_state", "batch_init_state", "score", "batch_score",
+                  "score_partial", "batch_score_partial", "extend_state")
+LENGTH_BUCKETS = (0, 2, 5, 10, 20, float("inf"))
+
+
+class DecodeProfiler:
+    """Wraps Speech2Text components with wall-clock timers. Audio durations come from the
+    utt2dur map when given; otherwise the decoded input must be raw samples at fs"""
+
+    def __init__(self, speech2text, jsonl_path, fs=16000, utt2dur=None):
+        self.speech2text = speech2text
+        self.fs = fs
+        self.utt2dur = utt2dur
+        self.out = open(jsonl_path, 'a', encoding='utf-8')
+        self.current = None
+        asr_model = speech2text.asr_model
+        self._wrap(asr_model, "_extract_feats", "frontend")
+        if getattr(asr_model, "normalize", None) is not None:
+            self._wrap(asr_model.normalize, "forward", "frontend")
+        self._wrap(asr_model.encoder, "forward", "encoder")
+        beam_search = speech2text.beam_search
+        for component, names in COMPONENT_SCORERS.items():
+            for name in names:
+                scorer = beam_search.scorers.get(name) if beam_search is not None else None
+                if scorer is None:
+                    continue
+                for method in SCORER_METHODS:
+                    if hasattr(scorer, method):
+                        self._wrap(scorer, method, component, count_hyps=(component == "decoder"))
+
+    def _wrap(self, owner, attr, component, count_hyps=False):
+        original = getattr(owner, attr)
+        profiler = self
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                if profiler.current is not None:
+                    comps = profiler.current["components"]
+                    comps[component] = comps.get(component, 0.0) + time.perf_counter() - start
+                    if count_hyps and args and hasattr(args[0], "dim"):
+                        profiler.current["hyps_scored"] += args[0].size(0) if args[0].dim() > 1 else 1
+
+        setattr(owner, attr, timed)
+
+    @contextmanager
+    def utterance(self, key, n_samples):
+        """Profile the decoding of one utterance"""
+        beam_search = self.speech2text.beam_search
+        if self.utt2dur is None:
+            duration = n_samples / self.fs
+        elif key in self.utt2dur:
+            duration = self.utt2dur[key]
+        else:
+            raise KeyError(f"{key} is missing from the utt2dur of the decoding profiler")
+        self.current = {
+            "utt": key,
+            "duration": duration,
+            "beam_size": getattr(beam_search, "beam_size", None),
+            "components": {},
+            "hyps_scored": 0,
+        }
+        start = time.perf_counter()
+        try:
+            yield self.current
+        finally:
+            record = self.current
+            self.current = None
+            record["wall"] = time.perf_counter() - start
+            record["components"]["search"] = max(
+                record["wall"] - sum(record["components"].values()), 0.0)
+            record["rtf"] = record["wall"] / max(record["duration"], 1e-9)
+            self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.out.flush()
+
+    def close(self):
+        self.out.close()
+
+
+def load_records(patterns):
+    records = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, 'r', encoding='utf-8') as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def summarize(records):
+    """Markdown summary: RTF percentiles, component shares, length buckets"""
+    if not records:
+        return "No profiling records found.\n"
+    rtf = np.array([r["rtf"] for r in records])
+    total_audio = sum(r["duration"] for r in records)
+    total_wall = sum(r["wall"] for r in records)
+    lines = [
+        "# Decoding profile",
+        "",
+        f"- utterances: {len(records)}",
+        f"- audio: {total_audio:.1f}s, decode wall time: {total_wall:.1f}s, "
+        f"overall RTF: {total_wall / max(total_audio, 1e-9):.3f}",
+        f"- hypotheses per utterance (nbest): "
+        f"{np.mean([r.get('n_hyps', 0) for r in records]):.1f}, "
+        f"decoder hypothesis scorings per utterance: {np.mean([r['hyps_scored'] for r in records]):.0f}",
+        "",
+        "| RTF | mean | p50 | p90 | p95 | p99 | max |",
+        "|---|---|---|---|---|---|---|",
+        "| | " + " | ".join(f"{v:.3f}" for v in (
+            rtf.mean(), *np.percentile(rtf, [50, 90, 95, 99]), rtf.max())) + " |",
+        "",
+        "| component | seconds | share |",
+        "|---|---|---|",
+    ]
+    totals = {}
+    for r in records:
+        for name, seconds in r["components"].items():
+            totals[name] = totals.get(name, 0.0) + seconds
+    for name, seconds in sorted(totals.items(), key=lambda x: -x[1]):
+        lines.append(f"| {name} | {seconds:.1f} | {100 * seconds / max(total_wall, 1e-9):.1f}% |")
+
+    components = sorted(totals)
+    lines += ["", "| length bucket | utts | RTF | " + " | ".join(components) + " |",
+              "|---|---|---|" + "---|" * len(components)]
+    for lo, hi in zip(LENGTH_BUCKETS[:-1], LENGTH_BUCKETS[1:]):
+        bucket = [r for r in records if lo <= r["duration"] < hi]
+        if not bucket:
+            continue
+        wall = sum(r["wall"] for r in bucket)
+        audio = sum(r["duration"] for r in bucket)
+        shares = [100 * sum(r["components"].get(c, 0.0) for r in bucket) / max(wall, 1e-9)
+                  for c in components]
+        label = f"{lo}-{hi}s" if hi != float("inf") else f">{lo}s"
+        lines.append(f"| {label} | {len(bucket)} | {wall / max(audio, 1e-9):.3f} | "
+                     + " | ".join(f"{s:.0f}%" for s in shares) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("jsonl", nargs="+", help="Profile files or glob patterns (profile.*.jsonl)")
+    parser.add_argument("--output", help="Also write the markdown summary here")
+    args = parser.parse_args()
+    report = summarize(load_records(args.jsonl))
+    print(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Encoder Output Cache for Multi-Task Decoding
+The transcription/underlying/gloss/translation test sets share the same audio,
+so the encoder output of an utterance is computed once and reused by every task decoder
+"""
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import torch
+
+
+def tensor_digest(digest, value):
+    """Fold a (nested) encoder argument into a hash"""
+    if isinstance(value, torch.Tensor):
+        digest.update(str(tuple(value.shape)).encode('utf-8'))
+        digest.update(str(value.dtype).encode('utf-8'))
+        digest.update(value.detach().cpu().contiguous().numpy().tobytes())
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            tensor_digest(digest, v)
+    elif isinstance(value, dict):
+        for k in sorted(value):
+            digest.update(str(k).encode('utf-8'))
+            tensor_digest(digest, value[k])
+    else:
+        digest.update(repr(value).encode('utf-8'))
+
+
+class EncoderCache:
+    """Memoizes asr_model.encode in memory (LRU) and optionally on disk"""
+
+    def __init__(self, asr_model, max_entries=8, cache_dir=None):
+        self.asr_model = asr_model
+        self.encode = asr_model.encode
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.memory = OrderedDict()
+        self.calls = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.encode_seconds = 0.0
+        asr_model.encode = self
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        digest = hashlib.sha1()
+        tensor_digest(digest, args)
+        tensor_digest(digest, kwargs)
+        key = digest.hexdigest()
+
+        if key in self.memory:
+            self.memory_hits += 1
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        path = self.cache_dir / f"{key[:2]}/{key}.pt" if self.cache_dir else None
+        if path is not None and path.exists():
+            self.disk_hits += 1
+            result = torch.load(path, map_location=self._device(args, kwargs))
+        else:
+            start = time.time()
+            result = self.encode(*args, **kwargs)
+            self.encode_seconds += time.time() - start
+            if path is not None:
+                path.parent.mkdir(exist_ok=True)
+                torch.save(tuple(r.cpu() if isinstance(r, torch.Tensor) else r for r in result), path)
+        self._remember(key, result)
+        return result
+
+    def _remember(self, key, result):
+        self.memory[key] = result
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    @staticmethod
+    def _device(args, kwargs):
+        for value in list(args) + list(kwargs.values()):
+            if isinstance(value, torch.Tensor):
+                return value.device
+        return "cpu"
+
+    @property
+    def encoder_runs(self):
+        return self.calls - self.memory_hits - self.disk_hits
+
+    def summary(self):
+        return (f"Encoder cache: {self.calls} encode requests, {self.encoder_runs} encoder runs "
+                f"({self.memory_hits} memory hits, {self.disk_hits} disk hits), "
+                f"{self.encode_seconds:.1f}s spent encoding")
+
+    def detach(self):
+        """Restore the original encode method"""
+        self.asr_model.encode = self.encode
+
+
+def attach_encoder_cache(speech2text, max_entries=8, cache_dir=None):
+    cache = EncoderCache(speech2text.asr_model, max_entries, cache_dir)
+    logging.info(f"Encoder outputs are cached (memory: {max_entries}, disk: {cache_dir})")
+    return cache
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Audio Detection across Train/Dev/Test
+Fingerprints every recording with spectral-peak landmarks reduced to a MinHash signature
+(in a process pool), finds candidate pairs with LSH banding instead of comparing all pairs,
+and reports duplicate clusters within and across splits plus a drop list for the converter
+"""
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from kaldi_data import read_kaldi_map, wav_scp_path
+
+FP_RATE = 8000
+N_FFT = 512
+HOP = 256
+PEAKS_PER_SECOND = 30
+FAN_OUT = 5
+MAX_DT = 63
+NUM_PERM = 128
+_rng = np.random.default_rng(20240229)
+# Multiply-shift hash family for MinHash, fixed so signatures are comparable across runs
+PERM_A = (_rng.integers(1, 1 << 63, NUM_PERM, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+PERM_B = _rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64)
+EMPTY = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+
+
+def load_audio(value):
+    """Mono float32 audio at FP_RATE, or None if it cannot be read"""
+    import soundfile
+    from scipy.signal import resample_poly
+
+    path = wav_scp_path(value)
+    if path is None or '.ark:' in value:
+        return None
+    try:
+        audio, fs = soundfile.read(path, dtype="float32", always_2d=True)
+    except RuntimeError:
+        return None
+    audio = audio.mean(axis=1)
+    if fs != FP_RATE:
+        g = np.gcd(fs, FP_RATE)
+        audio = resample_poly(audio, FP_RATE // g, fs // g).astype(np.float32)
+    return audio
+
+
+def landmarks(audio):
+    """Shift- and gain-invariant hashes of spectral-peak pairs (f1, f2, dt)"""
+    from scipy.ndimage import maximum_filter
+
+    if audio is None or len(audio) < N_FFT:
+        return np.zeros(0, dtype=np.uint64)
+    n_frames = 1 + (len(audio) - N_FFT) // HOP
+    frames = np.lib.stride_tricks.sliding_window_view(audio, N_FFT)[::HOP][:n_frames]
+    spec = np.log(np.abs(np.fft.rfft(frames * np.hanning(N_FFT), axis=1)) + 1e-6)
+    is_peak = (maximum_filter(spec, size=(11, 11)) == spec) & (spec > np.median(spec) + 2.0)
+    t, f = np.nonzero(is_peak)
+    if len(t) < 2:
+        return np.zeros(0, dtype=np.uint64)
+    n_keep = max(int(PEAKS_PER_SECOND * len(audio) / FP_RATE), 2)
+    if len(t) > n_keep:
+        keep = np.sort(np.argpartition(-spec[t, f], n_keep)[:n_keep])
+        t, f = t[keep], f[keep]
+    hashes = []
+    for k in range(1, FAN_OUT + 1):
+        dt = t[k:] - t[:-k]
+        ok = (dt > 0) & (dt <= MAX_DT)
+        hashes.append(((f[:-k][ok].astype(np.uint64) << np.uint64(15))
+                       | (f[k:][ok].astype(np.uint64) << np.uint64(6))
+                       | dt[ok].astype(np.uint64)))
+    return np.unique(np.concatenate(hashes))
+
+
+def minhash(hashes):
+    if len(hashes) == 0:
+        return EMPTY
+    mixed = hashes[:, None] * PERM_A[None, :] + PERM_B[None, :]
+    return (mixed >> np.uint64(16)).min(axis=0)
+
+
+def fingerprint(value):
+    audio = load_audio(value)
+    duration = len(audio) / FP_RATE if audio is not None else 0.0
+    return minhash(landmarks(audio)), duration
+
+
+def lsh_candidates(signatures, valid, bands):
+    """Pairs sharing at least one band of their signatures"""
+    rows = NUM_PERM // bands
+    pairs = set()
+    for b in range(bands):
+        buckets = defaultdict(list)
+        band = signatures[:, b * rows:(b + 1) * rows]
+        for i in np.flatnonzero(valid):
+            buckets[band[i].tobytes()].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        self.parent[self.find(a)] = self.find(b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("data_dirs", nargs="+", help="Kaldi data dirs (e.g. train, dev and test)")
+    parser.add_argument("--out_dir", default="data/duplicates")
+    parser.add_argument("--threshold", type=float, default=0.4,
+                        help="Minimum estimated Jaccard similarity of the landmark sets")
+    parser.add_argument("--max_duration_ratio", type=float, default=1.2,
+                        help="Longest/shortest duration allowed within a duplicate pair")
+    parser.add_argument("--bands", type=int, default=32, help="LSH bands (NUM_PERM must divide evenly)")
+    parser.add_argument("--keep_order", nargs="+", default=["test", "dev", "train"],
+                        help="Keep the copy in the first split whose name contains one of these")
+    parser.add_argument("--nj", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    utts, splits, values = [], [], []
+    for data_dir in args.data_dirs:
+        for utt, value in read_kaldi_map(Path(data_dir) / "wav.scp").items():
+            utts.append(utt)
+            splits.append(Path(data_dir).name)
+            values.append(value)
+
+    print("=" * 60)
+    print("NEAR-DUPLICATE AUDIO DETECTION")
+    print("=" * 60)
+    start = time.time()
+    with ProcessPoolExecutor(args.nj) as pool:
+        results = list(pool.map(fingerprint, values, chunksize=32))
+    signatures = np.stack([r[0] for r in results])
+    durations = np.array([r[1] for r in results])
+    fp_time = time.time() - start
+
+    start = time.time()
+    valid = ~np.all(signatures == EMPTY, axis=1)
+    candidates = lsh_candidates(signatures, valid, args.bands)
+    uf = UnionFind(len(utts))
+    similar = {}
+    for i, j in candidates:
+        ratio = max(durations[i], durations[j]) / max(min(durations[i], durations[j]), 1e-9)
+        sim = float(np.mean(signatures[i] == signatures[j]))
+        if sim >= args.threshold and ratio <= args.max_duration_ratio:
+            uf.union(i, j)
+            similar[(i, j)] = sim
+    search_time = time.time() - start
+
+    groups = defaultdict(list)
+    for i in sorted({i for pair in similar for i in pair}):
+        groups[uf.find(i)].append(i)
+    cluster_sim = defaultdict(lambda: 1.0)
+    for (i, _), sim in similar.items():
+        root = uf.find(i)
+        cluster_sim[root] = min(cluster_sim[root], sim)
+
+    def priority(i):
+        return next((k for k, s in enumerate(args.keep_order) if s in splits[i]), len(args.keep_order)), i
+
+    clusters, drop = [], []
+    for root, members in groups.items():
+        keep = min(members, key=priority)
+        drop.extend(i for i in members if i != keep)
+        clusters.append({
+            "keep": utts[keep],
+            "cross_split": len({splits[i] for i in members}) > 1,
+            "min_similarity": round(cluster_sim[root], 3),
+            "members": [{"utt": utts[i], "split": splits[i], "duration": round(float(durations[i]), 3)}
+                        for i in members],
+        })
+    clusters.sort(key=lambda c: (not c["cross_split"], -len(c["members"])))
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / "clusters.json", 'w', encoding='utf-8') as f:
+        json.dump(clusters, f, ensure_ascii=False, indent=1)
+    with open(out_dir / "drop_utts", 'w', encoding='utf-8') as f:
+        f.writelines(f"{utt}\n" for utt in sorted(utts[i] for i in drop))
+
+    n = len(utts)
+    print(f"⚡ Fingerprinted {n} recordings in {fp_time:.1f}s; LSH checked {len(candidates):,} "
+          f"candidate pairs instead of {n * (n - 1) // 2:,} in {search_time:.2f}s")
+    print(f"📊 {len(clusters)} duplicate clusters "
+          f"({sum(c['cross_split'] for c in clusters)} across splits), {len(drop)} utterances to drop, "
+          f"{durations[drop].sum() / 3600:.2f}h of audio")
+    for c in clusters[:10]:
+        print("   " + ", ".join(f"{m['split']}/{m['utt']}" for m in c["members"]))
+    print(f"✅ Wrote {out_dir}/clusters.json and {out_dir}/drop_utts")
+    print(f"   pass --drop_list {out_dir}/drop_utts to convert_kurdish_data.py to leave them out")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Small helpers for reading and writing Kaldi-style data directories
+Shared by the Kurdish data preparation and decoding scripts
+"""
+import hashlib
+import io
+import os
+import subprocess
+
+
+def read_kaldi_map(path):
+    """Read a Kaldi 'key value...' file (wav.scp, text, utt2spk) into an ordered dict"""
+    mapping = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip():
+                continue
+            parts = line.split(maxsplit=1)
+            mapping[parts[0]] = parts[1] if len(parts) > 1 else ""
+    return mapping
+
+
+def write_kaldi_map(path, mapping):
+    """Write an ordered dict back as a Kaldi 'key value' file"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for key, value in mapping.items():
+            f.write(f"{key} {value}\n")
+
+
+def sha1_file(path, chunk_size=1 << 20):
+    """SHA-1 of a file's content, read in chunks"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def wav_scp_path(value):
+    """Return the audio file path of a wav.scp entry, or None for pipes and ark offsets"""
+    value = value.strip()
+    if value.endswith('|'):
+        return None
+    if '.ark:' in value:
+        return value.rsplit(':', 1)[0]
+    return value if os.path.exists(value) else None
+
+
+def utt_speaker(utt_id):
+    """Speaker of an utterance id ('<spk>_<...>'), the convention of convert_kurdish_data.py"""
+    return utt_id.split('_')[0] if '_' in utt_id else 'spk1'
+
+
+def audio_duration(value):
+    """Duration in seconds of a wav.scp entry or audio path, None if it cannot be read"""
+    import soundfile
+
+    path = wav_scp_path(value)
+    if path is None or '.ark:' in value:
+        return None
+    try:
+        info = soundfile.info(path)
+    except RuntimeError:
+        return None
+    return info.frames / info.samplerate
+
+
+def read_wav_scp_audio(value):
+    """Read a wav.scp entry, an audio path or a 'command |' pipe, as float32 (samples, channels)
+    and its sampling rate; ark offsets need kaldiio and are not handled here"""
+    import soundfile
+
+    value = value.strip()
+    if not value.endswith('|'):
+        return soundfile.read(value, dtype="float32", always_2d=True)
+    proc = subprocess.run(value[:-1], shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(f"'{value}' exited with {proc.returncode}: "
+                           f"{proc.stderr.decode(errors='replace').strip()}")
+    return soundfile.read(io.BytesIO(proc.stdout), dtype="float32", always_2d=True)
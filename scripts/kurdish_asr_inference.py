@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Kurdish ASR Decoding Driver for Stage 12
+Drop-in replacement for espnet2.bin.asr_inference that lets us plug our own
+scorers into ESPnet's Speech2Text beam search (e.g. the array n-gram LM)
+"""
+import argparse
+import logging
+import sys
+import time
+
+import numpy as np
+
+from kaldi_data import read_kaldi_map
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", help="Decoding config (e.g. conf/decode_asr.yaml)")
+    parser.add_argument("--log_level", default="INFO")
+    parser.add_argument("--ngpu", type=int, default=0)
+    parser.add_argument("--dtype", default="float32")
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--num_workers", type=int, default=1)
+
+    group = parser.add_argument_group("Input data related")
+    group.add_argument("--data_path_and_name_and_type", action="append", default=[],
+                       help="'path,name,type' as in espnet2.bin.asr_inference")
+    group.add_argument("--key_file")
+    group.add_argument("--output_dir", required=True)
+    group.add_argument("--allow_variable_data_keys", default=False)
+
+    group = parser.add_argument_group("Model related")
+    group.add_argument("--asr_train_config", required=True)
+    group.add_argument("--asr_model_file")
+    group.add_argument("--int8_asr_model_file",
+                       help="Int8 dynamically quantized weights from quantize_asr_model.py "
+                            "(used instead of --asr_model_file)")
+    group.add_argument("--lm_train_config")
+    group.add_argument("--lm_file")
+    group.add_argument("--word_lm_train_config", help="Not supported, as in asr.sh")
+    group.add_argument("--word_lm_file", help="Not supported, as in asr.sh")
+    group.add_argument("--ngram_file")
+    group.add_argument("--model_tag")
+
+    group = parser.add_argument_group("Beam-search related")
+    group.add_argument("--nbest", type=int, default=1)
+    group.add_argument("--beam_size", type=int, default=20)
+    group.add_argument("--penalty", type=float, default=0.0)
+    group.add_argument("--maxlenratio", type=float, default=0.0)
+    group.add_argument("--minlenratio", type=float, default=0.0)
+    group.add_argument("--ctc_weight", type=float, default=0.5)
+    group.add_argument("--lm_weight", type=float, default=1.0)
+    group.add_argument("--ngram_weight", type=float, default=0.9)
+    group.add_argument("--normalize_length", type=str2bool, default=False)
+
+    group = parser.add_argument_group("Text converter related")
+    group.add_argument("--token_type")
+    group.add_argument("--bpemodel")
+
+    group = parser.add_argument_group("Kurdish extensions")
+    group.add_argument("--char_ngram_dir", help="Array n-gram LM trained by char_ngram_lm.py")
+    group.add_argument("--char_ngram_weight", type=float, default=0.3)
+    group.add_argument("--lm_prefix_cache_size", type=int, default=0,
+                       help="Cache LM outputs of up to this many token prefixes across utterances (0 disables)")
+    group.add_argument("--encoder_cache_dir",
+                       help="Share encoder outputs on disk between decoding runs over the same audio")
+    group.add_argument("--profile_jsonl",
+                       help="Write per-utterance RTF and component latencies to this JSONL file")
+    group.add_argument("--profile_fs", type=int, default=16000)
+    group.add_argument("--profile_utt2dur",
+                       help="Audio durations for the RTF (utt2dur); required unless the input is raw audio")
+    return parser
+
+
+def str2bool(value):
+    return str(value).lower() in ("true", "1", "yes")
+
+
+def parse_args(argv=None, parser=None):
+    """Parse arguments, taking defaults from the --config YAML like ESPnet does"""
+    parser = parser or get_parser()
+    args, _ = parser.parse_known_args(argv)
+    if args.config:
+        import yaml
+        with open(args.config, 'r', encoding='utf-8') as f:
+            defaults = yaml.safe_load(f) or {}
+        known = {a.dest for a in parser._actions}
+        unknown = sorted(set(defaults) - known)
+        if unknown:
+            logging.warning(f"Ignoring unsupported decoding options in {args.config}: {unknown}")
+        parser.set_defaults(**{k: v for k, v in defaults.items() if k in known})
+    args = parser.parse_args(argv)
+    if args.word_lm_train_config or args.word_lm_file:
+        parser.error("word LMs (--word_lm_train_config/--word_lm_file) are not supported")
+    return args
+
+
+def build_speech2text(args):
+    """Build ESPnet's Speech2Text and attach the Kurdish scorers to its beam search"""
+    from espnet2.bin.asr_inference import Speech2Text
+
+    if not args.asr_model_file and not args.int8_asr_model_file:
+        raise ValueError("Either --asr_model_file or --int8_asr_model_file is required")
+    speech2text = Speech2Text(
+        asr_train_config=args.asr_train_config,
+        # With int8 weights the float model is only built as a skeleton to quantize
+        asr_model_file=None if args.int8_asr_model_file else args.asr_model_file,
+        lm_train_config=args.lm_train_config,
+        lm_file=args.lm_file,
+        ngram_file=args.ngram_file,
+        token_type=args.token_type,
+        bpemodel=args.bpemodel,
+        device="cuda" if args.ngpu > 0 else "cpu",
+        maxlenratio=args.maxlenratio,
+        minlenratio=args.minlenratio,
+        dtype=args.dtype,
+        beam_size=args.beam_size,
+        ctc_weight=args.ctc_weight,
+        lm_weight=args.lm_weight,
+        ngram_weight=args.ngram_weight,
+        penalty=args.penalty,
+        nbest=args.nbest,
+        normalize_length=args.normalize_length,
+    )
+    if args.int8_asr_model_file:
+        from quantize_asr_model import load_int8_model
+        load_int8_model(speech2text, args.int8_asr_model_file)
+    if args.char_ngram_dir:
+        from char_ngram_lm import CharNgramScorer
+        add_scorer(speech2text, "char_ngram",
+                   CharNgramScorer(args.char_ngram_dir, speech2text.asr_model.token_list),
+                   args.char_ngram_weight)
+    if args.lm_prefix_cache_size > 0:
+        from lm_prefix_cache import attach_prefix_cache
+        speech2text.lm_prefix_cache = attach_prefix_cache(
+            speech2text.beam_search, args.lm_prefix_cache_size)
+        if speech2text.lm_prefix_cache is None:
+            logging.warning("--lm_prefix_cache_size is set but no LM is used for decoding")
+    if args.encoder_cache_dir:
+        from encoder_cache import attach_encoder_cache
+        speech2text.encoder_cache = attach_encoder_cache(speech2text, cache_dir=args.encoder_cache_dir)
+    if args.profile_jsonl:
+        from decode_profiler import DecodeProfiler
+        utt2dur = None
+        if args.profile_utt2dur:
+            utt2dur = {k: float(v) for k, v in read_kaldi_map(args.profile_utt2dur).items()}
+        speech2text.profiler = DecodeProfiler(speech2text, args.profile_jsonl, args.profile_fs, utt2dur)
+    return speech2text
+
+
+def add_scorer(speech2text, name, scorer, weight):
+    """Register an extra full scorer with the already-built beam search"""
+    beam_search = speech2text.beam_search
+    beam_search.scorers[name] = scorer
+    beam_search.full_scorers[name] = scorer
+    beam_search.weights[name] = weight
+    logging.info(f"Added scorer '{name}' with weight {weight}")
+
+
+class UtteranceReader:
+    """Random-access reader over the --data_path_and_name_and_type inputs"""
+
+    def __init__(self, data_path_and_name_and_type, speech2text=None):
+        self.readers = {}
+        self.texts = {}
+        self.speech2text = speech2text
+        for spec in data_path_and_name_and_type:
+            path, name, type_ = spec.split(",")
+            if type_ == "sound":
+                from espnet2.fileio.sound_scp import SoundScpReader
+                self.readers[name] = SoundScpReader(path, always_2d=False)
+            elif type_ == "multi_columns_sound":
+                from espnet2.fileio.sound_scp import SoundScpReader
+                self.readers[name] = SoundScpReader(path, always_2d=False, multi_columns=True)
+            elif type_ == "kaldi_ark":
+                import kaldiio
+                self.readers[name] = kaldiio.load_scp(path)
+            elif type_ == "text":
+                self.texts[name] = read_kaldi_map(path)
+            else:
+                raise ValueError(f"Unsupported input type for {name}: {type_}")
+
+    def keys(self):
+        return list(self.readers.get("speech", {}).keys())
+
+    def __getitem__(self, key):
+        item = {}
+        for name, reader in self.readers.items():
+            value = reader[key]
+            if isinstance(value, tuple):
+                value = value[1]
+            item[name] = np.asarray(value, dtype=np.float32)
+        for name, texts in self.texts.items():
+            item[name] = self.text_to_ids(texts.get(key, ""))
+        return item
+
+    def text_to_ids(self, text):
+        tokens = self.speech2text.tokenizer.text2tokens(text)
+        return np.asarray(self.speech2text.converter.tokens2ids(tokens), dtype=np.int64)
+
+
+def read_keys(key_file, reader):
+    if key_file:
+        return list(read_kaldi_map(key_file).keys())
+    return reader.keys()
+
+
+def write_results(writer, key, results):
+    """Write nbest results in the same layout as espnet2.bin.asr_inference"""
+    for n, (text, token, token_int, hyp) in zip(range(1, len(results) + 1), results):
+        ibest_writer = writer[f"{n}best_recog"]
+        ibest_writer["token"][key] = " ".join(token)
+        ibest_writer["token_int"][key] = " ".join(map(str, token_int))
+        ibest_writer["score"][key] = str(hyp.score)
+        if text is not None:
+            ibest_writer["text"][key] = text
+
+
+def recognize(speech2text, key, batch):
+    """Decode one utterance, profiling it when a DecodeProfiler is attached"""
+    import torch
+
+    profiler = getattr(speech2text, "profiler", None)
+    with torch.no_grad():
+        if profiler is None:
+            return speech2text(**batch)
+        with profiler.utterance(key, len(batch["speech"])) as record:
+            results = speech2text(**batch)
+            record["n_hyps"] = len(results)
+        return results
+
+
+def decode_keys(speech2text, reader, keys, writer):
+    """Decode the given utterances one by one"""
+    for key in keys:
+        results = recognize(speech2text, key, reader[key])
+        write_results(writer, key, results)
+
+
+def inference(args):
+    from espnet2.fileio.datadir_writer import DatadirWriter
+
+    start = time.time()
+    speech2text = build_speech2text(args)
+    reader = UtteranceReader(args.data_path_and_name_and_type, speech2text)
+    keys = read_keys(args.key_file, reader)
+    with DatadirWriter(args.output_dir) as writer:
+        decode_keys(speech2text, reader, keys, writer)
+    logging.info(f"Decoded {len(keys)} utterances in {time.time() - start:.1f}s")
+    if getattr(speech2text, "lm_prefix_cache", None) is not None:
+        logging.info(speech2text.lm_prefix_cache.summary())
+    if getattr(speech2text, "encoder_cache", None) is not None:
+        logging.info(speech2text.encoder_cache.summary())
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=args.log_level,
+        format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+    )
+    if args.batch_size > 1:
+        logging.warning("Only batch_size=1 is supported, decoding one utterance at a time")
+    inference(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
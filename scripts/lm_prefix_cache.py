@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Prefix-Sharing LM State Cache for Beam Search
+A trie of LM outputs keyed by token prefix. Within one utterance every live hypothesis has
+its own prefix, so the cache pays off across utterances: the LM does not see the audio, and the
+opening tokens and common words of one utterance (or of the other w2g tasks decoded over the
+same audio by decode_multitask.py) recur in the next, so they are pushed through the LM once
+"""
+from collections import OrderedDict
+
+try:
+    import torch
+    from espnet.nets.scorer_interface import BatchScorerInterface
+except ImportError:
+    torch = None
+    BatchScorerInterface = object
+
+
+class TrieNode:
+    __slots__ = ("parent", "token", "children", "payload")
+
+    def __init__(self, parent=None, token=None):
+        self.parent = parent
+        self.token = token
+        self.children = {}
+        self.payload = None
+
+
+class PrefixTrieCache:
+    """Token-prefix trie whose payloads are evicted in least-recently-used order"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.root = TrieNode()
+        self.lru = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _node(self, prefix, create):
+        node = self.root
+        for token in prefix:
+            child = node.children.get(token)
+            if child is None:
+                if not create:
+                    return None
+                child = TrieNode(node, token)
+                node.children[token] = child
+            node = child
+        return node
+
+    def get(self, prefix):
+        node = self._node(prefix, create=False)
+        if node is None or node.payload is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.lru.move_to_end(id(node))
+        return node.payload
+
+    def put(self, prefix, payload):
+        node = self._node(prefix, create=True)
+        node.payload = payload
+        self.lru[id(node)] = node
+        self.lru.move_to_end(id(node))
+        while len(self.lru) > self.max_entries:
+            _, old = self.lru.popitem(last=False)
+            old.payload = None
+            self.evicted += 1
+            self._prune(old)
+
+    def _prune(self, node):
+        """Remove payload-less leaves so the trie does not outgrow the LRU bound"""
+        while node.parent is not None and node.payload is None and not node.children:
+            del node.parent.children[node.token]
+            node = node.parent
+
+    def clear(self):
+        self.root = TrieNode()
+        self.lru.clear()
+
+
+class PrefixCachedLMScorer(BatchScorerInterface):
+    """Wraps an ESPnet LM scorer and serves repeated prefixes from a PrefixTrieCache"""
+
+    def __init__(self, lm, max_entries=10000):
+        self.lm = lm
+        self.cache = PrefixTrieCache(max_entries)
+        self.requested = 0
+        self.forwarded = 0
+        self.forward_calls = 0
+
+    def init_state(self, x):
+        # The LM output of a prefix does not depend on the audio, so the cache outlives the utterance
+        return self.lm.init_state(x)
+
+    def batch_init_state(self, x):
+        return self.lm.batch_init_state(x)
+
+    def select_state(self, state, i, new_id=None):
+        return self.lm.select_state(state, i, new_id)
+
+    def score(self, y, state, x):
+        key = tuple(y.tolist())
+        self.requested += 1
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        self.forwarded += 1
+        self.forward_calls += 1
+        result = self.lm.score(y, state, x)
+        self.cache.put(key, result)
+        return result
+
+    def batch_score(self, ys, states, xs):
+        keys = [tuple(y) for y in ys.tolist()]
+        self.requested += len(keys)
+        rows = [None] * len(keys)
+        new_states = [None] * len(keys)
+        todo = []
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is None:
+                todo.append(i)
+            else:
+                rows[i], new_states[i] = cached
+        if todo:
+            self.forwarded += len(todo)
+            self.forward_calls += 1
+            index = torch.tensor(todo, device=ys.device)
+            scores, states_out = self.lm.batch_score(
+                ys[index], [states[i] for i in todo], xs[index])
+            for j, i in enumerate(todo):
+                rows[i], new_states[i] = scores[j], states_out[j]
+                self.cache.put(keys[i], (scores[j], states_out[j]))
+        return torch.stack(rows), new_states
+
+    def stats(self):
+        requested = max(self.requested, 1)
+        return {
+            "requested": self.requested,
+            "forwarded": self.forwarded,
+            "forward_calls": self.forward_calls,
+            "hit_rate": self.cache.hits / max(self.cache.hits + self.cache.misses, 1),
+            "saved_fraction": 1.0 - self.forwarded / requested,
+            "evicted": self.cache.evicted,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"LM prefix cache: hit rate {100 * s['hit_rate']:.1f}%, "
+                f"{s['forwarded']}/{s['requested']} hypothesis prefixes sent to the LM "
+                f"({100 * s['saved_fraction']:.1f}% fewer) in {s['forward_calls']} forward calls, "
+                f"{s['evicted']} evictions")
+
+
+def attach_prefix_cache(beam_search, max_entries, name="lm"):
+    """Replace the LM scorer of an ESPnet beam search with its cached wrapper"""
+    if name not in beam_search.full_scorers:
+        return None
+    wrapper = PrefixCachedLMScorer(beam_search.full_scorers[name], max_entries)
+    beam_search.full_scorers[name] = wrapper
+    beam_search.scorers[name] = wrapper
+    return wrapper
+
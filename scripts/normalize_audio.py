@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Sample-Rate and Channel Normalization of Field Recordings
+Downmixes to mono and resamples to 16 kHz with a polyphase (Kaiser-windowed FIR) resampler in a
+process pool. Outputs are cached by the SHA-1 of the source file, so each recording is converted
+once however often the data is re-converted. 'benchmark' compares the throughput with
+librosa.resample at its default settings.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from kaldi_data import read_kaldi_map, sha1_file, wav_scp_path, write_kaldi_map
+
+TARGET_FS = 16000
+
+
+def needs_conversion(path, fs):
+    """Whether a file is not already fs mono WAV/FLAC; None if it cannot be read"""
+    import soundfile
+
+    try:
+        info = soundfile.info(path)
+    except RuntimeError:
+        return None
+    return not (info.samplerate == fs and info.channels == 1 and info.format in ("WAV", "FLAC"))
+
+
+def resample(audio, fs, target_fs):
+    """Polyphase resampling of mono float audio"""
+    from scipy.signal import resample_poly
+
+    if fs == target_fs:
+        return audio
+    g = np.gcd(fs, target_fs)
+    return resample_poly(audio, target_fs // g, fs // g)
+
+
+def read_audio(path, fs):
+    """Load a recording as float32 mono at the model sampling rate"""
+    import soundfile
+
+    audio, rate = soundfile.read(path, dtype="float32", always_2d=True)
+    audio = resample(audio.mean(axis=1), rate, fs)
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+def convert_one(job):
+    """Write the fs mono PCM_16 WAV of one source; returns (src, dst, audio seconds) or (src, None, 0)"""
+    import soundfile
+
+    src, dst, target_fs = job
+    try:
+        audio, fs = soundfile.read(src, dtype="float32", always_2d=True)
+    except RuntimeError:
+        return src, None, 0.0
+    # Downmix before resampling: one channel to filter instead of two
+    mono = resample(audio.mean(axis=1), fs, target_fs)
+    tmp = f"{dst}.{os.getpid()}.tmp.wav"
+    soundfile.write(tmp, np.clip(mono, -1.0, 1.0), target_fs, subtype="PCM_16")
+    os.replace(tmp, dst)
+    return src, dst, len(audio) / fs
+
+
+class AudioCache:
+    """<cache_dir>/<sha1>_<fs>.wav per source and target rate, with a (path, size, mtime) -> sha1
+    index so unchanged sources are not hashed again"""
+
+    def __init__(self, cache_dir):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.dir / "index.json"
+        self.index = {}
+        if self.index_file.exists():
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def cached_digest(self, path):
+        st = os.stat(path)
+        cached = self.index.get(os.path.abspath(path))
+        return cached[2] if cached and cached[:2] == [st.st_size, st.st_mtime_ns] else None
+
+    def add_digest(self, path, digest):
+        st = os.stat(path)
+        self.index[os.path.abspath(path)] = [st.st_size, st.st_mtime_ns, digest]
+
+    def target(self, digest, target_fs):
+        return str(self.dir / f"{digest}_{target_fs}.wav")
+
+    def save(self):
+        tmp = self.index_file.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_file)
+
+
+def normalize_paths(paths, cache_dir, target_fs=TARGET_FS, nj=None):
+    """{source path: path to use in wav.scp}; conforming and unreadable files map to themselves"""
+    cache = AudioCache(cache_dir)
+    start = time.time()
+    with ProcessPoolExecutor(nj) as pool:
+        flags = list(pool.map(needs_conversion, paths, [target_fs] * len(paths), chunksize=32))
+        todo = [p for p, convert in zip(paths, flags) if convert]
+        digests = {p: cache.cached_digest(p) for p in todo}
+        unhashed = [p for p, d in digests.items() if d is None]
+        for path, digest in zip(unhashed, pool.map(sha1_file, unhashed, chunksize=8)):
+            cache.add_digest(path, digest)
+            digests[path] = digest
+        targets = {p: cache.target(d, target_fs) for p, d in digests.items()}
+        # One job per distinct content that is not in the cache yet
+        jobs = {dst: src for src, dst in targets.items() if not os.path.exists(dst)}
+        seconds = sum(duration for _, dst, duration in pool.map(
+            convert_one, [(src, dst, target_fs) for dst, src in jobs.items()], chunksize=4) if dst)
+    cache.save()
+
+    mapping = {p: p for p in paths}
+    mapping.update({src: dst for src, dst in targets.items() if os.path.exists(dst)})
+    print(f"Audio: {len(targets)}/{len(paths)} files need resampling/downmixing to {target_fs} Hz mono, "
+          f"{len(jobs)} converted ({seconds / 3600:.2f}h of audio) in {time.time() - start:.1f}s, "
+          f"{sum(f is None for f in flags)} unreadable")
+    return mapping
+
+
+def read_and_resample(job):
+    import soundfile
+
+    path, target_fs = job
+    audio, fs = soundfile.read(path, dtype="float32", always_2d=True)
+    resample(audio.mean(axis=1), fs, target_fs)
+    return len(audio) / fs
+
+
+def benchmark(paths, target_fs, nj):
+    """Audio seconds per wall second of polyphase resampling (in memory, and read + resample in
+    the pool) vs librosa.resample with its default res_type"""
+    import librosa
+    import soundfile
+
+    clips = []
+    for path in paths:
+        audio, fs = soundfile.read(path, dtype="float32", always_2d=True)
+        clips.append((audio.mean(axis=1), fs))
+    seconds = sum(len(a) / fs for a, fs in clips)
+
+    start = time.perf_counter()
+    for audio, fs in clips:
+        resample(audio, fs, target_fs)
+    poly = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for audio, fs in clips:
+        librosa.resample(audio, orig_sr=fs, target_sr=target_fs)
+    rosa = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(nj) as pool:
+        list(pool.map(read_and_resample, [(p, target_fs) for p in paths]))
+    pooled = time.perf_counter() - start
+
+    return {"files": len(clips), "audio_seconds": seconds,
+            "polyphase_x_realtime": seconds / poly, "librosa_x_realtime": seconds / rosa,
+            "polyphase_pool_x_realtime": seconds / pooled}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("normalize", help="Normalize the audio of a wav.scp into the cache")
+    p.add_argument("--wav_scp", required=True)
+    p.add_argument("--cache_dir", required=True)
+    p.add_argument("--output", required=True, help="wav.scp pointing to the normalized audio")
+    p.add_argument("--fs", type=int, default=TARGET_FS)
+    p.add_argument("--nj", type=int, default=None)
+    p = sub.add_parser("benchmark", help="Polyphase resampling vs librosa.resample on sampled files")
+    p.add_argument("--wav_scp", required=True)
+    p.add_argument("--samples", type=int, default=50)
+    p.add_argument("--fs", type=int, default=TARGET_FS)
+    p.add_argument("--nj", type=int, default=None)
+    args = parser.parse_args()
+
+    wav_scp = read_kaldi_map(args.wav_scp)
+    paths = {u: wav_scp_path(v) for u, v in wav_scp.items() if '.ark:' not in v}
+    paths = {u: p for u, p in paths.items() if p}
+    if args.cmd == "normalize":
+        mapping = normalize_paths(sorted(set(paths.values())), args.cache_dir, args.fs, args.nj)
+        write_kaldi_map(args.output, {u: mapping.get(paths.get(u), v) for u, v in wav_scp.items()})
+    else:
+        sample = random.Random(0).sample(sorted(paths.values()), min(args.samples, len(paths)))
+        report = benchmark(sample, args.fs, args.nj)
+        print(f"📊 {report['files']} files, {report['audio_seconds']:.0f}s of audio -> {args.fs} Hz")
+        print(f"   polyphase: {report['polyphase_x_realtime']:.0f}x real time per process, "
+              f"{report['polyphase_pool_x_realtime']:.0f}x reading and resampling in the pool")
+        print(f"   librosa:   {report['librosa_x_realtime']:.0f}x real time per process")
+
+
+if __name__ == "__main__":
+    main()
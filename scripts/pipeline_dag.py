@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+DAG Pipeline Driver for asr.sh
+Runs every asr.sh stage (Stages 12 and 13 once per test set) as its own
+'asr.sh ... --stage N --stop_stage N' node. Edges come from the files each stage reads
+and writes, so independent nodes (LM Stages 6-9 next to ASR Stages 10-11, decoding of
+one test set next to scoring of another) run concurrently under CPU/memory/GPU caps.
+A node is skipped when the content hash of its inputs and its command line match the
+last successful run and its outputs exist.
+
+Usage: pipeline_dag.py --max_cpus 32 --max_mem_gb 64 -- ./run.sh --stage 3
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from stage_ledger import summarize
+
+# asr.sh runs these stages with ${nj} / ${inference_nj} parallel jobs
+NJ_STAGES = {3: "nj", 6: "nj", 10: "nj", 12: "inference_nj", 13: "nj"}
+
+
+class Node:
+    def __init__(self, name, stage, inputs, outputs, extra_args=(), cpus=1, gpus=0, group=None):
+        self.name = name
+        self.stage = stage
+        self.inputs = [str(p) for p in inputs]
+        self.outputs = [str(p) for p in outputs]
+        self.extra_args = list(extra_args)
+        self.cpus = cpus
+        self.gpus = gpus
+        self.group = group  # Nodes of the same group never run at the same time
+        self.mem_gb = 0.0
+        self.deps = set()
+        self.priority = 0
+
+    @property
+    def slug(self):
+        return self.name.replace(":", "_").replace("/", "_")
+
+
+def resolve_paths(command):
+    """Paths and options asr.sh resolves from the given arguments (asr.sh --print_paths true)"""
+    out = subprocess.run(command + ["--print_paths", "true"], stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT, text=True)
+    paths = {}
+    for line in out.stdout.splitlines():
+        if line.startswith("asr_sh_path "):
+            key, _, value = line[len("asr_sh_path "):].partition("=")
+            paths[key] = value.strip()
+    if out.returncode != 0 or not paths:
+        sys.exit(f"Cannot resolve the asr.sh paths of {' '.join(command)}:\n{out.stdout}")
+    return paths
+
+
+def build_nodes(p):
+    """The asr.sh stages with the files each one reads and writes"""
+    true = lambda key: p[key] == "true"
+    d = Path(p["data_feats"])
+    train_set = p["train_set"] + ("_sp" if p["speed_perturb_factors"] else "")
+    if int(p.get("augment_copies") or 0):
+        train_set += f"_aug{p['augment_copies']}"
+    valid_set = p["valid_set"]
+    test_sets = p["test_sets"].split()
+    text = p["ref_text_files"] or "text"
+    asr_exp, lm_exp = Path(p["asr_exp"]), Path(p["lm_exp"])
+    asr_model = asr_exp / p["inference_asr_model"]
+    decode_dir = asr_exp / p["inference_tag"]
+
+    nodes = [
+        Node("1", 1, [Path("local/data.sh")],
+             [Path("data") / s for s in [p["train_set"], valid_set] + test_sets]),
+        Node("2", 2, [Path("data") / p["train_set"]], [Path("data") / train_set]),
+        Node("3", 3, [Path("data") / s for s in [train_set, valid_set] + test_sets],
+             [d / "org" / train_set, d / "org" / valid_set] + [d / s for s in test_sets]),
+        Node("4", 4, [d / "org" / train_set, d / "org" / valid_set],
+             [d / train_set, d / valid_set, d / "lm_train.txt"]),
+        Node("5", 5, [p["bpe_train_text"], d / "lm_train.txt"], [p["token_list"], p["lm_token_list"]]),
+        Node("6", 6, [d / "lm_train.txt", p["lm_dev_text"], p["lm_token_list"]], [p["lm_stats_dir"]]),
+        Node("7", 7, [p["lm_stats_dir"], p["lm_token_list"]],
+             [lm_exp / p["inference_lm"], lm_exp / "config.yaml"], gpus=int(p["ngpu"])),
+        Node("8", 8, [lm_exp / p["inference_lm"], p["lm_test_text"]], [lm_exp / "perplexity_test"],
+             gpus=int(p["ngpu"])),
+        Node("9", 9, [d / "lm_train.txt", p["token_list"]],
+             ([Path(p["ngram_exp"]) / p["inference_ngram"]] if true("use_ngram") else [])
+             + ([p["char_ngram_exp"]] if true("use_char_ngram") else [])),
+        Node("10", 10, [d / train_set, d / valid_set, p["token_list"]], [p["asr_stats_dir"]]),
+        Node("11", 11, [p["asr_stats_dir"], p["token_list"]], [asr_model, asr_exp / "config.yaml"],
+             gpus=int(p["ngpu"])),
+    ]
+
+    # Stages 12 and 13 per test set; the validation set is decoded by a node of its own
+    dsets = [(s, s, ["--test_sets", s, "--eval_valid_set", "false"]) for s in test_sets]
+    if true("eval_valid_set"):
+        dsets.append((valid_set, f"org/{valid_set}", ["--test_sets", "", "--eval_valid_set", "true"]))
+    decode_inputs = [asr_model]
+    if true("use_lm"):
+        decode_inputs.append(lm_exp / p["inference_lm"])
+    if true("use_ngram"):
+        decode_inputs.append(Path(p["ngram_exp"]) / p["inference_ngram"])
+    if true("use_char_ngram"):
+        decode_inputs.append(p["char_ngram_exp"])
+    gpus = int(p["inference_nj"]) if true("gpu_inference") else 0
+    for name, dset, extra in dsets:
+        hyp = decode_dir / dset / text
+        # With --share_encoder_cache later test sets reuse the encoder outputs the first one left in
+        # the on-disk cache (kept by stage 12 until the model changes); one writer at a time
+        nodes.append(Node(f"12:{name}", 12, decode_inputs + [d / dset], [hyp], extra, gpus=gpus,
+                          group="decode" if true("share_encoder_cache") else None))
+        # Every scoring run rewrites ${asr_exp}/RESULTS.md from all scored sets
+        nodes.append(Node(f"13:{name}", 13, [hyp, d / dset / text],
+                          [decode_dir / dset / "score_cer", asr_exp / "RESULTS.md"], extra, group="score"))
+
+    packed_model = asr_exp / f"{asr_exp.name}_{Path(p['inference_asr_model']).stem}.zip"
+    nodes.append(Node("14", 14, [asr_model, asr_exp / "RESULTS.md"], [packed_model]))
+    nodes.append(Node("15", 15, [packed_model], []))
+
+    for node in nodes:
+        if node.stage in NJ_STAGES:
+            node.cpus = int(p[NJ_STAGES[node.stage]])
+    return nodes
+
+
+def overlaps(a, b):
+    a, b = Path(a), Path(b)
+    return a == b or a in b.parents or b in a.parents
+
+
+def link(nodes):
+    """A node depends on every earlier-stage node that writes one of its inputs"""
+    for node in nodes:
+        for other in nodes:
+            if other.stage < node.stage and any(
+                    overlaps(i, o) for i in node.inputs for o in other.outputs):
+                node.deps.add(other.name)
+    # Longest chain of dependents first, so the critical path (ASR training) starts early
+    by_name = {n.name: n for n in nodes}
+    for node in sorted(nodes, key=lambda n: -n.stage):
+        for dep in node.deps:
+            by_name[dep].priority = max(by_name[dep].priority, node.priority + 1)
+
+
+def estimate_memory(nodes, ledger_dir):
+    """Per-job peak RSS of each stage in the latest --stage_ledger run, times its job count"""
+    ledgers = sorted(Path(ledger_dir).glob("*.jsonl"), key=lambda f: f.stat().st_mtime)
+    peak = {}
+    for ledger in ledgers:
+        for stage, s in summarize(ledger)[0].items():
+            if s["peak_rss_mb"] > 0:
+                peak[stage] = s["peak_rss_mb"]
+    for node in nodes:
+        node.mem_gb = peak.get(str(node.stage), 0.0) / 1024 * node.cpus
+
+
+class ContentHasher:
+    """sha1 of files and directory trees, cached on (size, mtime) between runs"""
+
+    def __init__(self, cache_file):
+        self.cache_file = Path(cache_file)
+        self.cache = {}
+        if self.cache_file.exists():
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.cache = json.load(f)
+
+    def file(self, path):
+        st = path.stat()
+        key = str(path.resolve())
+        cached = self.cache.get(key)
+        if cached and cached[:2] == [st.st_size, st.st_mtime_ns]:
+            return cached[2]
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        self.cache[key] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def path(self, path):
+        path = Path(path)
+        if path.is_file():
+            return self.file(path)
+        if not path.is_dir():
+            return "missing"
+        h = hashlib.sha1()
+        for root, dirs, files in os.walk(path, followlinks=True):
+            dirs.sort()
+            for name in sorted(files):
+                f = Path(root) / name
+                if f.is_file():
+                    h.update(f"{f.relative_to(path)} {self.file(f)}\n".encode())
+        return h.hexdigest()
+
+    def save(self):
+        tmp = self.cache_file.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f)
+        os.replace(tmp, self.cache_file)
+
+
+def node_digest(node, command, hasher):
+    h = hashlib.sha1(json.dumps(command + node.extra_args).encode())
+    for path in node.inputs:
+        h.update(f"{path} {hasher.path(path)}\n".encode())
+    return h.hexdigest()
+
+
+def up_to_date(node, digest, state_dir):
+    stamp = state_dir / f"{node.slug}.json"
+    if not stamp.exists() or not all(Path(o).exists() for o in node.outputs):
+        return False
+    with open(stamp, 'r', encoding='utf-8') as f:
+        return json.load(f).get("digest") == digest
+
+
+def write_stamp(node, digest, state_dir, seconds):
+    with open(state_dir / f"{node.slug}.json", 'w', encoding='utf-8') as f:
+        json.dump({"node": node.name, "digest": digest, "inputs": node.inputs,
+                   "outputs": node.outputs, "seconds": seconds, "time": time.time()}, f, indent=2)
+
+
+def fits(node, running, args):
+    """Whether node can start next to the running ones; an idle pipeline always takes one"""
+    if not running:
+        return True
+    if node.group and any(r.group == node.group for r in running):
+        return False
+    cpus = sum(min(r.cpus, args.max_cpus) for r in running) + min(node.cpus, args.max_cpus)
+    mem = sum(r.mem_gb for r in running) + node.mem_gb
+    gpus = sum(r.gpus for r in running) + node.gpus
+    return (cpus <= args.max_cpus
+            and (args.max_mem_gb is None or mem <= args.max_mem_gb)
+            and (args.max_gpus is None or gpus <= args.max_gpus))
+
+
+def run(nodes, command, args, state_dir):
+    hasher = ContentHasher(state_dir / "hash_cache.json")
+    log_dir = state_dir / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    pending = {n.name: n for n in nodes}
+    done, failed = set(), set()
+    running = {}  # name -> (node, Popen, digest, start, log file)
+
+    while pending or running:
+        ready = sorted((n for n in pending.values() if n.deps <= done),
+                       key=lambda n: (-n.priority, n.stage, n.name))
+        for node in ready:
+            if not fits(node, [r[0] for r in running.values()], args):
+                continue
+            del pending[node.name]
+            digest = node_digest(node, command, hasher)
+            if not args.force and up_to_date(node, digest, state_dir):
+                print(f"⏭️  {node.name}: inputs unchanged, skipped")
+                done.add(node.name)
+                continue
+            stage = str(node.stage)
+            cmd = command + node.extra_args + ["--stage", stage, "--stop_stage", stage]
+            log = open(log_dir / f"{node.slug}.log", 'w')
+            print(f"▶️  {node.name}: {' '.join(cmd)}")
+            running[node.name] = (node, subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT),
+                                  digest, time.time(), log)
+
+        # Nodes waiting on a failed node can never run
+        for node in [n for n in pending.values() if n.deps & failed]:
+            del pending[node.name]
+            failed.add(node.name)
+            print(f"⚠️  {node.name}: not run, depends on a failed node")
+
+        if not running:
+            if pending:
+                sys.exit(f"Unsatisfiable dependencies: {sorted(pending)}")
+            break
+        time.sleep(args.poll_seconds)
+        for name, (node, proc, digest, start, log) in list(running.items()):
+            if proc.poll() is None:
+                continue
+            log.close()
+            del running[name]
+            seconds = time.time() - start
+            if proc.returncode == 0:
+                write_stamp(node, digest, state_dir, seconds)
+                done.add(name)
+                print(f"✅ {name}: {seconds:.0f}s")
+            else:
+                failed.add(name)
+                print(f"❌ {name}: exit {proc.returncode} after {seconds:.0f}s, log: {log.name}")
+        hasher.save()
+
+    hasher.save()
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stage", type=int, default=1)
+    parser.add_argument("--stop_stage", type=int, default=10000)
+    parser.add_argument("--max_cpus", type=int, default=os.cpu_count(),
+                        help="CPU cap; a stage counts as ${nj} (or ${inference_nj}) CPUs")
+    parser.add_argument("--max_mem_gb", type=float, default=None,
+                        help="Memory cap, estimated from the peak RSS in ${expdir}/ledger (--stage_ledger true)")
+    parser.add_argument("--max_gpus", type=int, default=None,
+                        help="GPU cap (default: number of CUDA_VISIBLE_DEVICES, else no cap)")
+    parser.add_argument("--force", action="store_true", help="Run all selected nodes even if inputs are unchanged")
+    parser.add_argument("--dry_run", action="store_true", help="Print the DAG and what would be skipped")
+    parser.add_argument("--poll_seconds", type=float, default=2.0)
+    parser.add_argument("command", nargs=argparse.REMAINDER,
+                        help="asr.sh (or run.sh) command line; stage options are appended per node")
+    args = parser.parse_args()
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        parser.error("Give the asr.sh command after --")
+    if args.max_gpus is None and os.environ.get("CUDA_VISIBLE_DEVICES"):
+        args.max_gpus = len(os.environ["CUDA_VISIBLE_DEVICES"].split(","))
+
+    paths = resolve_paths(command)
+    skip = set(paths["skip_stages"].split())
+    nodes = [n for n in build_nodes(paths)
+             if args.stage <= n.stage <= args.stop_stage and str(n.stage) not in skip]
+    if not paths["speed_perturb_factors"] and not int(paths.get("augment_copies") or 0):
+        nodes = [n for n in nodes if n.stage != 2]
+    link(nodes)
+    for node in nodes:
+        node.deps &= {n.name for n in nodes}
+    estimate_memory(nodes, Path(paths["expdir"]) / "ledger")
+    state_dir = Path(paths["expdir"]) / "dag"
+    state_dir.mkdir(parents=True, exist_ok=True)
+
+    print("=" * 60)
+    print("ASR PIPELINE DAG")
+    print("=" * 60)
+    hasher = ContentHasher(state_dir / "hash_cache.json")
+    for node in sorted(nodes, key=lambda n: (n.stage, n.name)):
+        after = ", ".join(sorted(node.deps, key=lambda s: (int(s.split(":")[0]), s))) or "-"
+        line = f"   {node.name:24s} cpus={node.cpus:<3d} gpus={node.gpus:<2d} mem={node.mem_gb:5.1f}G after: {after}"
+        if args.dry_run:
+            stale = args.force or not up_to_date(node, node_digest(node, command, hasher), state_dir)
+            line += "" if stale else "  (unchanged)"
+        print(line)
+    if args.dry_run:
+        hasher.save()
+        return
+
+    start = time.time()
+    failed = run(nodes, command, args, state_dir)
+    print(f"\nPipeline finished in {time.time() - start:.0f}s")
+    if failed:
+        print(f"❌ Failed or not run: {', '.join(sorted(failed))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Dataset Health Profiler
+Scans a Kaldi data dir in a process pool and measures per utterance duration, RMS/peak level,
+clipping, leading/trailing silence, estimated SNR and characters per second; writes an NPZ
+table and a markdown report with recommended cutoffs and an exclude list for Stage 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from kaldi_data import read_kaldi_map, wav_scp_path
+
+FRAME_SECONDS = 0.025
+CLIP_LEVEL = 0.999
+SILENCE_DB = -45.0  # frames below this level (dBFS) count as silence
+METRICS = ("duration", "rms_db", "peak_db", "clip_ratio", "lead_silence", "trail_silence",
+           "speech_seconds", "snr_db", "chars", "chars_per_second")
+
+
+def frame_energies_db(audio, fs):
+    """Frame RMS levels in dBFS over non-overlapping frames"""
+    size = max(int(FRAME_SECONDS * fs), 1)
+    n = len(audio) // size
+    if n == 0:
+        return np.full(1, 10 * np.log10(np.mean(audio ** 2) + 1e-12))
+    frames = audio[:n * size].reshape(n, size)
+    return 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+
+
+def profile_one(job):
+    """Signal statistics of one utterance; NaNs if the audio cannot be read"""
+    import soundfile
+
+    utt, value = job
+    row = dict.fromkeys(METRICS[:-2], np.nan)
+    path = wav_scp_path(value)
+    if path is None or '.ark:' in value:
+        return utt, row
+    try:
+        audio, fs = soundfile.read(path, dtype="float32", always_2d=True)
+    except RuntimeError:
+        return utt, row
+    audio = audio.mean(axis=1)
+    if len(audio) == 0:
+        row["duration"] = 0.0
+        return utt, row
+    energies = frame_energies_db(audio, fs)
+    voiced = np.flatnonzero(energies > SILENCE_DB)
+    peak = float(np.max(np.abs(audio)))
+    row.update({
+        "duration": len(audio) / fs,
+        "rms_db": float(10 * np.log10(np.mean(audio ** 2) + 1e-12)),
+        "peak_db": float(20 * np.log10(peak + 1e-12)),
+        "clip_ratio": float(np.mean(np.abs(audio) >= CLIP_LEVEL)),
+        "lead_silence": (voiced[0] if len(voiced) else len(energies)) * FRAME_SECONDS,
+        "trail_silence": (len(energies) - 1 - voiced[-1] if len(voiced) else len(energies)) * FRAME_SECONDS,
+        "speech_seconds": len(voiced) * FRAME_SECONDS,
+        # Energy-percentile SNR: loud frames against the noise floor
+        "snr_db": float(np.percentile(energies, 95) - np.percentile(energies, 10)),
+    })
+    return utt, row
+
+
+def robust_bounds(values, k):
+    """median +- k robust standard deviations (1.4826 MAD)"""
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return np.nan, np.nan
+    median = np.median(values)
+    mad = 1.4826 * np.median(np.abs(values - median))
+    return median - k * mad, median + k * mad
+
+
+def recommend(table, args):
+    """Duration and chars-per-second cutoffs plus the utterances that fail them"""
+    duration = table["duration"]
+    lo, hi = robust_bounds(np.log(np.clip(duration, 1e-3, None)), args.k)
+    min_dur = max(float(np.floor(np.exp(lo) * 10) / 10), args.floor_duration)
+    max_dur = float(np.ceil(np.exp(hi)))
+    cps = table["chars_per_second"]
+    cps_lo, cps_hi = robust_bounds(cps, args.k)
+    rules = {
+        "unreadable": ~np.isfinite(duration),
+        "too_short": duration <= min_dur,
+        "too_long": duration >= max_dur,
+        "near_silent": (table["speech_seconds"] < args.min_speech) | (table["rms_db"] < args.silent_db),
+        "clipped": table["clip_ratio"] > args.max_clip_ratio,
+        "chars_per_second": np.isfinite(cps) & ((cps < max(cps_lo, 0.0)) | (cps > cps_hi)),
+    }
+    return {"min_wav_duration": min_dur, "max_wav_duration": max_dur,
+            "min_chars_per_second": float(max(cps_lo, 0.0)), "max_chars_per_second": float(cps_hi)}, rules
+
+
+def markdown_report(data_dir, table, cutoffs, rules, elapsed):
+    duration = np.nan_to_num(table["duration"])
+    total = duration.sum()
+    lines = [
+        f"# Dataset profile: {data_dir}",
+        "",
+        f"- utterances: {len(duration)}, audio: {total / 3600:.2f}h, scanned in {elapsed:.1f}s",
+        "",
+        "| metric | p1 | p5 | p50 | p95 | p99 |",
+        "|---|---|---|---|---|---|",
+    ]
+    for name in METRICS:
+        values = table[name][np.isfinite(table[name])]
+        if len(values):
+            lines.append(f"| {name} | " + " | ".join(
+                f"{v:.3g}" for v in np.percentile(values, [1, 5, 50, 95, 99])) + " |")
+    lines += [
+        "",
+        "## Recommended cutoffs",
+        "",
+        f"`--min_wav_duration {cutoffs['min_wav_duration']:g} --max_wav_duration {cutoffs['max_wav_duration']:g}`, "
+        f"characters per second in [{cutoffs['min_chars_per_second']:.1f}, {cutoffs['max_chars_per_second']:.1f}]",
+        "",
+        "| rule | utterances | audio (h) | share of audio |",
+        "|---|---|---|---|",
+    ]
+    excluded = np.zeros(len(duration), dtype=bool)
+    for name, mask in rules.items():
+        excluded |= mask
+        lines.append(f"| {name} | {int(mask.sum())} | {duration[mask].sum() / 3600:.2f} | "
+                     f"{100 * duration[mask].sum() / max(total, 1e-9):.1f}% |")
+    lines.append(f"| **any** | {int(excluded.sum())} | {duration[excluded].sum() / 3600:.2f} | "
+                 f"{100 * duration[excluded].sum() / max(total, 1e-9):.1f}% |")
+    return "\n".join(lines) + "\n", excluded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("data_dir", help="Kaldi data dir with wav.scp (and text)")
+    parser.add_argument("--out_dir", help="Report directory (default: <data_dir>/profile)")
+    parser.add_argument("--nj", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--k", type=float, default=3.5, help="Robust standard deviations for the cutoffs")
+    parser.add_argument("--floor_duration", type=float, default=0.3)
+    parser.add_argument("--min_speech", type=float, default=0.2, help="Seconds of non-silent audio")
+    parser.add_argument("--silent_db", type=float, default=-50.0)
+    parser.add_argument("--max_clip_ratio", type=float, default=0.01)
+    parser.add_argument("--parquet", action="store_true", help="Also write profile.parquet (needs pandas)")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    out_dir = Path(args.out_dir or data_dir / "profile")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    wavs = read_kaldi_map(data_dir / "wav.scp")
+    texts = read_kaldi_map(data_dir / "text") if (data_dir / "text").exists() else {}
+
+    start = time.time()
+    with ProcessPoolExecutor(args.nj) as pool:
+        rows = dict(pool.map(profile_one, wavs.items(), chunksize=64))
+    elapsed = time.time() - start
+
+    utts = list(wavs)
+    table = {name: np.array([rows[u][name] for u in utts], dtype=np.float64) for name in METRICS[:-2]}
+    table["chars"] = np.array([len(texts.get(u, "").replace(" ", "")) if u in texts else np.nan
+                               for u in utts], dtype=np.float64)
+    table["chars_per_second"] = table["chars"] / np.maximum(table["speech_seconds"], FRAME_SECONDS)
+    np.savez_compressed(out_dir / "profile.npz", utt=np.array(utts), **table)
+    if args.parquet:
+        import pandas as pd
+        pd.DataFrame({"utt": utts, **table}).to_parquet(out_dir / "profile.parquet")
+
+    cutoffs, rules = recommend(table, args)
+    report, excluded = markdown_report(data_dir, table, cutoffs, rules, elapsed)
+    (out_dir / "report.md").write_text(report, encoding='utf-8')
+    with open(out_dir / "exclude_utts", 'w', encoding='utf-8') as f:
+        for i in np.flatnonzero(excluded):
+            reasons = ",".join(name for name, mask in rules.items() if mask[i])
+            f.write(f"{utts[i]} {reasons}\n")
+
+    print(report)
+    print(f"✅ Wrote {out_dir}/profile.npz, report.md and exclude_utts "
+          f"(use with asr.sh --utt_exclude_list {out_dir}/exclude_utts)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Int8 Dynamic Quantization of the RNN ASR Model for CPU Inference
+Quantizes the LSTM and Linear layers of the vgg_rnn encoder / rnn decoder, checks CER on
+the valid set against the float model (accuracy guard) and reports RTF and memory
+"""
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import torch
+
+from kaldi_data import read_kaldi_map
+from score_asr import char_error_rate
+
+QUANTIZED_MODULES = {torch.nn.LSTM, torch.nn.Linear}
+
+
+def quantize_model(model):
+    """Swap LSTM/Linear layers for int8 dynamically quantized ones, in place"""
+    model.eval()
+    torch.quantization.quantize_dynamic(model, QUANTIZED_MODULES, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def load_int8_model(speech2text, int8_model_file):
+    """Quantize a Speech2Text model skeleton and load the packed int8 weights into it"""
+    quantize_model(speech2text.asr_model)
+    # Packed int8 params are not plain tensors, so the weights-only unpickler (torch>=2.6 default) rejects them
+    state = torch.load(int8_model_file, map_location="cpu", weights_only=False)
+    speech2text.asr_model.load_state_dict(state)
+    return speech2text
+
+
+def state_dict_bytes(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_speech2text(args, int8_model_file=None):
+    from espnet2.bin.asr_inference import Speech2Text
+
+    speech2text = Speech2Text(asr_train_config=args.asr_train_config,
+                              asr_model_file=None if int8_model_file else args.asr_model_file,
+                              device="cpu", beam_size=args.beam_size, ctc_weight=args.ctc_weight)
+    if int8_model_file:
+        load_int8_model(speech2text, int8_model_file)
+    return speech2text
+
+
+def evaluate_model(args, keys, int8_model_file=None):
+    """CER, RTF and peak RSS of one model, loaded the way Stage 12 loads it.
+    Runs in its own process so the RSS of the other model is not counted"""
+    from kurdish_asr_inference import UtteranceReader
+
+    torch.set_num_threads(args.nthreads)
+    speech2text = build_speech2text(args, int8_model_file)
+    reader = UtteranceReader([f"{args.valid_dir}/wav.scp,speech,sound"], speech2text)
+    refs = read_kaldi_map(Path(args.valid_dir) / "text")
+    cer, rtf = evaluate(speech2text, reader, refs, keys, args.fs)
+    return cer, rtf, peak_rss_mb()
+
+
+def evaluate_in_process(args, keys, int8_model_file=None):
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(evaluate_model, args, keys, int8_model_file).result()
+
+
+def evaluate(speech2text, reader, refs, keys, fs):
+    """CER (%) and RTF of a Speech2Text model on the given utterances"""
+    from kurdish_asr_inference import recognize
+
+    hyps = {}
+    audio_seconds = 0.0
+    start = time.time()
+    for key in keys:
+        batch = reader[key]
+        audio_seconds += len(batch["speech"]) / fs
+        results = recognize(speech2text, key, batch)
+        hyps[key] = results[0][0] if results and results[0][0] is not None else ""
+    elapsed = time.time() - start
+    cer = char_error_rate({k: refs[k] for k in keys}, hyps)
+    return cer, elapsed / max(audio_seconds, 1e-9)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--asr_train_config", required=True)
+    parser.add_argument("--asr_model_file", required=True)
+    parser.add_argument("--output", required=True, help="Where to write the int8 state dict")
+    parser.add_argument("--valid_dir", help="Dumped valid set (wav.scp + text) for the accuracy guard")
+    parser.add_argument("--max_utts", type=int, default=200)
+    parser.add_argument("--max_cer_increase", type=float, default=0.5,
+                        help="Allowed absolute CER increase in percent points")
+    parser.add_argument("--beam_size", type=int, default=10)
+    parser.add_argument("--ctc_weight", type=float, default=0.3)
+    parser.add_argument("--fs", type=int, default=16000)
+    parser.add_argument("--nthreads", type=int, default=1)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level="INFO", format="%(asctime)s %(levelname)s: %(message)s")
+    torch.set_num_threads(args.nthreads)
+
+    speech2text = build_speech2text(args)
+    float_bytes = state_dict_bytes(speech2text.asr_model)
+    quantize_model(speech2text.asr_model)
+    int8_bytes = state_dict_bytes(speech2text.asr_model)
+    # Only renamed to --output once the accuracy guard passes
+    tmp_output = f"{args.output}.tmp"
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    torch.save(speech2text.asr_model.state_dict(), tmp_output)
+    del speech2text
+
+    report = {
+        "float_model_mb": float_bytes / 1024 ** 2,
+        "int8_model_mb": int8_bytes / 1024 ** 2,
+        "int8_model_file": args.output,
+    }
+    passed = True
+    if args.valid_dir:
+        refs = read_kaldi_map(Path(args.valid_dir) / "text")
+        keys = [k for k in read_kaldi_map(Path(args.valid_dir) / "wav.scp") if k in refs][:args.max_utts]
+        float_cer, float_rtf, float_rss = evaluate_in_process(args, keys)
+        int8_cer, int8_rtf, int8_rss = evaluate_in_process(args, keys, tmp_output)
+        passed = int8_cer - float_cer <= args.max_cer_increase
+        report.update({
+            "valid_utts": len(keys),
+            "float_cer": float_cer,
+            "int8_cer": int8_cer,
+            "float_rtf": float_rtf,
+            "int8_rtf": int8_rtf,
+            "float_peak_rss_mb": float_rss,
+            "int8_peak_rss_mb": int8_rss,
+            "max_cer_increase": args.max_cer_increase,
+            "passed": passed,
+        })
+    report_path = Path(args.output).with_suffix(".json")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print("=" * 60)
+    print("INT8 DYNAMIC QUANTIZATION")
+    print("=" * 60)
+    print(f"📦 Model size: {report['float_model_mb']:.1f} MB float -> {report['int8_model_mb']:.1f} MB int8")
+    if args.valid_dir:
+        print(f"📝 CER: {report['float_cer']:.2f}% float, {report['int8_cer']:.2f}% int8 "
+              f"on {report['valid_utts']} valid utterances")
+        print(f"⚡ RTF: {report['float_rtf']:.3f} float, {report['int8_rtf']:.3f} int8 "
+              f"({args.nthreads} thread(s))")
+        print(f"💾 Peak RSS: {report['float_peak_rss_mb']:.0f} MB float, "
+              f"{report['int8_peak_rss_mb']:.0f} MB int8")
+    if not passed:
+        print(f"❌ CER increase exceeds {args.max_cer_increase} points, the int8 model is rejected")
+        os.remove(tmp_output)
+        sys.exit(1)
+    os.replace(tmp_output, args.output)
+    print(f"✅ Wrote {args.output} and {report_path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Cached SQLite Index of ESPnet / WAV2GLOSS Checkouts for the analyze_* Scripts
+Files, text contents, Python functions, LANGUAGES tuples and flattened YAML recipe
+configs are indexed once; later runs only re-read files whose size or mtime changed.
+"""
+import argparse
+import ast
+import fnmatch
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path, PurePosixPath
+
+import yaml
+
+TEXT_SUFFIXES = {".py", ".sh", ".yaml", ".yml", ".md", ".txt", ".json", ".cfg", ".conf", ".toml", ".pl", ""}
+MAX_TEXT_BYTES = 1 << 20
+SKIP_DIRS = {".git", "__pycache__", "node_modules", ".ipynb_checkpoints"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, parent TEXT, name TEXT, is_dir INTEGER, size INTEGER, mtime_ns INTEGER);
+CREATE INDEX IF NOT EXISTS files_parent ON files (parent);
+CREATE INDEX IF NOT EXISTS files_name ON files (name);
+CREATE TABLE IF NOT EXISTS contents (path TEXT PRIMARY KEY, text TEXT);
+CREATE TABLE IF NOT EXISTS functions (path TEXT, name TEXT, line INTEGER, doc TEXT);
+CREATE INDEX IF NOT EXISTS functions_path ON functions (path);
+CREATE TABLE IF NOT EXISTS languages (path TEXT, position INTEGER, name TEXT);
+CREATE INDEX IF NOT EXISTS languages_path ON languages (path);
+CREATE TABLE IF NOT EXISTS config_keys (path TEXT, key TEXT, value TEXT);
+CREATE INDEX IF NOT EXISTS config_keys_path ON config_keys (path);
+"""
+
+
+def default_db(root):
+    cache = Path(os.environ.get("RECIPE_INDEX_DIR", Path.home() / ".cache" / "recipe_index"))
+    digest = hashlib.sha1(str(Path(root).resolve()).encode()).hexdigest()[:12]
+    return cache / f"{Path(root).name}_{digest}.sqlite"
+
+
+def python_symbols(text):
+    """(functions as (name, line, first docstring/comment line), LANGUAGES entries) of a module"""
+    functions, languages = [], []
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return functions, languages
+    lines = text.split("\n")
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            doc = ""
+            # First docstring or comment line of the next few lines, as the analyze scripts print it
+            for line in lines[node.lineno:node.lineno + 4]:
+                if '"""' in line or "'''" in line or '#' in line:
+                    doc = line.strip()
+                    break
+            functions.append((node.name, node.lineno, doc))
+        elif isinstance(node, ast.Assign) and any(
+                isinstance(t, ast.Name) and t.id == "LANGUAGES" for t in node.targets):
+            if isinstance(node.value, (ast.Tuple, ast.List)):
+                languages = [e.value for e in node.value.elts
+                             if isinstance(e, ast.Constant) and isinstance(e.value, str)]
+    return sorted(functions, key=lambda f: f[1]), languages
+
+
+def flatten_config(text):
+    """Dotted key -> scalar value of a YAML config"""
+    try:
+        docs = list(yaml.safe_load_all(text))
+    except yaml.YAMLError:
+        return []
+    items = []
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                walk(f"{prefix}.{k}" if prefix else str(k), v)
+        elif isinstance(value, list) and any(isinstance(v, (dict, list)) for v in value):
+            for i, v in enumerate(value):
+                walk(f"{prefix}.{i}", v)
+        else:
+            items.append((prefix, str(value)))
+
+    for doc in docs:
+        walk("", doc)
+    return items
+
+
+class RecipeIndex:
+    """Index of one directory tree; paths in and out are relative to the root unless noted"""
+
+    def __init__(self, root, db_path=None, max_age=60.0):
+        self.root = Path(root)
+        self.db_path = Path(db_path) if db_path else default_db(root)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.executescript(SCHEMA)
+        self.changes = (0, 0)
+        last = self.db.execute("SELECT value FROM meta WHERE key = 'scanned'").fetchone()
+        if last is None or time.time() - float(last[0]) > max_age:
+            self.changes = self.update()
+
+    # ---- Building ----
+
+    def update(self):
+        """Re-scan the tree; only new or changed files are read again. Returns (changed, removed)"""
+        known = {path: (size, mtime) for path, size, mtime in
+                 self.db.execute("SELECT path, size, mtime_ns FROM files")}
+        seen, changed = set(), []
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            try:
+                entries = list(os.scandir(self.root / rel))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name in SKIP_DIRS:
+                    continue
+                path = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    is_dir = entry.is_dir()
+                    st = entry.stat()
+                except OSError:
+                    continue
+                seen.add(path)
+                size = 0 if is_dir else st.st_size
+                if known.get(path) != (size, st.st_mtime_ns):
+                    changed.append((path, rel, entry.name, int(is_dir), size, st.st_mtime_ns))
+                if is_dir and not entry.is_symlink():
+                    stack.append(path)
+
+        removed = [p for p in known if p not in seen]
+        with self.db:
+            for path in removed:
+                self._forget(path)
+            self.db.execute("DELETE FROM files WHERE path IN (SELECT value FROM json_each(?))",
+                            (_json_list(removed),))
+            for row in changed:
+                self._forget(row[0])
+                self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", row)
+                if not row[3]:
+                    self._read(row[0], row[4])
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('scanned', ?)", (str(time.time()),))
+        return len(changed), len(removed)
+
+    def _forget(self, path):
+        for table in ("contents", "functions", "languages", "config_keys"):
+            self.db.execute(f"DELETE FROM {table} WHERE path = ?", (path,))
+
+    def _read(self, path, size):
+        suffix = PurePosixPath(path).suffix.lower()
+        if suffix not in TEXT_SUFFIXES or size > MAX_TEXT_BYTES:
+            return
+        try:
+            with open(self.root / path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError):
+            return
+        self.db.execute("INSERT INTO contents VALUES (?, ?)", (path, text))
+        if suffix == ".py":
+            functions, languages = python_symbols(text)
+            self.db.executemany("INSERT INTO functions VALUES (?, ?, ?, ?)",
+                                [(path, *f) for f in functions])
+            self.db.executemany("INSERT INTO languages VALUES (?, ?, ?)",
+                                [(path, i, lang) for i, lang in enumerate(languages)])
+        elif suffix in (".yaml", ".yml"):
+            self.db.executemany("INSERT INTO config_keys VALUES (?, ?, ?)",
+                                [(path, k, v) for k, v in flatten_config(text)])
+
+    # ---- Queries ----
+
+    def rel(self, path):
+        path = Path(path)
+        try:
+            path = path.relative_to(self.root)
+        except ValueError:
+            pass
+        rel = path.as_posix()
+        return "" if rel == "." else rel
+
+    def exists(self, path):
+        rel = self.rel(path)
+        return rel == "" or self.db.execute("SELECT 1 FROM files WHERE path = ?", (rel,)).fetchone() is not None
+
+    def is_dir(self, path):
+        rel = self.rel(path)
+        row = self.db.execute("SELECT is_dir FROM files WHERE path = ?", (rel,)).fetchone()
+        return rel == "" or bool(row and row[0])
+
+    def iterdir(self, path=""):
+        """Children of a directory as absolute Paths, like Path.iterdir()"""
+        rows = self.db.execute("SELECT path FROM files WHERE parent = ? ORDER BY name", (self.rel(path),))
+        return [self.root / p for p, in rows]
+
+    def rglob(self, pattern, under=""):
+        """Like Path(under).rglob(pattern), as absolute Paths"""
+        base = self.rel(under)
+        prefix = f"{base}/" if base else ""
+        name = pattern.rsplit("/", 1)[-1]
+        if any(c in name for c in "*?["):
+            rows = self.db.execute("SELECT path FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+        else:
+            rows = self.db.execute("SELECT path FROM files WHERE name = ? AND substr(path, 1, ?) = ?",
+                                   (name, len(prefix), prefix))
+        return sorted(self.root / p for p, in rows if PurePosixPath(p[len(prefix):]).match(pattern))
+
+    def glob(self, pattern, under=""):
+        """Like Path(under).glob(pattern) for patterns without '**', as absolute Paths"""
+        base = self.rel(under)
+        depth = len(PurePosixPath(pattern).parts)
+        return [p for p in self.rglob(pattern, under)
+                if len(PurePosixPath(self.rel(p)).parts) - len(PurePosixPath(base).parts) == depth]
+
+    def read_text(self, path):
+        """Indexed text of a file; None if the file is binary, too large or missing"""
+        row = self.db.execute("SELECT text FROM contents WHERE path = ?", (self.rel(path),)).fetchone()
+        return row[0] if row else None
+
+    def grep(self, needle, paths=None, ignore_case=False):
+        """(absolute path, line number, line) of lines containing needle"""
+        query, args = "SELECT path, text FROM contents WHERE ", []
+        if ignore_case:
+            query += "instr(lower(text), ?) > 0"
+            needle = needle.lower()
+        else:
+            query += "instr(text, ?) > 0"
+        args.append(needle)
+        if paths is not None:
+            query += " AND path IN (SELECT value FROM json_each(?))"
+            args.append(_json_list([self.rel(p) for p in paths]))
+        hits = []
+        for path, text in self.db.execute(query + " ORDER BY path", args):
+            for i, line in enumerate(text.split("\n"), 1):
+                if needle in (line.lower() if ignore_case else line):
+                    hits.append((self.root / path, i, line))
+        return hits
+
+    def functions(self, path):
+        """(name, line, first docstring/comment line) of the functions in a Python file"""
+        return self.db.execute("SELECT name, line, doc FROM functions WHERE path = ? ORDER BY line",
+                               (self.rel(path),)).fetchall()
+
+    def languages(self, path):
+        """Entries of the LANGUAGES tuple of a Python file"""
+        return [name for name, in self.db.execute(
+            "SELECT name FROM languages WHERE path = ? ORDER BY position", (self.rel(path),))]
+
+    def config(self, path):
+        """Flattened {dotted.key: value} of a YAML config"""
+        return dict(self.db.execute("SELECT key, value FROM config_keys WHERE path = ?", (self.rel(path),)))
+
+    def configs_with_key(self, pattern):
+        """(absolute path, key, value) of config keys matching a glob like '*lang*'"""
+        rows = self.db.execute("SELECT path, key, value FROM config_keys ORDER BY path")
+        return [(self.root / p, k, v) for p, k, v in rows if fnmatch.fnmatch(k, pattern)]
+
+
+def _json_list(items):
+    return json.dumps(list(items))
+
+
+def open_index(path, max_age=60.0):
+    """Index covering path: an existing index of path or of one of its parents, else a new one of path.
+    None if path does not exist (the analyze scripts then report it missing)"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    for root in [path, *path.parents]:
+        if default_db(root).exists():
+            return RecipeIndex(root, max_age=max_age)
+    return RecipeIndex(path, max_age=max_age)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="ESPnet / WAV2GLOSS checkout to index")
+    parser.add_argument("--db", help="SQLite file (default: ~/.cache/recipe_index/<root>_<hash>.sqlite)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("update", help="Build or incrementally update the index")
+    p = sub.add_parser("rglob", help="Files matching a pattern anywhere in the tree")
+    p.add_argument("pattern")
+    p = sub.add_parser("grep", help="Lines containing a string")
+    p.add_argument("needle")
+    p.add_argument("-i", "--ignore_case", action="store_true")
+    p = sub.add_parser("functions", help="Functions of a Python file")
+    p.add_argument("path")
+    p = sub.add_parser("languages", help="LANGUAGES tuple of a Python file")
+    p.add_argument("path")
+    p = sub.add_parser("config", help="Flattened keys of a YAML config")
+    p.add_argument("path")
+    args = parser.parse_args()
+
+    if not Path(args.root).exists():
+        sys.exit(f"❌ {args.root} does not exist")
+    start = time.time()
+    index = RecipeIndex(args.root, args.db, max_age=0 if args.cmd == "update" else 60.0)
+    if args.cmd == "update":
+        changed, removed = index.changes
+        files, = index.db.execute("SELECT COUNT(*) FROM files").fetchone()
+        print(f"✅ {files} paths indexed in {index.db_path} ({changed} new/changed, {removed} removed)")
+    elif args.cmd == "rglob":
+        for path in index.rglob(args.pattern):
+            print(path.relative_to(index.root))
+    elif args.cmd == "grep":
+        for path, line_no, line in index.grep(args.needle, ignore_case=args.ignore_case):
+            print(f"{path.relative_to(index.root)}:{line_no}: {line.strip()}")
+    elif args.cmd == "functions":
+        for name, line_no, doc in index.functions(args.path):
+            print(f"{line_no:6d} {name}  {doc}")
+    elif args.cmd == "languages":
+        print("\n".join(index.languages(args.path)))
+    elif args.cmd == "config":
+        for key, value in index.config(args.path).items():
+            print(f"{key}: {value}")
+    print(f"({1000 * (time.time() - start):.1f} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
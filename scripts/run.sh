@@ -45,6 +45,7 @@ done
     --min_wav_duration 0.5 \
     --max_wav_duration 20 \
     --audio_format wav \
+    --compress_audio auto \
     --speed_perturb_factors "0.9 1.0 1.1" \
     --asr_config ${asr_config} \
     --asr_tag ${asr_tag} \
@@ -58,3 +59,15 @@ done
     --use_text_prev true \
     --bpe_train_text "${lm_train_text}" \
     --lm_train_text "${lm_train_text}" "$@"
+
+# The four tasks of a language share their test audio. To decode them in one pass that runs the
+# encoder once per recording (instead of stage 12 with --share_encoder_cache true), take asr_exp and
+# inference_tag from `./run.sh --print_paths true`, run stages up to 11, then:
+#   python local/decode_multitask.py \
+#       --config conf/tuning/decode_transformer.yaml --use_text_prev true \
+#       --asr_train_config ${asr_exp}/config.yaml --asr_model_file ${asr_exp}/valid.acc.ave.pth \
+#       --lm_train_config ${lm_exp}/config.yaml --lm_file ${lm_exp}/valid.loss.ave.pth \
+#       --output_dir ${asr_exp}/${inference_tag} \
+#       --task_data_dirs dump/raw/w2g_{transcription,underlying,gloss,translation}_<lang>_test
+#   ./run.sh --stage 13 --stop_stage 13 \
+#       --test_sets "w2g_transcription_<lang>_test w2g_underlying_<lang>_test w2g_gloss_<lang>_test w2g_translation_<lang>_test"
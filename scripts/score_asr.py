@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+In-Process CER/WER/TER Scoring for Stage 13
+Tokenizes every reference and hypothesis once at char, word and BPE level, aligns them with a
+NumPy row-vectorized weighted Levenshtein (sclite's weights) and writes sclite-style result.txt
+summaries plus per-utterance errors, with one process per test set
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from kaldi_data import read_kaldi_map
+from kurdish_text_norm import normalize
+
+# sclite's default alignment weights (-w): a substitution costs more than an insertion
+# or a deletion alone, but less than both together
+COR_COST, SUB_COST, INS_COST, DEL_COST = 0, 4, 3, 3
+SCORE_TYPES = {"char": "cer", "word": "wer", "bpe": "ter"}
+
+
+def align(ref, hyp):
+    """Align two int token arrays; returns (corr, sub, del, ins, ops) with ops as a C/S/D/I string"""
+    n, m = len(ref), len(hyp)
+    if n == m and np.array_equal(ref, hyp):
+        return n, 0, 0, 0, "C" * n
+    steps = np.arange(m + 1) * INS_COST
+    dist = np.empty((n + 1, m + 1), dtype=np.int64)
+    dist[0] = steps
+    for i in range(1, n + 1):
+        prev = dist[i - 1]
+        row = np.empty(m + 1, dtype=np.int64)
+        row[0] = prev[0] + DEL_COST
+        row[1:] = np.minimum(prev[:-1] + np.where(hyp == ref[i - 1], COR_COST, SUB_COST),
+                             prev[1:] + DEL_COST)
+        # Insertions chain along the row: row[j] = min_k row[k] + INS_COST * (j - k)
+        dist[i] = np.minimum.accumulate(row - steps) + steps
+
+    ops = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0:
+            match = ref[i - 1] == hyp[j - 1]
+            if dist[i, j] == dist[i - 1, j - 1] + (COR_COST if match else SUB_COST):
+                ops.append("C" if match else "S")
+                i, j = i - 1, j - 1
+                continue
+        if i > 0 and dist[i, j] == dist[i - 1, j] + DEL_COST:
+            ops.append("D")
+            i -= 1
+        else:
+            ops.append("I")
+            j -= 1
+    ops = "".join(reversed(ops))
+    return ops.count("C"), ops.count("S"), ops.count("D"), ops.count("I"), ops
+
+
+def to_ids(tokens, vocab):
+    return np.array([vocab.setdefault(t, len(vocab)) for t in tokens], dtype=np.int64)
+
+
+def error_counts(ref_tokens, hyp_tokens):
+    """Corr/Sub/Del/Ins of two token sequences"""
+    vocab = {}
+    corr, sub, dele, ins, _ = align(to_ids(ref_tokens, vocab), to_ids(hyp_tokens, vocab))
+    return corr, sub, dele, ins
+
+
+def char_error_rate(refs, hyps):
+    """CER (%) of hypothesis texts against reference texts, both keyed by utterance"""
+    errors = chars = 0
+    for utt, ref in refs.items():
+        ref = list(" ".join(ref.split()))
+        _, sub, dele, ins = error_counts(ref, list(" ".join(hyps.get(utt, "").split())))
+        errors += sub + dele + ins
+        chars += len(ref)
+    return 100.0 * errors / max(chars, 1)
+
+
+class Tokenizer:
+    """Same tokens as espnet2.bin.tokenize_text for char, word and bpe"""
+
+    def __init__(self, token_type, nlsyms=(), remove_nlsyms=False, bpemodel=None, cleaner=None):
+        self.token_type = token_type
+        self.nlsyms = sorted(nlsyms, key=len, reverse=True)
+        self.remove_nlsyms = remove_nlsyms
+        self.cleaner = None
+        if cleaner and cleaner != "none":
+            from espnet2.text.cleaner import TextCleaner
+            self.cleaner = TextCleaner(cleaner)
+        if token_type == "bpe":
+            import sentencepiece as spm
+            self.sp = spm.SentencePieceProcessor()
+            self.sp.load(bpemodel)
+
+    def __call__(self, text):
+        text = " ".join(text.split())
+        if self.cleaner is not None:
+            text = self.cleaner(text)
+        if self.token_type == "word":
+            return [w for w in text.split() if not (self.remove_nlsyms and w in self.nlsyms)]
+        if self.token_type == "bpe":
+            return self.sp.encode_as_pieces(text)
+        tokens = []
+        while text:
+            sym = next((s for s in self.nlsyms if text.startswith(s)), None)
+            if sym is not None:
+                if not self.remove_nlsyms:
+                    tokens.append(sym)
+                text = text[len(sym):]
+            else:
+                tokens.append("<space>" if text[0] == " " else text[0])
+                text = text[1:]
+        return tokens
+
+
+def format_result(name, rows):
+    """sclite-style system summary as parsed by show_asr_result.sh"""
+    def line(label, snt, wrd, corr, sub, dele, ins, serr):
+        pct = [100.0 * v / max(wrd, 1) for v in (corr, sub, dele, ins, sub + dele + ins)]
+        return (f"| {label:<7}| {snt:5d} {wrd:7d} | "
+                + " ".join(f"{v:6.1f}" for v in pct) + f" {100.0 * serr / max(snt, 1):6.1f} |")
+
+    header = "| SPKR   | # Snt   # Wrd |   Corr    Sub    Del    Ins    Err  S.Err |"
+    rule = "|" + "-" * (len(header) - 2) + "|"
+    double = "|" + "=" * (len(header) - 2) + "|"
+    lines = ["," + "-" * (len(header) - 2) + ".", f"| {name:<{len(header) - 4}} |", rule, header, rule]
+    totals = np.zeros(7, dtype=np.int64)
+    for spk in sorted(rows):
+        lines.append(line(spk, *rows[spk]))
+        totals += rows[spk]
+    lines += [double, line("Sum/Avg", *totals.tolist()), double]
+    return "\n".join(lines) + "\n"
+
+
+def score_dset(job):
+    """Score one test set at every token type"""
+    data_dir, decode_dir, text_name, token_types, opts = job
+    refs = read_kaldi_map(Path(data_dir) / text_name)
+    hyps = read_kaldi_map(Path(decode_dir) / text_name)
+    if opts["kurdish_text_norm"]:
+        refs = {k: normalize(v) for k, v in refs.items()}
+        hyps = {k: normalize(v) for k, v in hyps.items()}
+    utt2spk = {k: v.split()[0] for k, v in read_kaldi_map(Path(data_dir) / "utt2spk").items()}
+    summary = {}
+    for token_type in token_types:
+        score_type = SCORE_TYPES[token_type]
+        ref_tok = Tokenizer(token_type, cleaner=opts["cleaner"], **opts["tokenizer"][token_type])
+        hyp_tok = Tokenizer(token_type, cleaner=opts["hyp_cleaner"], **opts["tokenizer"][token_type])
+        scoredir = Path(decode_dir) / f"score_{score_type}"
+        scoredir.mkdir(parents=True, exist_ok=True)
+
+        vocab = {}
+        rows = {}
+        errors = []
+        with open(scoredir / "ref.trn", 'w', encoding='utf-8') as ref_trn, \
+                open(scoredir / "hyp.trn", 'w', encoding='utf-8') as hyp_trn:
+            for utt, ref_text in refs.items():
+                spk = utt2spk.get(utt, utt)
+                ref, hyp = ref_tok(ref_text), hyp_tok(hyps.get(utt, ""))
+                ref_trn.write(" ".join(ref) + f"\t({spk}-{utt})\n")
+                hyp_trn.write(" ".join(hyp) + f"\t({spk}-{utt})\n")
+                corr, sub, dele, ins, ops = align(to_ids(ref, vocab), to_ids(hyp, vocab))
+                row = rows.setdefault(spk, np.zeros(7, dtype=np.int64))
+                row += (1, len(ref), corr, sub, dele, ins, int(sub + dele + ins > 0))
+                if sub + dele + ins:
+                    errors.append({"utt": utt, "spk": spk, "n_ref": len(ref), "sub": sub,
+                                   "del": dele, "ins": ins, "alignment": ops,
+                                   "ref": " ".join(ref), "hyp": " ".join(hyp)})
+
+        with open(scoredir / "result.txt", 'w', encoding='utf-8') as f:
+            f.write(format_result(str(scoredir / "hyp.trn"), {k: v.tolist() for k, v in rows.items()}))
+        errors.sort(key=lambda e: -(e["sub"] + e["del"] + e["ins"]))
+        with open(scoredir / "errors.json", 'w', encoding='utf-8') as f:
+            json.dump(errors, f, ensure_ascii=False, indent=1)
+        total = np.sum(list(rows.values()), axis=0) if rows else np.zeros(7, dtype=np.int64)
+        summary[score_type] = 100.0 * float(total[3:6].sum()) / max(int(total[1]), 1)
+    return decode_dir, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data_root", required=True, help="Dumped data dir (dump/raw)")
+    parser.add_argument("--decode_root", required=True, help="Decoding dir (<asr_exp>/<inference_tag>)")
+    parser.add_argument("--dsets", nargs="+", required=True)
+    parser.add_argument("--text_name", default="text")
+    parser.add_argument("--token_types", nargs="+", default=["char", "word", "bpe"],
+                        choices=list(SCORE_TYPES))
+    parser.add_argument("--bpemodel")
+    parser.add_argument("--non_linguistic_symbols", default="none")
+    parser.add_argument("--remove_non_linguistic_symbols", default="true")
+    parser.add_argument("--cleaner", default="none")
+    parser.add_argument("--hyp_cleaner", default="none")
+    parser.add_argument("--kurdish_text_norm", default="false",
+                        help="Normalize Kurdish spelling of references and hypotheses first")
+    parser.add_argument("--nj", type=int, default=4)
+    args = parser.parse_args()
+
+    nlsyms = []
+    if args.non_linguistic_symbols != "none":
+        with open(args.non_linguistic_symbols, 'r', encoding='utf-8') as f:
+            nlsyms = [line.strip() for line in f if line.strip()]
+    remove = str(args.remove_non_linguistic_symbols).lower() == "true"
+    token_types = [t for t in args.token_types
+                   if t != "bpe" or (args.bpemodel and Path(args.bpemodel).exists())]
+    opts = {
+        "cleaner": args.cleaner,
+        "hyp_cleaner": args.hyp_cleaner,
+        "kurdish_text_norm": str(args.kurdish_text_norm).lower() == "true",
+        "tokenizer": {
+            "char": {"nlsyms": nlsyms, "remove_nlsyms": remove},
+            "word": {"nlsyms": nlsyms, "remove_nlsyms": remove},
+            "bpe": {"bpemodel": args.bpemodel},
+        },
+    }
+    jobs = [(f"{args.data_root}/{d}", f"{args.decode_root}/{d}", args.text_name, token_types, opts)
+            for d in args.dsets]
+
+    start = time.time()
+    with ProcessPoolExecutor(max(min(args.nj, len(jobs)), 1)) as pool:
+        results = list(pool.map(score_dset, jobs))
+    print("=" * 60)
+    print(f"📊 Scored {len(jobs)} test sets in {time.time() - start:.1f}s")
+    for decode_dir, summary in results:
+        print(f"   {decode_dir}: " + ", ".join(f"{k.upper()} {v:.2f}%" for k, v in summary.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Speaker-Disjoint, Duration-Balanced Train/Dev/Test Splitter
+Assigns whole speakers to splits with a longest-first greedy pass (O(n log n)) followed by
+move/swap local search, matching target duration ratios overall and per dialect, and writes
+the split JSON files and Kaldi data dirs
+"""
+import argparse
+import heapq
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from convert_kurdish_data import write_kaldi_dir
+from kaldi_data import audio_duration, read_kaldi_map, utt_speaker
+from kurdish_text_norm import normalize
+
+
+def load_json_manifest(paths):
+    """Utterances from one or more Kurdish JSON files (data.json / train.json format)"""
+    utts = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+        base = os.path.dirname(os.path.abspath(path))
+        for item in items:
+            utt_id = item["utterance_id"]
+            utts.append({
+                "utt": utt_id,
+                "speaker": item.get("speaker") or utt_speaker(utt_id),
+                "dialect": item.get("dialect") or "unknown",
+                "duration": item.get("duration"),
+                "wav": os.path.join(base, item["audio_path"]),
+                "text": normalize(item.get("transcription") or ""),
+                "item": item,
+            })
+    return utts
+
+
+def load_kaldi_manifest(data_dir, fs):
+    """Utterances of a Kaldi data dir, with durations from utt2dur or utt2num_samples if present"""
+    data_dir = Path(data_dir)
+    wavs = read_kaldi_map(data_dir / "wav.scp")
+    spk = read_kaldi_map(data_dir / "utt2spk") if (data_dir / "utt2spk").exists() else {}
+    text = read_kaldi_map(data_dir / "text") if (data_dir / "text").exists() else {}
+    dialect = read_kaldi_map(data_dir / "utt2lang") if (data_dir / "utt2lang").exists() else {}
+    durations = {}
+    if (data_dir / "utt2dur").exists():
+        durations = {k: float(v) for k, v in read_kaldi_map(data_dir / "utt2dur").items()}
+    elif (data_dir / "utt2num_samples").exists():
+        durations = {k: float(v) / fs for k, v in read_kaldi_map(data_dir / "utt2num_samples").items()}
+    return [{
+        "utt": utt,
+        "speaker": spk.get(utt) or utt_speaker(utt),
+        "dialect": dialect.get(utt, "unknown"),
+        "duration": durations.get(utt),
+        "wav": wav,
+        "text": text.get(utt, ""),
+        "item": None,
+    } for utt, wav in wavs.items()]
+
+
+def fill_durations(utts, nj):
+    """Read the durations that the manifest does not provide, in a process pool"""
+    missing = [u for u in utts if u["duration"] is None]
+    if not missing:
+        return
+    with ProcessPoolExecutor(nj) as pool:
+        for u, duration in zip(missing, pool.map(audio_duration, [u["wav"] for u in missing],
+                                                 chunksize=256)):
+            u["duration"] = duration or 0.0
+
+
+class SplitProblem:
+    """Speaker durations (overall and per dialect) and split targets"""
+
+    def __init__(self, utts, ratios):
+        self.names = list(ratios)
+        self.speakers, spk_index = np.unique([u["speaker"] for u in utts],
+                                             return_inverse=True)
+        self.dialects, dia_index = np.unique([u["dialect"] for u in utts], return_inverse=True)
+        durations = np.array([u["duration"] for u in utts], dtype=np.float64)
+        # (speakers, dialects) duration matrix
+        self.spk_dia = np.zeros((len(self.speakers), len(self.dialects)))
+        np.add.at(self.spk_dia, (spk_index, dia_index), durations)
+        self.spk_dur = self.spk_dia.sum(axis=1)
+        self.spk_index = spk_index
+        ratio = np.array([ratios[n] for n in self.names], dtype=np.float64)
+        ratio /= ratio.sum()
+        self.target = ratio * self.spk_dur.sum()
+        self.target_dia = np.outer(ratio, self.spk_dia.sum(axis=0))
+
+    def loads(self, assign):
+        """Duration per split, overall and per dialect"""
+        n_splits = len(self.names)
+        load = np.bincount(assign, weights=self.spk_dur, minlength=n_splits)
+        load_dia = np.stack([self.spk_dia[assign == k].sum(axis=0) for k in range(n_splits)])
+        return load, load_dia
+
+    def cost(self, load, load_dia, dialect_weight):
+        return (np.abs(load - self.target).sum()
+                + dialect_weight * np.abs(load_dia - self.target_dia).sum())
+
+
+def greedy_assign(problem):
+    """Longest speaker first, always into the split furthest below its target (relative)"""
+    assign = np.empty(len(problem.speakers), dtype=np.int64)
+    load = np.zeros(len(problem.names))
+    heap = [(-1.0, k) for k in range(len(problem.names))]
+    heapq.heapify(heap)
+    for s in np.argsort(-problem.spk_dur, kind="stable"):
+        _, k = heapq.heappop(heap)
+        assign[s] = k
+        load[k] += problem.spk_dur[s]
+        heapq.heappush(heap, (-(problem.target[k] - load[k]) / max(problem.target[k], 1e-9), k))
+    return assign
+
+
+def local_search(problem, assign, dialect_weight, max_rounds, swap_candidates, rng):
+    """Move or swap speakers between the most over- and under-filled splits while the cost drops"""
+    load, load_dia = problem.loads(assign)
+    cost = problem.cost(load, load_dia, dialect_weight)
+
+    def try_change(src, dst, out_spk, in_spk):
+        new_load = load.copy()
+        new_dia = load_dia.copy()
+        for s, a, b in ((out_spk, src, dst), (in_spk, dst, src)):
+            if s is not None:
+                new_load[a] -= problem.spk_dur[s]
+                new_load[b] += problem.spk_dur[s]
+                new_dia[a] -= problem.spk_dia[s]
+                new_dia[b] += problem.spk_dia[s]
+        return problem.cost(new_load, new_dia, dialect_weight), new_load, new_dia
+
+    def best_change(src, dst, want):
+        src_spk = np.flatnonzero(assign == src)
+        order = np.argsort(problem.spk_dur[src_spk])
+        src_spk, src_dur = src_spk[order], problem.spk_dur[src_spk[order]]
+        best = (cost, None)
+        # Move: the src speaker whose duration is closest to the wanted transfer
+        i = np.searchsorted(src_dur, want)
+        for j in (i - 1, i):
+            if 0 <= j < len(src_spk) and len(src_spk) > 1:
+                c, l, d = try_change(src, dst, src_spk[j], None)
+                if c < best[0]:
+                    best = (c, (src_spk[j], None, l, d))
+        # Swap: dst speakers against the src speaker that closes the gap best
+        dst_spk = np.flatnonzero(assign == dst)
+        if len(dst_spk) > swap_candidates:
+            dst_spk = rng.choice(dst_spk, swap_candidates, replace=False)
+        for b in dst_spk:
+            i = np.searchsorted(src_dur, want + problem.spk_dur[b])
+            for j in (i - 1, i):
+                if 0 <= j < len(src_spk):
+                    c, l, d = try_change(src, dst, src_spk[j], b)
+                    if c < best[0]:
+                        best = (c, (src_spk[j], b, l, d))
+        return best
+
+    for _ in range(max_rounds):
+        excess = load - problem.target
+        # Most over-filled -> most under-filled split first, then the other pairs
+        pairs = sorted(((a, b) for a in range(len(load)) for b in range(len(load))
+                        if excess[a] > 0 > excess[b]), key=lambda p: excess[p[1]] - excess[p[0]])
+        for src, dst in pairs:
+            best = best_change(src, dst, min(excess[src], -excess[dst]))
+            if best[1] is not None:
+                break
+        else:
+            break
+        cost = best[0]
+        out_spk, in_spk, load, load_dia = best[1]
+        assign[out_spk] = dst
+        if in_spk is not None:
+            assign[in_spk] = src
+    return assign
+
+
+def write_outputs(utts, problem, assign, out_dir, data_prefix):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    utt_split = assign[problem.spk_index]
+    summary = {"splits": {}}
+    for k, name in enumerate(problem.names):
+        members = [u for u, s in zip(utts, utt_split) if s == k]
+        if all(u["item"] is not None for u in members):
+            with open(out_dir / f"{name}.json", 'w', encoding='utf-8') as f:
+                json.dump([u["item"] for u in members], f, ensure_ascii=False, indent=2)
+        if data_prefix:
+            write_kaldi_dir(f"{data_prefix}_{name}",
+                            [f"{u['utt']} {u['wav']}\n" for u in members],
+                            [f"{u['utt']} {u['speaker']}\n" for u in members],
+                            {"text": [f"{u['utt']} {u['text']}\n" for u in members],
+                             "utt2dur": [f"{u['utt']} {u['duration']:.3f}\n" for u in members]})
+        dia = problem.spk_dia[assign == k].sum(axis=0)
+        summary["splits"][name] = {
+            "utterances": len(members),
+            "speakers": int((assign == k).sum()),
+            "hours": float(problem.spk_dur[assign == k].sum() / 3600),
+            "target_hours": float(problem.target[k] / 3600),
+            "dialect_hours": {str(d): float(h / 3600) for d, h in zip(problem.dialects, dia)},
+        }
+        summary["splits"][name]["utt_ids"] = [u["utt"] for u in members]
+    with open(out_dir / "splits.json", 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--json", nargs="+", help="Kurdish JSON manifests to split")
+    parser.add_argument("--data_dir", help="Or a Kaldi data dir (wav.scp, utt2spk, text, utt2dur)")
+    parser.add_argument("--ratios", nargs="+", default=["train=0.8", "dev=0.1", "test=0.1"])
+    parser.add_argument("--out_dir", required=True, help="Where to write <split>.json and splits.json")
+    parser.add_argument("--data_prefix", help="Also write Kaldi dirs <data_prefix>_<split>, "
+                                              "e.g. data/w2g_all_full")
+    parser.add_argument("--dialect_weight", type=float, default=0.5,
+                        help="Weight of per-dialect duration deviations in the local search")
+    parser.add_argument("--max_rounds", type=int, default=2000)
+    parser.add_argument("--swap_candidates", type=int, default=256)
+    parser.add_argument("--fs", type=int, default=16000)
+    parser.add_argument("--nj", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if bool(args.json) == bool(args.data_dir):
+        parser.error("Give exactly one of --json and --data_dir")
+
+    print("=" * 60)
+    print("SPEAKER-DISJOINT DATASET SPLIT")
+    print("=" * 60)
+    start = time.time()
+    utts = load_json_manifest(args.json) if args.json else load_kaldi_manifest(args.data_dir, args.fs)
+    fill_durations(utts, args.nj)
+    loaded = time.time() - start
+
+    ratios = {name: float(r) for name, r in (x.split("=") for x in args.ratios)}
+    problem = SplitProblem(utts, ratios)
+    start = time.time()
+    assign = greedy_assign(problem)
+    greedy_cost = problem.cost(*problem.loads(assign), args.dialect_weight)
+    assign = local_search(problem, assign, args.dialect_weight, args.max_rounds,
+                          args.swap_candidates, np.random.default_rng(args.seed))
+    solved = time.time() - start
+    summary = write_outputs(utts, problem, assign, args.out_dir, args.data_prefix)
+
+    final_cost = problem.cost(*problem.loads(assign), args.dialect_weight)
+    print(f"📊 {len(utts):,} utterances, {len(problem.speakers):,} speakers, "
+          f"{len(problem.dialects)} dialects, {problem.spk_dur.sum() / 3600:.1f}h "
+          f"(loaded in {loaded:.1f}s)")
+    print(f"⚡ Solved in {solved:.2f}s; deviation cost {greedy_cost / 3600:.3f}h greedy -> "
+          f"{final_cost / 3600:.3f}h after local search")
+    for name, s in summary["splits"].items():
+        print(f"   {name:6s} {s['hours']:8.2f}h (target {s['target_hours']:.2f}h)  "
+              f"{s['speakers']:6d} speakers  {s['utterances']:8d} utterances")
+    print(f"✅ Wrote {args.out_dir}/splits.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Stage-Level Timing and Resource Ledger for asr.sh
+mark: stage boundary snapshot of asr.sh's cumulative child CPU time and I/O (/proc/<pid>)
+job:  wraps a ${cmd} launcher (run.pl JOB=1:N ...) and records wall/CPU time, peak RSS and I/O
+report: per-stage totals of one or more ledgers, flagging stages slower than the reference run
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+FIELDS = ("wall_s", "cpu_s", "peak_rss_mb", "read_mb", "written_mb", "jobs")
+
+
+def append(ledger, record):
+    # One short line per write, so concurrent jobs do not interleave records
+    with open(ledger, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def proc_counters(pid):
+    """CPU seconds and I/O bytes of pid including its waited-for children (Linux only)"""
+    counters = {}
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # utime, stime, cutime, cstime are fields 14-17 of stat(5); index 0 here is field 3
+        ticks = sum(int(x) for x in fields[11:15])
+        counters["cpu_s"] = ticks / os.sysconf("SC_CLK_TCK")
+    except OSError:
+        pass
+    try:
+        with open(f"/proc/{pid}/io", 'r') as f:
+            io = dict(line.split(": ") for line in f.read().splitlines())
+        counters["read_mb"] = int(io["rchar"]) / 1e6
+        counters["written_mb"] = int(io["wchar"]) / 1e6
+    except (OSError, KeyError, ValueError):
+        pass
+    return counters
+
+
+def cmd_mark(args):
+    record = {"event": "mark", "stage": args.stage, "time": time.time(), **proc_counters(args.pid)}
+    if args.status is not None:
+        record["status"] = args.status
+    if args.command:
+        record["command"] = args.command
+    append(args.ledger, record)
+
+
+def cmd_job(args):
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    jobs = 1
+    for token in command:
+        m = re.fullmatch(r"JOB=(\d+):(\d+)", token)
+        if m:
+            jobs = int(m.group(2)) - int(m.group(1)) + 1
+            break
+    start = time.time()
+    proc = subprocess.Popen(command)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # run.pl waits for its jobs, so the rusage covers the whole job array on this host
+    append(args.ledger, {
+        "event": "job",
+        "stage": os.environ.get("STAGE_LEDGER_STAGE", "?"),
+        "time": start,
+        "wall_s": time.time() - start,
+        "cpu_s": usage.ru_utime + usage.ru_stime,
+        "peak_rss_mb": usage.ru_maxrss / 1024,
+        "read_mb": usage.ru_inblock * 512 / 1e6,
+        "written_mb": usage.ru_oublock * 512 / 1e6,
+        "jobs": jobs,
+        "status": proc.returncode,
+        "command": " ".join(command)[:300],
+    })
+    sys.exit(proc.returncode)
+
+
+def summarize(path):
+    """{stage: totals} of one ledger; marks delimit stages, jobs add peak RSS and job counts"""
+    with open(path, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    marks = [r for r in records if r["event"] == "mark"]
+    stages = {}
+    for a, b in zip(marks[:-1], marks[1:]):
+        if a["stage"] in ("start", "end"):
+            continue
+        s = stages.setdefault(a["stage"], dict.fromkeys(FIELDS, 0.0))
+        s["wall_s"] += b["time"] - a["time"]
+        for key in ("cpu_s", "read_mb", "written_mb"):
+            if key in a and key in b:
+                s[key] += b[key] - a[key]
+    for r in records:
+        if r["event"] == "job" and r["stage"] in stages:
+            s = stages[r["stage"]]
+            s["peak_rss_mb"] = max(s["peak_rss_mb"], r["peak_rss_mb"])
+            s["jobs"] += r["jobs"]
+    status = next((m.get("status") for m in reversed(marks) if m["stage"] == "end"), None)
+    return stages, status
+
+
+def cmd_report(args):
+    ledgers = [Path(p) for p in args.ledgers]
+    if len(ledgers) == 1 and ledgers[0].is_dir():
+        ledgers = sorted(ledgers[0].glob("*.jsonl"))
+    if not ledgers:
+        sys.exit("No ledgers found")
+    runs = [(p.stem, *summarize(p)) for p in ledgers]
+    ref_name, ref, _ = runs[0]
+
+    print("=" * 60)
+    print("STAGE LEDGER REPORT")
+    print("=" * 60)
+    slowdowns = []
+    for name, stages, status in runs:
+        print(f"\n📊 {name}" + (f" (exit {status})" if status not in (None, 0) else ""))
+        print(f"   {'stage':>6s} {'wall_s':>9s} {'cpu_s':>9s} {'rss_mb':>8s} {'read_mb':>9s} "
+              f"{'write_mb':>9s} {'jobs':>5s}  vs {ref_name}")
+        for stage, s in sorted(stages.items(), key=lambda x: int(x[0]) if x[0].isdigit() else 1e9):
+            delta = ""
+            if name != ref_name and stage in ref and ref[stage]["wall_s"] > args.min_seconds:
+                change = s["wall_s"] / ref[stage]["wall_s"] - 1
+                delta = f"{100 * change:+.0f}%"
+                if change > args.threshold:
+                    delta += " ❌"
+                    slowdowns.append(f"{name} stage {stage}: {ref[stage]['wall_s']:.0f}s -> {s['wall_s']:.0f}s")
+            print(f"   {stage:>6s} {s['wall_s']:9.1f} {s['cpu_s']:9.1f} {s['peak_rss_mb']:8.0f} "
+                  f"{s['read_mb']:9.0f} {s['written_mb']:9.0f} {int(s['jobs']):5d}  {delta}")
+    if slowdowns:
+        print(f"\n❌ Stages more than {100 * args.threshold:.0f}% slower than {ref_name}:")
+        for line in slowdowns:
+            print(f"   {line}")
+        if args.fail_on_regression:
+            sys.exit(1)
+    elif len(runs) > 1:
+        print(f"\n✅ No stage more than {100 * args.threshold:.0f}% slower than {ref_name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("mark", help="Record a stage boundary of an asr.sh run")
+    p.add_argument("--ledger", required=True)
+    p.add_argument("--stage", required=True, help="Stage number, 'start' or 'end'")
+    p.add_argument("--pid", type=int, default=os.getppid(), help="asr.sh process id")
+    p.add_argument("--status", type=int, help="Exit status (with --stage end)")
+    p.add_argument("--command", help="Command line of the run (with --stage start)")
+    p.set_defaults(func=cmd_mark)
+
+    p = sub.add_parser("job", help="Run a ${cmd} launcher and record its resource usage")
+    p.add_argument("--ledger", required=True)
+    p.add_argument("command", nargs=argparse.REMAINDER)
+    p.set_defaults(func=cmd_job)
+
+    p = sub.add_parser("report", help="Per-stage totals; later ledgers are compared with the first")
+    p.add_argument("ledgers", nargs="+", help="Ledger files, or one ledger directory (e.g. exp/ledger)")
+    p.add_argument("--threshold", type=float, default=0.2, help="Relative wall time increase to flag")
+    p.add_argument("--min_seconds", type=float, default=5.0, help="Ignore stages shorter than this")
+    p.add_argument("--fail_on_regression", action="store_true")
+    p.set_defaults(func=cmd_report)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
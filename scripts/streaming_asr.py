@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Chunk-Wise Streaming Recognition for the RNN Models
+Audio is fed in --chunk_ms pieces. Features are computed incrementally (the same frames as
+offline), the unidirectional (vgg_)rnn encoder carries its LSTM state from chunk to chunk with a
+short VGG lookahead, and a CTC prefix beam search extends its hypotheses frame by frame, so a
+partial hypothesis exists after every chunk. The final n-best is rescored with the attention
+decoder (--rescore_weight) and the LMs of --lm_file/--ngram_file/--char_ngram_dir at their
+usual weights; partial hypotheses are CTC only.
+Without --evaluate_chunks: Stage 12 drop-in, same arguments and output layout as
+kurdish_asr_inference.py (asr.sh --use_streaming true --use_local_inference true).
+With --evaluate_chunks "160 320 640": CER, RTF and latency per chunk size against offline
+decoding, written to <output_dir>/streaming_tradeoff.{md,json}.
+The model must have a unidirectional encoder, e.g. configs/train_asr_rnn_streaming.yaml.
+"""
+import json
+import logging
+import math
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from kaldi_data import read_kaldi_map
+from kurdish_asr_inference import (UtteranceReader, build_speech2text, get_parser, parse_args,
+                                   read_keys, write_results)
+from score_asr import char_error_rate
+
+# Beam search scorers that rescore the final n-best, with the weight the beam search gives them
+LM_SCORERS = ("lm", "ngram", "char_ngram")
+
+
+def get_streaming_parser():
+    parser = get_parser()
+    group = parser.add_argument_group("Streaming related")
+    group.add_argument("--chunk_ms", type=int, default=320, help="Audio per chunk")
+    group.add_argument("--lookahead_frames", type=int, default=12,
+                       help="Feature frames the VGG front waits for beyond a chunk (rounded up to 4)")
+    group.add_argument("--token_beam", type=int, default=8, help="Tokens tried per frame and prefix")
+    group.add_argument("--rescore_weight", type=float, default=0.3,
+                       help="Attention decoder weight when rescoring the final n-best (0: CTC only)")
+    group.add_argument("--partial_jsonl", help="Write every partial hypothesis with its audio time")
+    group.add_argument("--fs", type=int, default=16000, help="Sampling rate of the model")
+    group.add_argument("--evaluate_chunks", help="Chunk sizes (ms) to compare with offline decoding")
+    group.add_argument("--ref_text", help="Reference text of the evaluated utterances")
+    return parser
+
+
+class StreamingFrontend:
+    """Feature frames of a growing signal; a frame is emitted once its whole STFT window has
+    arrived, so the frames equal those of the full signal (center=True)"""
+
+    def __init__(self, model):
+        frontend = model.frontend
+        self.frontend = frontend
+        self.hop = frontend.hop_length
+        self.half = frontend.stft.n_fft // 2
+        self.left = math.ceil(self.half / self.hop)
+        self.normalize = model.normalize
+        self.device = next(model.parameters()).device
+        self.running = type(model.normalize).__name__ == "UtteranceMVN"
+        self.reset()
+
+    def reset(self):
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.offset = 0  # global index of buffer[0]
+        self.n_out = 0
+        self.sum = self.sum_sq = None
+        self.count = 0
+
+    def accept(self, audio, final):
+        import torch
+
+        self.buffer = np.concatenate([self.buffer, audio])
+        received = self.offset + len(self.buffer)
+        if final:
+            n_ready = received // self.hop + 1
+        else:
+            n_ready = max(0, (received - self.half) // self.hop + 1)
+        if n_ready <= self.n_out:
+            return None
+        # Start on a hop boundary far enough back that the first new frame needs no padding
+        seg_start = max(0, (self.n_out - self.left) * self.hop)
+        seg = torch.from_numpy(self.buffer[seg_start - self.offset:]).unsqueeze(0).to(self.device)
+        feats, _ = self.frontend(seg, torch.tensor([seg.size(1)]))
+        first = (self.n_out * self.hop - seg_start) // self.hop
+        feats = feats[:, first:first + n_ready - self.n_out]
+
+        next_start = max(0, (n_ready - self.left) * self.hop)
+        self.buffer = self.buffer[next_start - self.offset:]
+        self.offset = next_start
+        self.n_out = n_ready
+        return self.apply_normalize(feats)
+
+    def apply_normalize(self, feats):
+        import torch
+
+        if self.normalize is None:
+            return feats
+        if not self.running:
+            return self.normalize(feats, torch.tensor([feats.size(1)]))[0]
+        # Utterance MVN with the statistics of the frames seen so far
+        frames = feats[0]
+        self.sum = frames.sum(0) if self.sum is None else self.sum + frames.sum(0)
+        self.sum_sq = (frames ** 2).sum(0) if self.sum_sq is None else self.sum_sq + (frames ** 2).sum(0)
+        self.count += frames.size(0)
+        mean = self.sum / self.count
+        feats = feats - mean
+        if self.normalize.norm_vars:
+            var = torch.clamp(self.sum_sq / self.count - mean ** 2, min=self.normalize.eps)
+            feats = feats / var.sqrt()
+        return feats
+
+
+class StreamingEncoder:
+    """Runs the VGG2L front on each chunk with left/right context frames and the LSTM stack on
+    its new output frames only, carrying the LSTM state"""
+
+    def __init__(self, encoder, lookahead_frames):
+        import torch
+        from espnet.nets.pytorch_backend.rnn.encoders import VGG2L
+
+        modules = list(encoder.enc)
+        self.vgg = modules[0] if isinstance(modules[0], VGG2L) else None
+        self.rnn = modules[-1]
+        if any(m.bidirectional for m in self.rnn.modules() if isinstance(m, torch.nn.RNNBase)):
+            raise ValueError("The encoder is bidirectional; train with bidirectional: false "
+                             "(configs/train_asr_rnn_streaming.yaml) to stream")
+        self.rnn_sub = int(np.prod(getattr(self.rnn, "subsample", [1])))
+        self.context = 4 * math.ceil(lookahead_frames / 4)
+        self.reset()
+
+    def reset(self):
+        self.feats = None  # feature frames kept from global index self.offset
+        self.offset = 0
+        self.n_in = 0
+        self.done = 0  # encoder-input frames (VGG outputs or features) already fed to the LSTMs
+        self.state = None
+
+    def accept(self, feats, final):
+        import torch
+
+        if feats is not None:
+            self.feats = feats if self.feats is None else torch.cat([self.feats, feats], dim=1)
+            self.n_in += feats.size(1)
+        if self.feats is None:
+            return None
+        if self.vgg is None:
+            ready = self.n_in if final else self.n_in // self.rnn_sub * self.rnn_sub
+            xs = self.feats[:, self.done - self.offset:ready - self.offset]
+            keep = ready
+        else:
+            total = math.ceil(math.ceil(self.n_in / 2) / 2)
+            ready = total if final else max(0, (self.n_in - self.context) // 4)
+            if not final:
+                ready = ready // self.rnn_sub * self.rnn_sub
+            if ready <= self.done:
+                return None
+            seg_start = max(0, 4 * self.done - self.context)
+            seg = self.feats[:, seg_start - self.offset:]
+            xs, _, _ = self.vgg(seg, torch.tensor([seg.size(1)]))
+            xs = xs[:, self.done - seg_start // 4:ready - seg_start // 4]
+            keep = max(0, 4 * ready - self.context)
+        if xs.size(1) == 0:
+            return None
+        out, _, self.state = self.rnn(xs, torch.tensor([xs.size(1)]), prev_state=self.state)
+        self.done = ready
+        self.feats = self.feats[:, keep - self.offset:]
+        self.offset = keep
+        return out
+
+
+class CTCPrefixBeamSearch:
+    """Frame-synchronous CTC prefix beam search that can be advanced chunk by chunk"""
+
+    def __init__(self, beam_size, token_beam, blank=0):
+        self.beam_size = beam_size
+        self.token_beam = token_beam
+        self.blank = blank
+        self.reset()
+
+    def reset(self):
+        self.beams = {(): (0.0, -np.inf)}  # prefix -> (log p ending in blank, log p ending in a token)
+
+    def step(self, logp):
+        tokens = np.argpartition(-logp, min(self.token_beam, len(logp) - 1))[:self.token_beam]
+        tokens = [int(c) for c in tokens if c != self.blank]
+        nxt = {}
+
+        def add(prefix, pb, pnb):
+            old_b, old_nb = nxt.get(prefix, (-np.inf, -np.inf))
+            nxt[prefix] = (np.logaddexp(old_b, pb), np.logaddexp(old_nb, pnb))
+
+        for prefix, (pb, pnb) in self.beams.items():
+            total = np.logaddexp(pb, pnb)
+            add(prefix, total + logp[self.blank], -np.inf)
+            last = prefix[-1] if prefix else None
+            for c in tokens:
+                if c == last:
+                    # A repeat extends the prefix only after a blank; otherwise it collapses
+                    add(prefix + (c,), -np.inf, pb + logp[c])
+                    add(prefix, -np.inf, pnb + logp[c])
+                else:
+                    add(prefix + (c,), -np.inf, total + logp[c])
+        # A repeat right after a prefix that has not yet ended in a blank gets probability 0
+        ranked = sorted(((prefix, scores) for prefix, scores in nxt.items() if max(scores) > -np.inf),
+                        key=lambda kv: -np.logaddexp(*kv[1]))
+        self.beams = dict(ranked[:self.beam_size])
+
+    def nbest(self, n):
+        ranked = sorted(self.beams.items(), key=lambda kv: -np.logaddexp(*kv[1]))
+        return [(list(prefix), float(np.logaddexp(*scores))) for prefix, scores in ranked[:n]]
+
+
+class StreamingRecognizer:
+    def __init__(self, speech2text, args):
+        self.s2t = speech2text
+        self.model = speech2text.asr_model
+        self.fs = args.fs
+        self.frontend = StreamingFrontend(self.model)
+        self.encoder = StreamingEncoder(self.model.encoder, args.lookahead_frames)
+        self.search = CTCPrefixBeamSearch(args.beam_size, args.token_beam,
+                                          getattr(self.model, "blank_id", 0))
+        self.nbest = args.nbest
+        self.rescore_weight = args.rescore_weight if getattr(self.model, "decoder", None) is not None else 0.0
+        beam_search = speech2text.beam_search
+        self.lm_scorers = [(beam_search.scorers[name], beam_search.weights[name]) for name in LM_SCORERS
+                           if beam_search is not None and name in beam_search.scorers
+                           and beam_search.weights.get(name)]
+        self.lookahead_ms = 1000.0 * self.encoder.context * self.frontend.hop / self.fs \
+            if self.encoder.vgg is not None else 0.0
+
+    def to_text(self, token_int):
+        tokens = self.s2t.converter.ids2tokens(token_int)
+        text = self.s2t.tokenizer.tokens2text(tokens) if self.s2t.tokenizer is not None else " ".join(tokens)
+        return text, tokens
+
+    def accept(self, audio, final):
+        """Feed a chunk; returns the encoder output frames it produced"""
+        import torch
+
+        with torch.no_grad():
+            enc = self.encoder.accept(self.frontend.accept(audio, final), final)
+            if enc is None:
+                return None
+            logp = self.model.ctc.log_softmax(enc)[0].cpu().numpy()
+        for frame in logp:
+            self.search.step(frame)
+        return enc
+
+    def lm_score(self, enc, token_int):
+        """Weighted log-likelihood of a complete hypothesis (<eos> included) under the LM scorers"""
+        import torch
+
+        x = enc[0]
+        ys = [self.model.sos] + list(token_int) + [self.model.eos]
+        total = 0.0
+        with torch.no_grad():
+            for scorer, weight in self.lm_scorers:
+                state = scorer.init_state(x)
+                for i in range(1, len(ys)):
+                    logp, state = scorer.score(torch.tensor(ys[:i], device=x.device), state, x)
+                    total += weight * float(logp[ys[i]])
+        return total
+
+    def rescore(self, enc, nbest):
+        """(1 - w) * CTC + w * attention decoder log-likelihood of each hypothesis, plus the
+        weighted LM log-likelihoods"""
+        import torch
+
+        if not (self.rescore_weight or self.lm_scorers) or len(nbest) < 2:
+            return nbest
+        if not self.rescore_weight:
+            return sorted(((h, s + self.lm_score(enc, h)) for h, s in nbest), key=lambda x: -x[1])
+        sos = eos = self.model.sos
+        ys_in = [[sos] + h for h, _ in nbest]
+        ys_out = [h + [eos] for h, _ in nbest]
+        lens = torch.tensor([len(y) for y in ys_in])
+        pad = lambda seqs, value: torch.tensor([s + [value] * (int(lens.max()) - len(s)) for s in seqs],
+                                               device=enc.device)
+        with torch.no_grad():
+            hs = enc.expand(len(nbest), -1, -1)
+            logits, _ = self.model.decoder(hs, torch.full((len(nbest),), enc.size(1)), pad(ys_in, eos), lens)
+            logp = torch.log_softmax(logits, dim=-1).gather(-1, pad(ys_out, 0).unsqueeze(-1)).squeeze(-1)
+            mask = torch.arange(logp.size(1), device=enc.device)[None, :] < lens.to(enc.device)[:, None]
+            att = (logp * mask).sum(1).tolist()
+        w = self.rescore_weight
+        return sorted(((h, (1 - w) * s + w * a + self.lm_score(enc, h)) for (h, s), a in zip(nbest, att)),
+                      key=lambda x: -x[1])
+
+    def recognize(self, audio, chunk_ms, on_partial=None):
+        """Stream one utterance as if it arrived in real time; returns (results, timing)"""
+        import torch
+
+        self.frontend.reset()
+        self.encoder.reset()
+        self.search.reset()
+        step = max(1, int(self.fs * chunk_ms / 1000))
+        encoded, lags = [], []
+        finish = compute = 0.0
+        for start in range(0, max(len(audio), 1), step):
+            end = min(start + step, len(audio))
+            final = end >= len(audio)
+            arrival = end / self.fs
+            t0 = time.perf_counter()
+            enc = self.accept(audio[start:end], final)
+            if enc is not None:
+                encoded.append(enc)
+            if final:
+                rescored = self.rescore_weight or self.lm_scorers
+                nbest = self.search.nbest(max(self.nbest, 8) if rescored else self.nbest)
+                if encoded:
+                    nbest = self.rescore(torch.cat(encoded, dim=1), nbest)
+            dt = time.perf_counter() - t0
+            compute += dt
+            finish = max(arrival, finish) + dt
+            lags.append(finish - arrival)
+            if on_partial is not None and not final:
+                on_partial(arrival, self.to_text(self.search.nbest(1)[0][0])[0])
+
+        results = []
+        for token_int, score in nbest[:self.nbest]:
+            text, tokens = self.to_text(token_int)
+            results.append((text, tokens, token_int, SimpleNamespace(score=score)))
+        return results, {"seconds": len(audio) / self.fs, "compute": compute, "lags": lags,
+                         "final_lag": lags[-1] if lags else 0.0}
+
+
+def decode(args, speech2text, recognizer, reader, keys):
+    """Stage 12: stream every utterance at --chunk_ms and write the ESPnet output layout"""
+    from espnet2.fileio.datadir_writer import DatadirWriter
+
+    partial = open(args.partial_jsonl, 'w', encoding='utf-8') if args.partial_jsonl else None
+    start = time.time()
+    audio_s = 0.0
+    with DatadirWriter(args.output_dir) as writer:
+        for key in keys:
+            on_partial = None
+            if partial is not None:
+                on_partial = lambda t, text, key=key: partial.write(
+                    json.dumps({"key": key, "time": round(t, 3), "text": text}, ensure_ascii=False) + "\n")
+            results, timing = recognizer.recognize(reader[key]["speech"], args.chunk_ms, on_partial)
+            write_results(writer, key, results)
+            audio_s += timing["seconds"]
+    if partial is not None:
+        partial.close()
+    wall = time.time() - start
+    logging.info(f"Streamed {len(keys)} utterances at {args.chunk_ms} ms chunks in {wall:.1f}s "
+                 f"(RTF {wall / max(audio_s, 1e-9):.3f})")
+
+
+def evaluate(args, speech2text, recognizer, reader, keys):
+    """CER, RTF and latency of offline decoding and of each chunk size"""
+    import torch
+
+    refs = read_kaldi_map(args.ref_text)
+    refs = {k: refs[k] for k in keys if k in refs}
+    rows = []
+
+    hyps, compute, audio_s, lags = {}, 0.0, 0.0, []
+    for key in keys:
+        speech = reader[key]["speech"]
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            results = speech2text(speech)
+        dt = time.perf_counter() - t0
+        hyps[key] = results[0][0] if results else ""
+        compute += dt
+        audio_s += len(speech) / args.fs
+        # Offline decoding starts when the utterance has ended
+        lags.append(dt)
+    rows.append({"mode": "offline", "chunk_ms": None, "lookahead_ms": None,
+                 "cer": char_error_rate(refs, hyps), "rtf": compute / max(audio_s, 1e-9),
+                 "mean_lag_ms": 1000 * float(np.mean(lags)), "p90_lag_ms": 1000 * float(np.percentile(lags, 90)),
+                 "final_lag_ms": 1000 * float(np.mean(lags))})
+
+    for chunk_ms in [int(c) for c in args.evaluate_chunks.split()]:
+        hyps, compute, lags, final = {}, 0.0, [], []
+        for key in keys:
+            results, timing = recognizer.recognize(reader[key]["speech"], chunk_ms)
+            hyps[key] = results[0][0] if results else ""
+            compute += timing["compute"]
+            lags.extend(timing["lags"])
+            final.append(timing["final_lag"])
+        rows.append({"mode": "streaming", "chunk_ms": chunk_ms, "lookahead_ms": recognizer.lookahead_ms,
+                     "cer": char_error_rate(refs, hyps), "rtf": compute / max(audio_s, 1e-9),
+                     "mean_lag_ms": 1000 * float(np.mean(lags)), "p90_lag_ms": 1000 * float(np.percentile(lags, 90)),
+                     "final_lag_ms": 1000 * float(np.mean(final))})
+
+    out_dir = Path(args.output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / "streaming_tradeoff.json", 'w', encoding='utf-8') as f:
+        json.dump({"utterances": len(keys), "audio_seconds": audio_s, "rows": rows}, f, indent=2)
+    lines = [
+        f"# Streaming vs offline decoding ({len(keys)} utterances, {audio_s / 60:.1f} min)",
+        "",
+        "Lag: time from the end of a chunk (offline: of the utterance) until its output is ready, "
+        "with audio arriving in real time. A chunk's first sample also waits chunk + lookahead.",
+        "",
+        "| Mode | Chunk (ms) | Lookahead (ms) | CER (%) | RTF | Mean lag (ms) | P90 lag (ms) | Final lag (ms) |",
+        "|---|---|---|---|---|---|---|---|",
+    ]
+    for r in rows:
+        chunk = "-" if r["chunk_ms"] is None else str(r["chunk_ms"])
+        lookahead = "-" if r["lookahead_ms"] is None else f"{r['lookahead_ms']:.0f}"
+        lines.append(f"| {r['mode']} | {chunk} | {lookahead} | {r['cer']:.2f} | {r['rtf']:.3f} | "
+                     f"{r['mean_lag_ms']:.0f} | {r['p90_lag_ms']:.0f} | {r['final_lag_ms']:.0f} |")
+    (out_dir / "streaming_tradeoff.md").write_text("\n".join(lines) + "\n", encoding='utf-8')
+    print("\n".join(lines))
+
+
+def main(argv=None):
+    args = parse_args(argv, get_streaming_parser())
+    logging.basicConfig(
+        level=args.log_level,
+        format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+    )
+    if args.evaluate_chunks and not args.ref_text:
+        raise SystemExit("--evaluate_chunks needs --ref_text")
+    speech2text = build_speech2text(args)
+    recognizer = StreamingRecognizer(speech2text, args)
+    reader = UtteranceReader(args.data_path_and_name_and_type, speech2text)
+    keys = read_keys(args.key_file, reader)
+    if args.evaluate_chunks:
+        evaluate(args, speech2text, recognizer, reader, keys)
+    else:
+        decode(args, speech2text, recognizer, reader, keys)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Pipelined Batch Transcription of a Directory of Recordings
+Audio reads (thread prefetch), feature extraction and decoding run as separate stages
+joined by bounded queues, so disk and CPU work overlap; results stream out in Kaldi text format
+"""
+import hashlib
+import logging
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from kaldi_data import read_kaldi_map
+from kurdish_asr_inference import build_speech2text, get_parser, parse_args
+from normalize_audio import read_audio
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3")
+_DONE = object()
+
+
+def get_transcribe_parser():
+    parser = get_parser()
+    group = parser.add_argument_group("Pipeline related")
+    group.add_argument("--input", required=True, help="Directory of recordings or a wav.scp")
+    group.add_argument("--fs", type=int, default=16000, help="Sampling rate of the model")
+    group.add_argument("--read_threads", type=int, default=4)
+    group.add_argument("--queue_size", type=int, default=16,
+                       help="Capacity of each inter-stage queue (backpressure bound)")
+    return parser
+
+
+def list_inputs(path):
+    """(utt_id, audio path) pairs from a wav.scp or a directory tree"""
+    path = Path(path)
+    if path.is_file():
+        return list(read_kaldi_map(path).items())
+    items = []
+    for audio in sorted(p for p in path.rglob("*") if p.suffix.lower() in AUDIO_EXTENSIONS):
+        utt = "_".join(audio.relative_to(path).with_suffix("").parts)
+        items.append((utt, str(audio)))
+    return items
+
+
+class StageStats:
+    """Busy time per stage; utilization = busy / wall"""
+
+    def __init__(self, name):
+        self.name = name
+        self.busy = 0.0
+        self.items = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.busy += seconds
+            self.items += 1
+
+
+class PrecomputedFeatures:
+    """Lets the decode stage reuse features computed by the feature stage"""
+
+    def __init__(self, asr_model):
+        self.extract = asr_model._extract_feats
+        self.ready = {}
+        self.lock = threading.Lock()
+        asr_model._extract_feats = self
+
+    @staticmethod
+    def key(speech):
+        return hashlib.sha1(speech.detach().cpu().numpy().tobytes()).hexdigest()
+
+    def compute(self, speech, lengths):
+        feats = self.extract(speech, lengths)
+        with self.lock:
+            self.ready[self.key(speech)] = feats
+        return feats
+
+    def __call__(self, speech, lengths):
+        with self.lock:
+            feats = self.ready.pop(self.key(speech), None)
+        return feats if feats is not None else self.extract(speech, lengths)
+
+
+class StageFailed:
+    """Queue item that carries the exception of an upstream stage to the decode stage"""
+
+    def __init__(self, stage, error):
+        self.stage = stage
+        self.error = error
+
+
+def put(q, item, stop):
+    """Blocking put that gives up once stop is set (the consumer may be gone)"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def get(q, stop):
+    """Blocking get that ends the stage once stop is set"""
+    while True:
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                return _DONE
+
+
+def run_stage(name, target, out_q, stop, *args):
+    """Thread body: an exception is passed downstream instead of leaving the pipeline waiting"""
+    try:
+        target(*args, out_q, stop)
+    except Exception as e:
+        put(out_q, StageFailed(name, e), stop)
+
+
+def reader_stage(items, fs, n_threads, stats, out_q, stop):
+    """Prefetch audio with a thread pool, in input order, blocking when out_q is full"""
+    def load(item):
+        start = time.time()
+        try:
+            audio = read_audio(item[1], fs)
+        except Exception as e:
+            logging.error(f"Skipping {item[1]}: {e}")
+            audio = None
+        stats.add(time.time() - start)
+        return item[0], audio
+
+    def emit(result):
+        return result[1] is None or put(out_q, result, stop)
+
+    with ThreadPoolExecutor(n_threads) as pool:
+        window = []
+        for item in items:
+            window.append(pool.submit(load, item))
+            if len(window) >= n_threads * 2 and not emit(window.pop(0).result()):
+                return
+        for future in window:
+            if not emit(future.result()):
+                return
+    put(out_q, _DONE, stop)
+
+
+def feature_stage(speech2text, features, in_q, stats, out_q, stop):
+    import torch
+
+    while True:
+        item = get(in_q, stop)
+        if item is _DONE or isinstance(item, StageFailed):
+            put(out_q, item, stop)
+            return
+        utt, audio = item
+        start = time.time()
+        speech = torch.from_numpy(audio).unsqueeze(0).to(getattr(speech2text, "device", "cpu"))
+        lengths = speech.new_full([1], speech.size(1), dtype=torch.long)
+        with torch.no_grad():
+            features.compute(speech, lengths)
+        stats.add(time.time() - start)
+        if not put(out_q, (utt, audio), stop):
+            return
+
+
+def decode_stage(speech2text, in_q, writer, stats, stop):
+    import torch
+
+    while True:
+        item = get(in_q, stop)
+        if item is _DONE:
+            return
+        if isinstance(item, StageFailed):
+            raise RuntimeError(f"{item.stage} stage failed: {item.error!r}") from item.error
+        utt, audio = item
+        start = time.time()
+        with torch.no_grad():
+            results = speech2text(audio)
+        stats.add(time.time() - start)
+        text = results[0][0] if results else ""
+        writer.write(f"{utt} {text}\n")
+        writer.flush()
+
+
+def main(argv=None):
+    args = parse_args(argv, get_transcribe_parser())
+    logging.basicConfig(
+        level=args.log_level,
+        format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+    )
+    items = list_inputs(args.input)
+    speech2text = build_speech2text(args)
+    features = PrecomputedFeatures(speech2text.asr_model)
+    stats = [StageStats("read"), StageStats("features"), StageStats("decode")]
+    audio_q = queue.Queue(maxsize=args.queue_size)
+    feats_q = queue.Queue(maxsize=args.queue_size)
+
+    out_dir = Path(args.output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    start = time.time()
+    # Set when decoding ends early (an error), so the other stages stop waiting on full queues
+    stop = threading.Event()
+    with open(out_dir / "text", 'w', encoding='utf-8') as writer:
+        threads = [
+            threading.Thread(target=run_stage, daemon=True,
+                             args=("read", reader_stage, audio_q, stop,
+                                   items, args.fs, args.read_threads, stats[0])),
+            threading.Thread(target=run_stage, daemon=True,
+                             args=("features", feature_stage, feats_q, stop,
+                                   speech2text, features, audio_q, stats[1])),
+        ]
+        for t in threads:
+            t.start()
+        try:
+            decode_stage(speech2text, feats_q, writer, stats[2], stop)
+        finally:
+            stop.set()
+            for t in threads:
+                t.join()
+    wall = time.time() - start
+
+    print("=" * 60)
+    print(f"Transcribed {len(items)} recordings in {wall:.1f}s -> {out_dir / 'text'}")
+    for s in stats:
+        workers = args.read_threads if s.name == "read" else 1
+        print(f"   {s.name:9s} busy {s.busy:8.1f}s  utilization {100 * s.busy / max(wall * workers, 1e-9):5.1f}%"
+              f"  ({s.items} items)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+soundfile = pytest.importorskip("soundfile")
+pytest.importorskip("scipy")
+
+from augment_audio import augment_dir  # noqa: E402
+from kaldi_data import read_kaldi_map  # noqa: E402
+
+
+def test_pipe_entries_are_augmented(tmp_path):
+    data = tmp_path / "train"
+    data.mkdir()
+    src = tmp_path / "a.wav"
+    soundfile.write(src, np.random.default_rng(0).uniform(-0.5, 0.5, 8000), 16000, subtype="PCM_16")
+    # Speed-perturbed copies are "cmd |" entries; cat stands in for sox here
+    (data / "wav.scp").write_text(f"spk_a {src}\nsp0.9-spk_a cat {src} |\n")
+    (data / "utt2spk").write_text("spk_a spk\nsp0.9-spk_a sp0.9-spk\n")
+    (data / "text").write_text("spk_a silav\nsp0.9-spk_a silav\n")
+
+    augment_dir(data, tmp_path / "aug", 1, (None, None, (0.0, 20.0), 1.0, 0.5), 8, 1, 0)
+    wav_scp = read_kaldi_map(tmp_path / "aug" / "wav.scp")
+    assert sorted(wav_scp) == ["aug1-sp0.9-spk_a", "aug1-spk_a"]
+    assert soundfile.info(wav_scp["aug1-sp0.9-spk_a"]).frames == 8000
+
+
+def test_failing_pipe_is_reported(tmp_path, capsys):
+    data = tmp_path / "train"
+    data.mkdir()
+    (data / "wav.scp").write_text("spk_a false |\n")
+    (data / "utt2spk").write_text("spk_a spk\n")
+
+    augment_dir(data, tmp_path / "aug", 1, (None, None, (0.0, 20.0), 1.0, 0.5), 8, 1, 0)
+    assert "1 utterances could not be read" in capsys.readouterr().out
+
+
+def test_ark_entries_are_refused(tmp_path):
+    data = tmp_path / "train"
+    data.mkdir()
+    (data / "wav.scp").write_text("spk_a dump/raw/train/data/format.1.ark:12\n")
+    (data / "utt2spk").write_text("spk_a spk\n")
+
+    with pytest.raises(SystemExit, match="ark offsets"):
+        augment_dir(data, tmp_path / "aug", 1, (None, None, (0.0, 20.0), 1.0, 0.5), 8, 1, 0)
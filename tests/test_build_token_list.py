@@ -0,0 +1,26 @@
+from build_token_list import count_tokens, sample_text
+
+LINES = ["من له شاری هەولێرم", "سڵاو هاوڕێ", "ئەمە دەقێکی تاقیکردنەوەیە", "یەک"]
+
+
+def test_bpe_sample_is_the_spm_train_input(tmp_path):
+    # Stage 5 strips the utterance ids before BPE training (cut -f 2-)
+    path = tmp_path / "train.txt"
+    path.write_text("".join(f"{line}\n" for line in LINES), encoding='utf-8')
+    sample, n_total = sample_text(str(path), n_lines=100, nj=2)
+    assert n_total == len(LINES)
+    assert sorted(sample) == sorted(LINES)
+
+
+def test_bpe_sample_can_drop_utterance_ids(tmp_path):
+    path = tmp_path / "text"
+    path.write_text("".join(f"utt{i} {line}\n" for i, line in enumerate(LINES)), encoding='utf-8')
+    sample, _ = sample_text(str(path), n_lines=100, nj=2, field2=True)
+    assert sorted(sample) == sorted(LINES)
+
+
+def test_char_counts_skip_utterance_ids(tmp_path):
+    path = tmp_path / "text"
+    path.write_text("utt1 ab a\nutt2 b\n", encoding='utf-8')
+    counts = count_tokens(str(path), "char", {}, nj=2)
+    assert counts == {"a": 2, "b": 2, "<space>": 1}
@@ -0,0 +1,42 @@
+import numpy as np
+
+from char_ngram_lm import ArrayNgramLM
+
+SOS = 4
+LINES = [[0, 1, 2], [0, 1, 3], [0, 1, 2, 2], [3, 2]]
+
+
+def train(order=3):
+    return ArrayNgramLM.train(LINES, order, vocab_size=5, sos=SOS)
+
+
+def test_next_token_distributions_sum_to_one():
+    lm = train()
+    contexts = lm.contexts([[], [0], [0, 1], [2, 2], [3, 3]])
+    probs = np.exp(lm.next_log_probs(contexts))
+    assert np.allclose(probs.sum(axis=1), 1.0)
+
+
+def test_seen_continuations_score_higher():
+    lm = train()
+    logp = lm.next_log_probs(lm.contexts([[0]]))[0]
+    # "0" is always followed by "1" in training
+    assert logp.argmax() == 1
+    assert lm.sentence_log_prob([0, 1, 2])[0] > lm.sentence_log_prob([2, 1, 0])[0]
+
+
+def test_sentence_log_prob_matches_stepwise_scores():
+    lm = train()
+    ids = [0, 1, 2, 3]
+    total = sum(lm.next_log_probs(lm.contexts([ids[:i]]))[0][(ids + [SOS])[i]] for i in range(len(ids) + 1))
+    logp, n = lm.sentence_log_prob(ids)
+    assert n == len(ids) + 1
+    assert np.isclose(logp, total)
+
+
+def test_save_load_roundtrip(tmp_path):
+    lm = train(order=4)
+    lm.save(tmp_path)
+    loaded = ArrayNgramLM.load(tmp_path)
+    contexts = lm.contexts([[0, 1], [3], [1, 2, 2]])
+    assert np.array_equal(lm.next_log_probs(contexts), loaded.next_log_probs(contexts))
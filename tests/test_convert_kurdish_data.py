@@ -0,0 +1,26 @@
+import json
+
+from convert_kurdish_data import convert_json_to_espnet
+
+
+def write_split(base, split, utt_ids):
+    (base / split).mkdir(parents=True)
+    items = [{"utterance_id": u, "audio_path": f"{u}.wav", "transcription": "سڵاو", "gloss": "hello"}
+             for u in utt_ids]
+    (base / split / "data.json").write_text(json.dumps(items), encoding='utf-8')
+
+
+def test_drop_list_is_explicit(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    base = tmp_path / "corpus"
+    write_split(base, "train", ["spk1_001", "spk1_002", "spk2_001"])
+    drop = tmp_path / "drop_utts"
+    drop.write_text("spk1_002\nspk9_999\n", encoding='utf-8')
+
+    convert_json_to_espnet(str(base), "ckb", target_fs=0)
+    assert len((tmp_path / "data/w2g_all_ckb_train/wav.scp").read_text().splitlines()) == 3
+
+    convert_json_to_espnet(str(base), "ckb", target_fs=0, drop_list=str(drop))
+    wav_scp = (tmp_path / "data/w2g_all_ckb_train/wav.scp").read_text().splitlines()
+    assert [line.split()[0] for line in wav_scp] == ["spk1_001", "spk2_001"]
+    assert "1 of the 2 utterances" in capsys.readouterr().out
@@ -0,0 +1,38 @@
+import itertools
+
+import decode_cache
+from decode_cache import DecodeCache
+
+
+def test_lookup_needs_all_three_keys(tmp_path):
+    cache = DecodeCache(tmp_path)
+    cache.put("audio", "model", "config", {"text": "سڵاو"})
+    assert cache.get("audio", "model", "config") == {"text": "سڵاو"}
+    assert cache.get("audio", "model2", "config") is None
+    assert cache.get("audio", "model", "config2") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    cache.close()
+    assert DecodeCache(tmp_path).get("audio", "model", "config") == {"text": "سڵاو"}
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(decode_cache.time, "time", lambda: float(next(clock)))
+    cache = DecodeCache(tmp_path, max_entries=2)
+    for utt in ("a", "b", "c"):
+        cache.put(utt, "m", "c", {"text": utt})
+    cache.get("a", "m", "c")
+    assert cache.evict() == (2, sum(len(f'{{"text": "{u}"}}') for u in "ac"))
+    assert cache.get("b", "m", "c") is None
+    assert cache.get("a", "m", "c") is not None and cache.get("c", "m", "c") is not None
+
+
+def test_audio_hash_follows_content_and_prompt(tmp_path):
+    cache = DecodeCache(tmp_path / "cache")
+    wav = tmp_path / "a.wav"
+    wav.write_bytes(b"RIFF1")
+    first = cache.audio_hash(str(wav))
+    assert cache.audio_hash(str(wav)) == first
+    assert cache.audio_hash(str(wav), extra="prompt") != first
+    wav.write_bytes(b"RIFF22")
+    assert cache.audio_hash(str(wav)) != first
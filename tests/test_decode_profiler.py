@@ -0,0 +1,41 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from decode_profiler import DecodeProfiler
+
+
+def fake_speech2text():
+    asr_model = SimpleNamespace(_extract_feats=lambda x: x, normalize=None,
+                                encoder=SimpleNamespace(forward=lambda x: x))
+    return SimpleNamespace(asr_model=asr_model, beam_search=None)
+
+
+def test_rtf_uses_utt2dur_for_features(tmp_path):
+    jsonl = tmp_path / "profile.1.jsonl"
+    profiler = DecodeProfiler(fake_speech2text(), jsonl, fs=16000, utt2dur={"utt1": 4.0})
+    feats = np.zeros((400, 80), dtype=np.float32)  # 4s of 10ms frames
+    with profiler.utterance("utt1", len(feats)):
+        pass
+    profiler.close()
+    record = json.loads(jsonl.read_text())
+    assert record["duration"] == 4.0
+    assert record["rtf"] == pytest.approx(record["wall"] / 4.0)
+
+
+def test_raw_audio_without_utt2dur(tmp_path):
+    jsonl = tmp_path / "profile.1.jsonl"
+    profiler = DecodeProfiler(fake_speech2text(), jsonl, fs=16000)
+    with profiler.utterance("utt1", 32000):
+        pass
+    profiler.close()
+    assert json.loads(jsonl.read_text())["duration"] == 2.0
+
+
+def test_missing_duration_is_an_error(tmp_path):
+    profiler = DecodeProfiler(fake_speech2text(), tmp_path / "p.jsonl", utt2dur={"utt1": 1.0})
+    with pytest.raises(KeyError, match="utt2"):
+        with profiler.utterance("utt2", 100):
+            pass
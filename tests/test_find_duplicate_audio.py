@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from find_duplicate_audio import EMPTY, FP_RATE, UnionFind, landmarks, lsh_candidates, minhash
+
+
+def test_minhash_estimates_jaccard():
+    rng = np.random.default_rng(0)
+    pool = rng.choice(1 << 40, 3000, replace=False).astype(np.uint64)
+    a, b = pool[:2000], pool[1000:]  # Jaccard 1000 / 3000
+    agreement = np.mean(minhash(a) == minhash(b))
+    assert abs(agreement - 1 / 3) < 0.15
+    assert np.array_equal(minhash(a), minhash(a[::-1].copy()))
+    assert np.array_equal(minhash(np.zeros(0, dtype=np.uint64)), EMPTY)
+
+
+def test_lsh_pairs_only_similar_valid_signatures():
+    rng = np.random.default_rng(1)
+    sigs = np.stack([minhash(rng.integers(0, 1 << 40, 500).astype(np.uint64)) for _ in range(4)])
+    sigs[1] = sigs[0]
+    sigs[3] = sigs[0]
+    valid = np.array([True, True, True, False])
+    assert lsh_candidates(sigs, valid, bands=32) == {(0, 1)}
+
+
+def test_union_find_merges_transitively():
+    uf = UnionFind(5)
+    uf.union(0, 1)
+    uf.union(3, 1)
+    assert uf.find(0) == uf.find(3) == uf.find(1)
+    assert len({uf.find(i) for i in range(5)}) == 3
+
+
+def tone_bursts(rng, seconds=4):
+    audio = np.zeros(seconds * FP_RATE)
+    t = np.arange(FP_RATE // 10) / FP_RATE
+    for start in rng.integers(0, len(audio) - len(t), 12 * seconds):
+        audio[start:start + len(t)] += np.sin(2 * np.pi * rng.uniform(200, 3500) * t) * np.hanning(len(t))
+    return audio
+
+
+def test_fingerprint_survives_shift_gain_and_noise():
+    pytest.importorskip("scipy")
+    rng = np.random.default_rng(2)
+    audio = tone_bursts(rng)
+    # Delayed by 1000 samples (not a whole hop), at half the gain, with fresh noise
+    copy = 0.5 * np.concatenate([np.zeros(1000), audio])
+    other = tone_bursts(rng)
+    sig = [minhash(landmarks((x + 1e-3 * rng.normal(size=len(x))).astype(np.float32)))
+           for x in (audio, copy, other)]
+    assert np.mean(sig[0] == sig[1]) > 0.5
+    assert np.mean(sig[0] == sig[2]) < 0.1
@@ -0,0 +1,31 @@
+from kurdish_text_norm import normalize, normalize_kaldi_line
+
+ZWNJ = "‌"
+
+
+def test_final_heh_consonant_is_kept():
+    # شاه (king), کوه (mountain), ماه (moon) end in a real /h/
+    for word in ("شاه", "کوه", "ماه"):
+        assert normalize(word) == word
+        assert normalize(f"{word} و") == f"{word} و"
+
+
+def test_heh_zwnj_vowel_becomes_ae():
+    assert normalize(f"خانه{ZWNJ}کان") == "خانەکان"
+    assert normalize(f"مالهـ{ZWNJ}وە") == "مالەوە"
+
+
+def test_final_heh_vowel_is_opt_in():
+    assert normalize("خانه") == "خانه"
+    assert normalize("خانه", final_heh=True) == "خانە"
+    assert normalize_kaldi_line("utt1 ئەم خانه", final_heh=True) == "utt1 ئەم خانە"
+
+
+def test_arabic_letters_fold_to_kurdish():
+    assert normalize("يكھ") == "یکه"
+    assert normalize("ة") == "ە"
+
+
+def test_ascii_and_spaces():
+    assert normalize("  abc   def ") == "abc def"
+    assert normalize("سڵاو\xa0 ​هاوڕێ") == "سڵاو هاوڕێ"
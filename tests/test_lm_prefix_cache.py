@@ -0,0 +1,68 @@
+import numpy as np
+
+from lm_prefix_cache import PrefixCachedLMScorer, PrefixTrieCache
+
+SOS = 0
+UTTERANCES = ["ئەم کتێبە باشە", "ئەم کتێبە خۆشە", "ئەم شارە گەورەیە", "من لە شارم", "من لە ماڵم"]
+
+
+class CountingLM:
+    """Deterministic stand-in LM that counts its forward passes"""
+
+    def __init__(self, vocab_size):
+        self.vocab_size = vocab_size
+        self.forwards = 0
+
+    def init_state(self, x):
+        return None
+
+    def score(self, y, state, x):
+        self.forwards += 1
+        rng = np.random.default_rng(hash(tuple(y.tolist())) % (1 << 32))
+        return rng.normal(size=self.vocab_size), len(y)
+
+
+def decode(scorer, utterances, vocab, beam=4, clear_per_utterance=False):
+    """Score the prefixes a beam search would visit: the reference plus beam - 1 rivals per step"""
+    outputs = []
+    for text in utterances:
+        if clear_per_utterance:
+            scorer.cache.clear()
+        scorer.init_state(None)
+        ids = [vocab[c] for c in text]
+        for t in range(len(ids) + 1):
+            prefix = [SOS] + ids[:t]
+            rivals = [prefix[:-1] + [(prefix[-1] + k) % len(vocab) + 1] for k in range(1, beam)] if t else []
+            for y in [prefix] + rivals:
+                outputs.append(scorer.score(np.array(y), None, None))
+    return outputs
+
+
+def test_cache_is_shared_across_utterances():
+    vocab = {c: i + 1 for i, c in enumerate(sorted(set("".join(UTTERANCES))))}
+    plain_lm = CountingLM(len(vocab) + 1)
+    plain = decode(PrefixCachedLMScorer(plain_lm, max_entries=0), UTTERANCES, vocab)
+
+    lm = CountingLM(len(vocab) + 1)
+    scorer = PrefixCachedLMScorer(lm, max_entries=10000)
+    cached = decode(scorer, UTTERANCES, vocab)
+    assert all(np.array_equal(a[0], b[0]) and a[1] == b[1] for a, b in zip(plain, cached))
+    stats = scorer.stats()
+    # The shared openings ("ئەم کتێبە", "من لە", ...) reach the LM only once
+    assert stats["hit_rate"] > 0.3
+    assert lm.forwards == stats["forwarded"] < 0.7 * plain_lm.forwards
+
+    per_utt = PrefixCachedLMScorer(CountingLM(len(vocab) + 1), max_entries=10000)
+    decode(per_utt, UTTERANCES, vocab, clear_per_utterance=True)
+    assert per_utt.stats()["hit_rate"] == 0.0
+
+
+def test_trie_evicts_least_recently_used():
+    cache = PrefixTrieCache(max_entries=2)
+    cache.put((1,), "a")
+    cache.put((1, 2), "b")
+    cache.get((1,))
+    cache.put((3,), "c")
+    assert cache.get((1, 2)) is None
+    assert cache.get((1,)) == "a" and cache.get((3,)) == "c"
+    assert cache.evicted == 1
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+soundfile = pytest.importorskip("soundfile")
+pytest.importorskip("scipy")
+
+from normalize_audio import normalize_paths  # noqa: E402
+
+
+def test_cache_is_kept_per_target_rate(tmp_path):
+    src = tmp_path / "stereo_44k.wav"
+    t = np.arange(44100) / 44100
+    soundfile.write(src, np.stack([np.sin(2 * np.pi * 440 * t)] * 2, axis=1) * 0.5, 44100)
+    cache = tmp_path / "cache"
+
+    for fs in (16000, 8000, 16000):
+        dst = normalize_paths([str(src)], cache, target_fs=fs, nj=1)[str(src)]
+        info = soundfile.info(dst)
+        assert (info.samplerate, info.channels, info.frames) == (fs, 1, fs)
+    assert len(list(cache.glob("*.wav"))) == 2
+
+
+def test_conforming_files_are_used_in_place(tmp_path):
+    src = tmp_path / "mono_16k.wav"
+    soundfile.write(src, np.zeros(1600), 16000)
+    assert normalize_paths([str(src)], tmp_path / "cache", nj=1) == {str(src): str(src)}
@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from quantize_asr_model import load_int8_model, quantize_model  # noqa: E402
+
+
+class TinyModel(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.rnn = torch.nn.LSTM(8, 16, batch_first=True)
+        self.out = torch.nn.Linear(16, 5)
+
+    def forward(self, x):
+        return self.out(self.rnn(x)[0])
+
+
+def test_int8_state_dict_round_trip(tmp_path):
+    torch.manual_seed(0)
+    model = quantize_model(TinyModel())
+    path = tmp_path / "model_int8.pth"
+    torch.save(model.state_dict(), path)
+
+    skeleton = TinyModel()
+    load_int8_model(SimpleNamespace(asr_model=skeleton), str(path))
+    x = torch.randn(2, 7, 8)
+    with torch.no_grad():
+        assert torch.equal(model(x), skeleton(x))
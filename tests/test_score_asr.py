@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+
+from score_asr import (DEL_COST, INS_COST, SUB_COST, Tokenizer, align, char_error_rate,
+                       error_counts, format_result)
+
+
+def reference_cost(ref, hyp):
+    """Plain O(n*m) weighted Levenshtein"""
+    dist = [[0] * (len(hyp) + 1) for _ in range(len(ref) + 1)]
+    for i in range(len(ref) + 1):
+        for j in range(len(hyp) + 1):
+            if i == 0 or j == 0:
+                dist[i][j] = i * DEL_COST + j * INS_COST
+                continue
+            dist[i][j] = min(dist[i - 1][j - 1] + (0 if ref[i - 1] == hyp[j - 1] else SUB_COST),
+                             dist[i - 1][j] + DEL_COST, dist[i][j - 1] + INS_COST)
+    return dist[-1][-1]
+
+
+def test_align_counts():
+    assert error_counts("abc", "abc") == (3, 0, 0, 0)
+    assert error_counts("abc", "abd") == (2, 1, 0, 0)
+    assert error_counts("abc", "ac") == (2, 0, 1, 0)
+    assert error_counts("ac", "abc") == (2, 0, 0, 1)
+    assert error_counts("", "ab") == (0, 0, 0, 2)
+    assert error_counts("ab", "") == (0, 0, 2, 0)
+
+
+def test_align_ops_match_counts_and_cost():
+    rng = random.Random(0)
+    for _ in range(200):
+        ref = np.array([rng.randrange(3) for _ in range(rng.randrange(8))], dtype=np.int64)
+        hyp = np.array([rng.randrange(3) for _ in range(rng.randrange(8))], dtype=np.int64)
+        corr, sub, dele, ins, ops = align(ref, hyp)
+        assert (corr, sub, dele, ins) == tuple(ops.count(c) for c in "CSDI")
+        assert corr + sub + dele == len(ref) and corr + sub + ins == len(hyp)
+        assert sub * SUB_COST + dele * DEL_COST + ins * INS_COST == reference_cost(ref, hyp)
+
+
+def test_char_error_rate():
+    refs = {"u1": "abcd", "u2": "ab  cd"}
+    assert char_error_rate(refs, {"u1": "abcd", "u2": "ab cd"}) == 0.0
+    # u1: 1 substitution, u2 missing: 5 deletions, over 4 + 5 reference characters
+    assert char_error_rate(refs, {"u1": "abxd"}) == 100.0 * 6 / 9
+
+
+def test_char_tokenizer_keeps_nlsyms():
+    tokenize = Tokenizer("char", nlsyms=["<noise>"])
+    assert tokenize("a <noise>b") == ["a", "<space>", "<noise>", "b"]
+    assert Tokenizer("char", nlsyms=["<noise>"], remove_nlsyms=True)("a<noise>b") == ["a", "b"]
+    assert Tokenizer("word")("  a  b ") == ["a", "b"]
+
+
+def test_format_result_sums_speakers():
+    rows = {"spk1": [1, 4, 3, 1, 0, 0, 1], "spk2": [1, 6, 6, 0, 0, 0, 0]}
+    text = format_result("test", rows)
+    sum_line = next(line for line in text.splitlines() if "Sum/Avg" in line)
+    values = [float(v) for v in sum_line.replace("|", " ").split()[1:]]
+    assert values == [2, 10, 90.0, 10.0, 0.0, 0.0, 10.0, 50.0]
+    assert [l.split()[1] for l in text.splitlines() if "spk" in l] == ["spk1", "spk2"]
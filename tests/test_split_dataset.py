@@ -0,0 +1,43 @@
+import numpy as np
+
+from split_dataset import SplitProblem, greedy_assign, local_search
+
+RATIOS = {"train": 0.8, "dev": 0.1, "test": 0.1}
+
+
+def make_utts(n_speakers=40, seed=0):
+    rng = np.random.default_rng(seed)
+    utts = []
+    for s in range(n_speakers):
+        dialect = ["mukri", "sulaimani", "erbil"][s % 3]
+        for _ in range(rng.integers(2, 30)):
+            utts.append({"speaker": f"spk{s:02d}", "dialect": dialect, "duration": float(rng.uniform(1, 15))})
+    return utts
+
+
+def test_greedy_assigns_every_speaker():
+    problem = SplitProblem(make_utts(), RATIOS)
+    assign = greedy_assign(problem)
+    assert len(assign) == len(problem.speakers)
+    assert set(assign) == {0, 1, 2}
+    load, load_dia = problem.loads(assign)
+    assert np.isclose(load.sum(), problem.spk_dur.sum())
+    assert np.allclose(load_dia.sum(axis=1), load)
+
+
+def test_local_search_lowers_cost_and_hits_ratios():
+    problem = SplitProblem(make_utts(), RATIOS)
+    greedy = greedy_assign(problem)
+    greedy_cost = problem.cost(*problem.loads(greedy), 1.0)
+    assign = local_search(problem, greedy.copy(), 1.0, max_rounds=200, swap_candidates=50,
+                          rng=np.random.default_rng(0))
+    load, load_dia = problem.loads(assign)
+    assert problem.cost(load, load_dia, 1.0) <= greedy_cost
+    assert np.all(np.abs(load / load.sum() - np.array(list(RATIOS.values()))) < 0.02)
+
+
+def test_equal_speakers_split_exactly():
+    utts = [{"speaker": f"spk{s}", "dialect": "mukri", "duration": 10.0} for s in range(10)]
+    problem = SplitProblem(utts, RATIOS)
+    assign = local_search(problem, greedy_assign(problem), 1.0, 50, 10, np.random.default_rng(0))
+    assert np.bincount(assign, minlength=3).tolist() == [8, 1, 1]
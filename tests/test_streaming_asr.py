@@ -0,0 +1,96 @@
+import itertools
+from collections import defaultdict
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from streaming_asr import CTCPrefixBeamSearch, StreamingRecognizer
+
+
+def collapse(path, blank=0):
+    out = []
+    prev = None
+    for c in path:
+        if c != prev and c != blank:
+            out.append(c)
+        prev = c
+    return tuple(out)
+
+
+def brute_force(logp):
+    """Probability of every label sequence, summed over all CTC paths"""
+    totals = defaultdict(float)
+    for path in itertools.product(range(logp.shape[1]), repeat=len(logp)):
+        totals[collapse(path)] += np.exp(sum(logp[t, c] for t, c in enumerate(path)))
+    return totals
+
+
+def test_full_beam_matches_brute_force():
+    rng = np.random.default_rng(0)
+    logits = rng.normal(size=(4, 3))
+    logp = logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+    search = CTCPrefixBeamSearch(beam_size=1000, token_beam=3)
+    for frame in logp:
+        search.step(frame)
+    expected = brute_force(logp)
+    nbest = search.nbest(1000)
+    assert len(nbest) == len(expected)
+    for prefix, score in nbest:
+        assert np.isclose(np.exp(score), expected[tuple(prefix)])
+    assert tuple(nbest[0][0]) == max(expected, key=expected.get)
+
+
+def test_repeated_token_needs_a_blank():
+    eps = 1e-6
+    # a a -> "a"; a <blank> a -> "a a"
+    frames = {"aa": [[eps, 1 - 2 * eps, eps]] * 2,
+              "a_a": [[eps, 1 - 2 * eps, eps], [1 - 2 * eps, eps, eps], [eps, 1 - 2 * eps, eps]]}
+    for name, expected in (("aa", [1]), ("a_a", [1, 1])):
+        search = CTCPrefixBeamSearch(beam_size=4, token_beam=3)
+        for frame in np.log(np.array(frames[name])):
+            search.step(frame)
+        assert search.nbest(1)[0][0] == expected
+
+
+def test_beam_is_pruned_and_reset():
+    search = CTCPrefixBeamSearch(beam_size=2, token_beam=3)
+    for frame in np.log(np.full((5, 3), 1 / 3)):
+        search.step(frame)
+        assert len(search.beams) <= 2
+    search.reset()
+    assert search.nbest(5) == [([], 0.0)]
+
+
+class BigramLM:
+    """Scorer over tokens {0: blank, 1, 2, 3: sos/eos} from a table of log P(next | last)"""
+
+    def __init__(self, table):
+        self.table = table
+        self.calls = 0
+
+    def init_state(self, x):
+        return None
+
+    def score(self, y, state, x):
+        import torch
+
+        self.calls += 1
+        return torch.log(torch.tensor(self.table[int(y[-1])], dtype=x.dtype)), state
+
+
+def test_lm_rescores_the_final_nbest():
+    torch = pytest.importorskip("torch")
+
+    lm = BigramLM({3: [0.0, 0.1, 0.8, 0.1], 1: [0.0, 0.1, 0.1, 0.8], 2: [0.0, 0.1, 0.1, 0.8]})
+    recognizer = object.__new__(StreamingRecognizer)
+    recognizer.model = SimpleNamespace(sos=3, eos=3)
+    recognizer.rescore_weight = 0.0
+    recognizer.lm_scorers = [(lm, 0.5)]
+    enc = torch.zeros(1, 5, 4)
+
+    nbest = [([1], np.log(0.6)), ([2], np.log(0.4))]
+    rescored = recognizer.rescore(enc, nbest)
+    assert [h for h, _ in rescored] == [[2], [1]]
+    assert np.isclose(rescored[0][1], np.log(0.4) + 0.5 * (np.log(0.8) + np.log(0.8)))
+    assert lm.calls == 4
@@ -0,0 +1,57 @@
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+import transcribe_dir  # noqa: E402
+
+
+class FakeModel:
+    def __init__(self, fail_features):
+        self.fail_features = fail_features
+
+    def _extract_feats(self, speech, lengths):
+        if self.fail_features:
+            raise ValueError("bad features")
+        return speech, lengths
+
+
+class FakeSpeech2Text:
+    def __init__(self, fail_features=False, fail_decode_at=None):
+        self.asr_model = FakeModel(fail_features)
+        self.fail_decode_at = fail_decode_at
+        self.decoded = 0
+
+    def __call__(self, audio):
+        if self.decoded == self.fail_decode_at:
+            raise ValueError("bad decode")
+        self.decoded += 1
+        return [(f"{len(audio)}",)]
+
+
+def run(tmp_path, monkeypatch, speech2text, n_files=40):
+    audio_dir = tmp_path / "audio"
+    audio_dir.mkdir(exist_ok=True)
+    for i in range(n_files):
+        (audio_dir / f"utt{i:03d}.wav").touch()
+    monkeypatch.setattr(transcribe_dir, "build_speech2text", lambda args: speech2text)
+    monkeypatch.setattr(transcribe_dir, "read_audio", lambda path, fs: np.zeros(160, dtype=np.float32))
+    transcribe_dir.main(["--input", str(audio_dir), "--output_dir", str(tmp_path / "out"),
+                         "--asr_train_config", "unused.yaml", "--queue_size", "1", "--read_threads", "2"])
+    return (tmp_path / "out" / "text").read_text().splitlines()
+
+
+def test_transcribes_every_file(tmp_path, monkeypatch):
+    lines = run(tmp_path, monkeypatch, FakeSpeech2Text())
+    assert lines == [f"utt{i:03d} 160" for i in range(40)]
+
+
+@pytest.mark.parametrize("speech2text", [FakeSpeech2Text(fail_features=True),
+                                         FakeSpeech2Text(fail_decode_at=3)])
+def test_errors_end_the_pipeline(tmp_path, monkeypatch, speech2text):
+    with pytest.raises((RuntimeError, ValueError)):
+        run(tmp_path, monkeypatch, speech2text)
+    # The reader and feature threads gave up instead of blocking on the full queues
+    assert not [t for t in threading.enumerate() if "run_stage" in t.name]